@@ -0,0 +1,67 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import OutboxEvent, SlowQuery
+from .slow_queries import summarize_slow_queries
+
+
+class SlowQueryAdmin(admin.ModelAdmin):
+    """
+    Отображение в админке модели SlowQuery
+    Над списком - сводка по отпечаткам (количество, p95, максимум)
+    для отфильтрованных записей
+    """
+    list_display = ('created', 'duration', 'view', 'sql')
+    list_filter = ('view',)
+    search_fields = ('fingerprint', 'sql')
+    readonly_fields = (
+        'fingerprint', 'sql', 'duration', 'view', 'stack', 'created'
+    )
+    change_list_template = 'admin/api/slowquery/change_list.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        context = getattr(response, 'context_data', None)
+        if context is not None and 'cl' in context:
+            context['summary'] = summarize_slow_queries(
+                context['cl'].queryset
+            )
+        return response
+
+
+class OutboxEventAdmin(admin.ModelAdmin):
+    """
+    Отображение в админке модели OutboxEvent
+    Действие retry_events сбрасывает счётчик попыток и паузу, чтобы
+    process_outbox сразу снова взял события в работу
+    """
+    list_display = (
+        'pk', 'event_type', 'attempts', 'next_attempt_at', 'created',
+        'last_error'
+    )
+    list_filter = ('event_type',)
+    readonly_fields = (
+        'event_type', 'payload', 'attempts', 'next_attempt_at', 'last_error',
+        'created'
+    )
+    actions = ('retry_events',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Повторить обработку')
+    def retry_events(self, request, queryset):
+        queryset.update(attempts=0, next_attempt_at=timezone.now())
+
+
+admin.site.register(SlowQuery, SlowQueryAdmin)
+admin.site.register(OutboxEvent, OutboxEventAdmin)
@@ -5,7 +5,10 @@ from rest_framework import serializers
 
 
 class Base64ImageField(serializers.ImageField):
-    """Декодирует строку из base64 в картинку и сохраняет файл."""
+    """
+    Декодирует строку из base64 в картинку и сохраняет файл.
+    Файл из multipart/form-data принимается как есть.
+    """
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
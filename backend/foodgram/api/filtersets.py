@@ -1,51 +1,99 @@
-from django_filters import filters, rest_framework
+from django.db.models import Exists, OuterRef
+from django_filters import filters
 from django_filters.rest_framework.filterset import FilterSet
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.ingredient_search import search_ingredients
+from recipes.models import FavoriteRecipes, Ingredient, Recipe, ShoppingCart
+from recipes.tags import get_tag_bits, get_tags_mask, has_any_tag
+
+
+RECIPE_ORDERINGS = {
+    'trending': ('-trending', '-pub_date', '-id'),
+    '-pub_date': ('-pub_date', '-id'),
+    'cooking_time': ('cooking_time', 'id'),
+    'popularity': ('-favorites_count', '-id'),
+}
 
 
 class NameFilterSet(FilterSet):
-    """Фильтр по name (вхождение с начала)."""
-    name = filters.CharFilter(lookup_expr='startswith')
+    """
+    Поиск по name без учёта регистра и с опечатками: сначала совпадения
+    с началом названия, затем с началом слова, затем похожие.
+    """
+    name = filters.CharFilter(method='search_name')
 
     class Meta:
         model = Ingredient
         fields = ['name', ]
 
+    def search_name(self, queryset, name, value):
+        return search_ingredients(queryset, value)
+
 
 class RecipeFilterSet(FilterSet):
     """
-    Фильтр по tags(поле tags__slug), по id автора, по доп.вычисляемым
-    полям is_in_shopping_cart (0,1) и is_favorited (0,1) (для авторизованных).
+    Фильтр по tags (slug, любой из переданных - по маске тегов рецепта),
+    по id автора, по доп.вычисляемым полям is_in_shopping_cart (0,1) и
+    is_favorited (0,1) (для авторизованных), cooking_time_max - время
+    приготовления не больше заданного.
+    Сортировка ordering: trending (по популярности с затуханием, рецепты
+    без активности - в конце по дате), -pub_date, cooking_time, popularity
+    (по числу добавлений в избранное) - по составным индексам Recipe, с id
+    для однозначного порядка.
     """
-    tags = rest_framework.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
+    tags = filters.MultipleChoiceFilter(method='filter_tags')
+    cooking_time_max = filters.NumberFilter(
+        field_name='cooking_time', lookup_expr='lte'
+    )
+    ordering = filters.ChoiceFilter(
+        choices=[(ordering, ordering) for ordering in RECIPE_ORDERINGS],
+        method='order_queryset'
     )
 
     class Meta:
         model = Recipe
         fields = ['author', 'tags']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tag_bits = get_tag_bits()
+        self.filters['tags'].extra['choices'] = [
+            (slug, slug) for slug in self.tag_bits
+        ]
+
+    def filter_tags(self, queryset, name, value):
+        """Рецепты, у которых в маске есть хотя бы один из тегов."""
+        if not value:
+            return queryset
+        return queryset.filter(has_any_tag(
+            get_tags_mask(self.tag_bits[slug] for slug in value)
+        ))
+
+    def order_queryset(self, queryset, name, value):
+        """Сортирует по одной из RECIPE_ORDERINGS."""
+        if value in RECIPE_ORDERINGS:
+            return queryset.order_by(*RECIPE_ORDERINGS[value])
+        return queryset
+
     def filter_queryset(self, queryset):
         """
-        Добавляет фильтр по is_in_shopping_cart (0,1) и is_favorited (0,1).
+        Добавляет фильтр по is_in_shopping_cart (0,1) и is_favorited (0,1)
+        через коррелированные подзапросы EXISTS (без JOIN и DISTINCT).
         """
         current_user = self.request.user
-        is_auth = current_user.is_authenticated
-        if is_auth and 'is_favorited' in self.data:
-            is_favorited = self.data['is_favorited']
-            if is_favorited == '1':
-                queryset = queryset.filter(favorited_by__user=current_user)
-            if is_favorited == '0':
-                queryset = queryset.exclude(favorited_by__user=current_user)
-        if is_auth and 'is_in_shopping_cart' in self.data:
-            is_in_shopping_cart = self.data['is_in_shopping_cart']
-            if is_in_shopping_cart == '1':
-                queryset = queryset.filter(in_shopping_cart__user=current_user)
-            if is_in_shopping_cart == '0':
-                queryset = queryset.exclude(
-                    in_shopping_cart__user=current_user
+        if current_user.is_authenticated:
+            for param, model in (
+                ('is_favorited', FavoriteRecipes),
+                ('is_in_shopping_cart', ShoppingCart),
+            ):
+                value = self.data.get(param)
+                if value not in ('0', '1'):
+                    continue
+                in_list = Exists(model.objects.filter(
+                    user=current_user,
+                    recipe=OuterRef('pk')
+                ))
+                queryset = queryset.filter(
+                    in_list if value == '1' else ~in_list
                 )
         return super().filter_queryset(queryset)
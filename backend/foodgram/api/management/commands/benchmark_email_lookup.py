@@ -0,0 +1,69 @@
+from statistics import median
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from users.models import User, filter_by_email
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает поиск юзера по email без учёта регистра: email__iexact
+    (UPPER(email) = UPPER(...)) против filter_by_email (индекс на
+    lower(email)). Для каждого способа выводит план запроса и медианное
+    время. С --seed-users сначала дозаполняет БД синтетическими юзерами.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-users', type=int, default=0)
+        parser.add_argument('--lookups', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options['seed_users']:
+            self.seed(options['seed_users'])
+        total = User.objects.count()
+        step = max(total // options['lookups'], 1)
+        emails = [
+            email.upper() for email in User.objects.order_by(
+                'pk'
+            ).values_list('email', flat=True)[::step][:options['lookups']]
+        ]
+        self.stdout.write(f'Юзеров: {total}, поисков: {len(emails)}')
+        for name, get_queryset in (
+            ('email__iexact',
+             lambda email: User.objects.filter(email__iexact=email)),
+            ('lower(email)',
+             lambda email: filter_by_email(User.objects.all(), email)),
+        ):
+            timings = []
+            for _ in range(options['repeat']):
+                started = perf_counter()
+                for email in emails:
+                    get_queryset(email).exists()
+                timings.append(perf_counter() - started)
+            per_lookup = median(timings) / max(len(emails), 1) * 1000
+            self.stdout.write(
+                f'{name}: {per_lookup:.3f} мс на поиск\n'
+                f'{get_queryset(emails[0]).explain()}'
+            )
+
+    def seed(self, count):
+        """Дозаполняет БД до count юзеров (email в нижнем регистре)."""
+        missing = count - User.objects.count()
+        batch_size = settings.CORPUS_CHUNK_SIZE
+        offset = User.objects.filter(username__startswith='email').count()
+        while missing > 0:
+            size = min(missing, batch_size)
+            User.objects.bulk_create(
+                (
+                    User(username=f'email{i}',
+                         email=f'email{i}@example.com',
+                         first_name='benchmark', last_name='benchmark')
+                    for i in range(offset, offset + size)
+                ),
+                ignore_conflicts=True
+            )
+            offset += size
+            missing = count - User.objects.count()
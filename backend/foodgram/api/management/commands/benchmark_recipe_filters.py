@@ -0,0 +1,178 @@
+from statistics import median
+from time import perf_counter
+
+import numpy as np
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.test import RequestFactory
+
+from api.filtersets import RecipeFilterSet
+from recipes.models import (FavoriteRecipes, Recipe, RecipeTag,
+                            ShoppingCart, Tag)
+from users.models import User
+
+
+CASES = (
+    {'is_favorited': '1'},
+    {'is_favorited': '0'},
+    {'is_in_shopping_cart': '1'},
+    {'is_in_shopping_cart': '0'},
+    {'is_favorited': '1', 'is_in_shopping_cart': '0'},
+)
+
+
+def filter_legacy(queryset, user, params):
+    """Прежний фильтр: JOIN для 1, exclude по обратной связи для 0."""
+    for param, relation in (
+        ('is_favorited', 'favorited_by__user'),
+        ('is_in_shopping_cart', 'in_shopping_cart__user'),
+    ):
+        if params.get(param) == '1':
+            queryset = queryset.filter(**{relation: user})
+        if params.get(param) == '0':
+            queryset = queryset.exclude(**{relation: user})
+    return queryset
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает фильтры is_favorited / is_in_shopping_cart: прежние
+    JOIN и exclude против коррелированных EXISTS из RecipeFilterSet.
+    Для каждого случая выводит план запроса и медианное время подсчёта
+    и первой страницы. С --seed-favorites сначала дозаполняет БД
+    синтетическими юзерами, рецептами, избранным и корзинами.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-favorites', type=int, default=0)
+        parser.add_argument('--seed-users', type=int, default=10000)
+        parser.add_argument('--seed-recipes', type=int, default=50000)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--tags', nargs='*', default=[])
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id юзера (по умолчанию - с наибольшим избранным)'
+        )
+
+    def handle(self, *args, **options):
+        if options['seed_favorites']:
+            self.seed(options)
+        user = (
+            User.objects.get(pk=options['user']) if options['user']
+            else User.objects.annotate(
+                favorites_count=Count('favorite_recipes')
+            ).order_by('-favorites_count').first()
+        )
+        self.stdout.write(
+            f'Избранное: {FavoriteRecipes.objects.count()}, '
+            f'корзины: {ShoppingCart.objects.count()}, '
+            f'рецепты: {Recipe.objects.count()}, юзер: {user.pk}'
+        )
+        for case in CASES:
+            params = dict(case, tags=options['tags'])
+            self.stdout.write(f'\n{params}')
+            for name, queryset in (
+                ('JOIN/exclude', self.get_legacy_queryset(user, params)),
+                ('EXISTS', self.get_exists_queryset(user, params)),
+            ):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = perf_counter()
+                    count = queryset.count()
+                    list(queryset[:options['page_size']])
+                    timings.append(perf_counter() - started)
+                self.stdout.write(
+                    f'{name}: {median(timings) * 1000:.1f} мс, '
+                    f'найдено {count}\n{queryset.explain()}'
+                )
+
+    def get_exists_queryset(self, user, params):
+        request = RequestFactory().get('/api/recipes/', params)
+        request.user = user
+        return RecipeFilterSet(
+            request.GET, queryset=Recipe.objects.values('id'),
+            request=request
+        ).qs
+
+    def get_legacy_queryset(self, user, params):
+        queryset = Recipe.objects.values('id')
+        if params['tags']:
+            queryset = queryset.filter(
+                tags__slug__in=params['tags']
+            ).distinct()
+        return filter_legacy(queryset, user, params)
+
+    def seed(self, options):
+        """
+        Дозаполняет БД до seed_favorites записей избранного (и вдвое
+        меньшего числа записей корзины) случайными парами юзер-рецепт.
+        """
+        batch_size = settings.CORPUS_CHUNK_SIZE
+        rng = np.random.default_rng(0)
+        users = list(User.objects.values_list('pk', flat=True))
+        if len(users) < options['seed_users']:
+            User.objects.bulk_create(
+                (
+                    User(username=f'benchmark{i}',
+                         email=f'benchmark{i}@example.com',
+                         first_name='benchmark', last_name='benchmark')
+                    for i in range(options['seed_users'] - len(users))
+                ),
+                batch_size=batch_size,
+                ignore_conflicts=True
+            )
+            users = list(User.objects.values_list('pk', flat=True))
+        recipes = list(Recipe.objects.values_list('pk', flat=True))
+        if len(recipes) < options['seed_recipes']:
+            tags = dict(Tag.objects.values_list('bit', 'pk'))
+            Recipe.objects.bulk_create(
+                (
+                    Recipe(author_id=int(rng.choice(users)),
+                           name=f'benchmark {i}', text='benchmark',
+                           cooking_time=int(rng.integers(1, 180)),
+                           portions=2, image='recipes/images/benchmark.png',
+                           tags_mask=(1 << int(rng.choice(list(tags))))
+                           if tags else 0)
+                    for i in range(options['seed_recipes'] - len(recipes))
+                ),
+                batch_size=batch_size
+            )
+            RecipeTag.objects.bulk_create(
+                (
+                    RecipeTag(recipe_id=pk, tag_id=tag_id)
+                    for pk, mask in Recipe.objects.filter(
+                        name__startswith='benchmark '
+                    ).values_list('pk', 'tags_mask').iterator()
+                    for bit, tag_id in tags.items()
+                    if mask & (1 << bit)
+                ),
+                batch_size=batch_size,
+                ignore_conflicts=True
+            )
+            recipes = list(Recipe.objects.values_list('pk', flat=True))
+        for model, total in (
+            (FavoriteRecipes, options['seed_favorites']),
+            (ShoppingCart, options['seed_favorites'] // 2),
+        ):
+            extra = {'portions_to_shop': 2} if model is ShoppingCart else {}
+            missing = total - model.objects.count()
+            while missing > 0:
+                size = min(missing, batch_size)
+                with transaction.atomic():
+                    model.objects.bulk_create(
+                        (
+                            model(user_id=int(user_id),
+                                  recipe_id=int(recipe_id), **extra)
+                            for user_id, recipe_id in zip(
+                                rng.choice(users, size),
+                                rng.choice(recipes, size)
+                            )
+                        ),
+                        ignore_conflicts=True
+                    )
+                missing = total - model.objects.count()
+            self.stdout.write(f'{model.__name__}: {model.objects.count()}')
@@ -0,0 +1,82 @@
+from time import perf_counter
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer
+from api.serializers import (RECIPE_READ_VALUES, RecipeReadSerializer,
+                             RecipeValuesReadSerializer)
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает время выдачи страницы рецептов:
+    RecipeReadSerializer + JSONRenderer против
+    values() + RecipeValuesReadSerializer + ORJSONRenderer.
+    Проверяет, что байты выдачи совпадают.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=30)
+        parser.add_argument('--pages', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id юзера, от имени которого идут запросы (иначе аноним)'
+        )
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/api/recipes/')
+        request.user = (
+            User.objects.get(pk=options['user']) if options['user']
+            else AnonymousUser()
+        )
+        context = {'request': request}
+        page_size = options['page_size']
+
+        def render_current(offset):
+            page = Recipe.objects.all()[offset:offset + page_size]
+            data = RecipeReadSerializer(page, many=True, context=context).data
+            return JSONRenderer().render(data)
+
+        def render_values(offset):
+            page = Recipe.objects.values(*RECIPE_READ_VALUES)[
+                offset:offset + page_size
+            ]
+            data = RecipeValuesReadSerializer(
+                page, many=True, context=context
+            ).data
+            return ORJSONRenderer().render(data)
+
+        results = {}
+        for name, render in (
+            ('RecipeReadSerializer', render_current),
+            ('RecipeValuesReadSerializer', render_values),
+        ):
+            outputs = []
+            with CaptureQueriesContext(connection) as queries:
+                started = perf_counter()
+                for _ in range(options['repeat']):
+                    outputs = [
+                        render(page * page_size)
+                        for page in range(options['pages'])
+                    ]
+                elapsed = perf_counter() - started
+            runs = options['repeat'] * options['pages']
+            results[name] = outputs
+            self.stdout.write(
+                f'{name}: {elapsed / runs * 1000:.2f} мс на страницу, '
+                f'{len(queries) / runs:.0f} запросов'
+            )
+        same = (
+            results['RecipeReadSerializer']
+            == results['RecipeValuesReadSerializer']
+        )
+        self.stdout.write(f'Выдача совпадает побайтно: {same}')
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from api.outbox import process_events
+
+
+class Command(BaseCommand):
+    """
+    Обрабатывает события outbox пачками по OUTBOX_BATCH_SIZE.
+    Без --loop обрабатывает очередь до конца и завершается (для cron),
+    с --loop работает как воркер: без паузы берёт следующую пачку только
+    после полной пачки без ошибок, иначе ждёт OUTBOX_POLL_INTERVAL секунд.
+    Неудачные события откладываются (next_attempt_at), поэтому не
+    обрабатываются повторно в том же проходе. Воркеров можно запускать
+    несколько.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE
+        )
+        parser.add_argument('--loop', action='store_true')
+
+    def handle(self, *args, **options):
+        total_processed = total_failed = 0
+        while True:
+            processed, failed = process_events(options['batch_size'])
+            total_processed += processed
+            total_failed += failed
+            full = processed + failed == options['batch_size']
+            if not options['loop']:
+                if not full:
+                    break
+            elif failed or not full:
+                time.sleep(settings.OUTBOX_POLL_INTERVAL)
+        self.stdout.write(
+            f'Обработано событий: {total_processed}, ошибок: {total_failed}'
+        )
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connection
+from django.test import Client
+
+from api.metrics import CACHE_REQUESTS
+from recipes.cache import RESPONSE_CACHE_ALIAS
+from recipes.models import Recipe
+from recipes.tags import get_tag_bits
+
+
+WARMED_CACHES = (RESPONSE_CACHE_ALIAS, 'fragments')
+
+
+def get_cache_misses():
+    """Промахи кэшей ответов и фрагментов рецептов в этом процессе."""
+    return {
+        sample.labels['cache']: sample.value
+        for metric in CACHE_REQUESTS.collect()
+        for sample in metric.samples
+        if sample.name.endswith('_total')
+        and sample.labels['result'] == 'miss'
+        and sample.labels['cache'] in WARMED_CACHES
+    }
+
+
+class Command(BaseCommand):
+    """
+    Прогревает кэши после деплоя: запрашивает анонимно горячие адреса
+    WARM_CACHE_URLS и страницы самых популярных (по избранному) рецептов
+    в нескольких потоках. Ответы и фрагменты рецептов попадают в кэш
+    ответов, биты тегов - в кэш по умолчанию.
+    Выводит время прогрева и количество заполненных записей.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--urls',
+            nargs='*',
+            help='адреса для прогрева (по умолчанию WARM_CACHE_URLS)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=settings.WARM_CACHE_TOP_RECIPES,
+            help='сколько самых популярных рецептов прогреть'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=settings.WARM_CACHE_THREADS
+        )
+        parser.add_argument(
+            '--host',
+            default=settings.WARM_CACHE_HOST,
+            help='хост, под которым запросы приходят через nginx '
+                 '(входит в ключ кэша ответов)'
+        )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        misses_before = get_cache_misses()
+        get_tag_bits()
+        urls = list(
+            settings.WARM_CACHE_URLS if options['urls'] is None
+            else options['urls']
+        )
+        urls.extend(
+            f'/api/recipes/{recipe_id}/'
+            for recipe_id in self.get_top_recipe_ids(options['top'])
+        )
+        with ThreadPoolExecutor(options['threads']) as executor:
+            statuses = list(executor.map(
+                lambda url: self.fetch(url, options['host']), urls
+            ))
+        misses = get_cache_misses()
+        failed = 0
+        for url, status in zip(urls, statuses):
+            if status != 200:
+                failed += 1
+                self.stderr.write(f'{url}: {status}')
+        populated = {
+            alias: int(misses.get(alias, 0) - misses_before.get(alias, 0))
+            for alias in WARMED_CACHES
+        }
+        # Ответы с ошибкой тоже промахиваются мимо кэша, но не сохраняются.
+        populated[RESPONSE_CACHE_ALIAS] = max(
+            populated[RESPONSE_CACHE_ALIAS] - failed, 0
+        )
+        populated = ', '.join(
+            f'{alias}: {count}' for alias, count in populated.items()
+        )
+        self.stdout.write(
+            f'Прогрето адресов: {len(urls)} (с ошибкой: {failed}) '
+            f'за {perf_counter() - started:.2f} с, '
+            f'записей в кэше: {populated}'
+        )
+
+    def get_top_recipe_ids(self, count):
+        """
+        id рецептов с наибольшим числом добавлений в избранное (по
+        favorites_count и его индексу, без группировки избранного).
+        """
+        if count <= 0:
+            return []
+        return list(Recipe.objects.filter(favorites_count__gt=0).order_by(
+            '-favorites_count', '-id'
+        ).values_list('id', flat=True)[:count])
+
+    def fetch(self, url, host):
+        """Анонимный GET-запрос через тестовый клиент Django."""
+        try:
+            return Client(HTTP_HOST=host).get(url).status_code
+        finally:
+            connection.close()
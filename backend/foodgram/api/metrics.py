@@ -0,0 +1,58 @@
+import os
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+
+LABELS = ('viewset', 'action')
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    LABELS + ('method', 'status')
+)
+DB_QUERIES = Histogram(
+    'foodgram_request_db_queries',
+    'Количество SQL-запросов на запрос',
+    LABELS,
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+DB_TIME = Histogram(
+    'foodgram_request_db_seconds',
+    'Суммарное время SQL-запросов на запрос',
+    LABELS
+)
+ACTIVE_REQUESTS = Gauge(
+    'foodgram_active_requests',
+    'Запросы в обработке',
+    multiprocess_mode='livesum'
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кэшу',
+    ('cache', 'result')
+)
+SHOPPING_LIST_SIZE = Histogram(
+    'foodgram_shopping_list_ingredients',
+    'Количество ингредиентов в скачанном списке покупок',
+    buckets=(0, 5, 10, 20, 50, 100, 200, 500)
+)
+
+
+def count_cache_request(cache, hit):
+    """Учитывает попадание или промах кэша."""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def render_metrics():
+    """
+    Метрики в текстовом формате Prometheus.
+    При запуске в нескольких процессах (PROMETHEUS_MULTIPROC_DIR)
+    собираются из файлов всех воркеров.
+    """
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,145 @@
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .metrics import (ACTIVE_REQUESTS, DB_QUERIES, DB_TIME,
+                      REQUEST_LATENCY)
+from .profiling import (PROFILE_FORMATS, QueryRecorder, get_profiler,
+                        save_profile)
+from .slow_queries import make_slow_query, save_slow_queries
+from .utils import check_user_is_admin_or_superuser
+
+
+class QueryCounter:
+    """
+    Обёртка execute_wrapper, считающая SQL-запросы и их время.
+    Запросы дольше SLOW_QUERY_THRESHOLD секунд собираются в slow_queries.
+    """
+    def __init__(self):
+        self.count = 0
+        self.time = 0
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.time += duration
+            if duration >= settings.SLOW_QUERY_THRESHOLD:
+                self.slow_queries.append(make_slow_query(sql, duration))
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики запросов для /metrics: время ответа, количество и
+    время SQL-запросов по вьюсету и action DRF, запросы в обработке.
+    Медленные SQL-запросы сохраняются в SlowQuery.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.metrics_labels = ('', '')
+        counter = QueryCounter()
+        status = 500
+        ACTIVE_REQUESTS.inc()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            ACTIVE_REQUESTS.dec()
+            labels = request.metrics_labels
+            REQUEST_LATENCY.labels(*labels, request.method, status).observe(
+                time.perf_counter() - start
+            )
+            DB_QUERIES.labels(*labels).observe(counter.count)
+            DB_TIME.labels(*labels).observe(counter.time)
+            save_slow_queries(counter.slow_queries, '.'.join(filter(
+                None, labels
+            )))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Запоминает вьюсет и action DRF для меток метрик."""
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is None:
+            request.metrics_labels = (view_func.__name__, '')
+            return
+        actions = getattr(view_func, 'actions', None) or {}
+        request.metrics_labels = (
+            view_class.__name__,
+            actions.get(request.method.lower(), '')
+        )
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует запрос по требованию админа.
+    Включается заголовком X-Profile или параметром ?profile= со значением
+    prof (cProfile) или collapsed (сэмплирование, стеки для flamegraph).
+    Профиль и SQL-запросы сохраняются в PROFILING_ROOT, ссылки на них
+    приходят в заголовках X-Profile и X-Profile-Queries.
+    Без флага запрос проходит без дополнительной работы.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile_format = self.get_profile_format(request)
+        if profile_format is None or not self.is_admin(request):
+            return self.get_response(request)
+        profiler = get_profiler(profile_format)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        profile_name, queries_name = save_profile(
+            request, profiler, profile_format, recorder.queries,
+            time.perf_counter() - start
+        )
+        response['X-Profile'] = reverse('api:profiles', args=[profile_name])
+        response['X-Profile-Queries'] = reverse(
+            'api:profiles', args=[queries_name]
+        )
+        return response
+
+    def get_profile_format(self, request):
+        """Формат профиля из заголовка или параметра запроса."""
+        value = request.META.get(settings.PROFILING_HEADER)
+        if value is None:
+            if settings.PROFILING_QUERY_PARAM not in request.GET:
+                return None
+            value = request.GET[settings.PROFILING_QUERY_PARAM]
+        return value if value in PROFILE_FORMATS else PROFILE_FORMATS[0]
+
+    def is_admin(self, request):
+        """
+        Проверяет, что запрос от админа.
+        Юзер API определяется аутентификаторами DRF (по токену).
+        """
+        if check_user_is_admin_or_superuser(request.user):
+            return True
+        drf_request = Request(request)
+        authenticators = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        for authenticator in authenticators:
+            try:
+                result = authenticator().authenticate(drf_request)
+            except APIException:
+                return False
+            if result is not None:
+                return check_user_is_admin_or_superuser(result[0])
+        return False
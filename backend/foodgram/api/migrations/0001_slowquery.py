@@ -0,0 +1,31 @@
+# Generated by Django 3.2 on 2026-10-19 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(db_index=True, max_length=32, verbose_name='Отпечаток')),
+                ('sql', models.TextField(verbose_name='Нормализованный SQL')),
+                ('duration', models.FloatField(verbose_name='Длительность, с')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='Вьюсет и action')),
+                ('stack', models.TextField(blank=True, verbose_name='Стек вызова')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ['-created'],
+            },
+        ),
+    ]
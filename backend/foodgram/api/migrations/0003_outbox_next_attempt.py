@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-19 11:32
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Следующая попытка'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['next_attempt_at', 'attempts'], name='outbox_next_attempt_idx'),
+        ),
+    ]
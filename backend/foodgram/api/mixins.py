@@ -0,0 +1,92 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.utils.http import urlencode
+from rest_framework.response import Response
+
+from recipes.cache import (RESPONSE_CACHE_ALIAS, get_list_cache_version,
+                           get_recipe_cache_version, get_response_cache)
+from .metrics import count_cache_request
+from .throttles import ServerBusy, get_slot_store
+
+
+class AnonymousCacheMixin:
+    """
+    Кэширует ответы list и retrieve для анонимных юзеров.
+    Ключ - хост, путь и отсортированные параметры запроса вместе с версией
+    списка (для list) или версией рецепта и фрагментов (для retrieve),
+    поэтому запись рецепта сбрасывает только затронутые ответы.
+    """
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return super().list(request, *args, **kwargs)
+        return self.get_cached_response(
+            get_list_cache_version(), super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        version = None
+        if request.user.is_anonymous and lookup.isdigit():
+            version = get_recipe_cache_version(lookup)
+        if version is None:
+            return super().retrieve(request, *args, **kwargs)
+        return self.get_cached_response(
+            version, super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cache_key(self, request, version):
+        """Ключ ответа с нормализованными параметрами запроса."""
+        query = urlencode(sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        ))
+        url = f'{request.get_host()}{request.path}?{query}'
+        return '{}:{}'.format(version, md5(url.encode()).hexdigest())
+
+    def get_cached_response(self, version, handler, request, *args,
+                            **kwargs):
+        """Отдаёт ответ из кэша или сохраняет в кэш успешный ответ."""
+        response_cache = get_response_cache()
+        key = self.get_cache_key(request, version)
+        data = response_cache.get(key)
+        count_cache_request(RESPONSE_CACHE_ALIAS, data is not None)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        return response
+
+
+class AdmissionControlMixin:
+    """
+    Ограничивает дорогие action вьюсета.
+    throttle_scopes сопоставляет action и scope: по scope применяются
+    частотные лимиты DEFAULT_THROTTLE_RATES (ответ 429) и лимит
+    одновременных запросов CONCURRENCY_LIMITS (ответ 503).
+    Оба ответа содержат заголовок Retry-After.
+    """
+    throttle_scopes = {}
+    concurrency_slot = None
+
+    @property
+    def throttle_scope(self):
+        return self.throttle_scopes.get(self.action)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        scope = self.throttle_scope
+        limit = settings.CONCURRENCY_LIMITS.get(scope)
+        if limit is None:
+            return
+        self.concurrency_slot = get_slot_store().acquire(scope, limit)
+        if self.concurrency_slot is None:
+            raise ServerBusy(settings.CONCURRENCY_RETRY_AFTER)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.concurrency_slot is not None:
+            get_slot_store().release(self.concurrency_slot)
+            self.concurrency_slot = None
+        return super().finalize_response(request, response, *args, **kwargs)
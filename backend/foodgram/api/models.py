@@ -0,0 +1,58 @@
+from django.db import models
+from django.utils import timezone
+
+
+class SlowQuery(models.Model):
+    """
+    Медленный SQL-запрос, пойманный MetricsMiddleware
+    Запросы группируются по fingerprint - хэшу нормализованного SQL
+    Таблица ограничена SLOW_QUERY_MAX_ROWS последними записями
+    """
+    fingerprint = models.CharField('Отпечаток', max_length=32, db_index=True)
+    sql = models.TextField('Нормализованный SQL')
+    duration = models.FloatField('Длительность, с')
+    view = models.CharField('Вьюсет и action', max_length=200, blank=True)
+    stack = models.TextField('Стек вызова', blank=True)
+    created = models.DateTimeField('Дата', auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+
+    def __str__(self):
+        return self.sql[:80]
+
+
+class OutboxEvent(models.Model):
+    """
+    Событие для фоновой обработки (transactional outbox)
+    Пишется в той же транзакции, что и изменение, обрабатывается командой
+    process_outbox обработчиками из api.outbox и затем удаляется
+    Неудачные попытки копятся в attempts, следующая попытка
+    откладывается до next_attempt_at (экспоненциально растущая пауза),
+    после OUTBOX_MAX_ATTEMPTS событие остаётся в таблице для разбора
+    """
+    event_type = models.CharField('Тип события', max_length=100)
+    payload = models.JSONField('Данные', default=dict)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Дата', auto_now_add=True)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now
+    )
+
+    class Meta:
+        ordering = ['pk']
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at', 'attempts'],
+                name='outbox_next_attempt_idx'
+            ),
+        ]
+        verbose_name = 'Событие outbox'
+        verbose_name_plural = 'События outbox'
+
+    def __str__(self):
+        return f'{self.event_type} {self.payload}'
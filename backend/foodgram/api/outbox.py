@@ -0,0 +1,151 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.feed import (add_author_to_feed, fan_out_recipe,
+                          remove_author_from_feed)
+from recipes.models import FavoriteRecipes, Recipe, ShoppingCart
+from recipes.pantry import update_pantry_index
+from recipes.popularity import change_favorites_count
+from recipes.similarity import update_similar_recipes
+from recipes.trending import add_trending_activity
+from users.models import Subscribe
+from .models import OutboxEvent
+
+
+HANDLERS = defaultdict(list)
+LIST_MODELS = {
+    'favorite': FavoriteRecipes,
+    'shopping_cart': ShoppingCart,
+}
+
+
+def handles(*event_types):
+    """Регистрирует обработчик для событий event_types."""
+    def register(handler):
+        for event_type in event_types:
+            HANDLERS[event_type].append(handler)
+        return handler
+    return register
+
+
+def publish(event_type, **payload):
+    """
+    Записывает событие в outbox.
+    Вызывается внутри транзакции изменения: событие сохраняется только
+    вместе с ним.
+    """
+    OutboxEvent.objects.create(event_type=event_type, payload=payload)
+
+
+def get_retry_delay(attempts):
+    """
+    Пауза перед следующей попыткой после attempts неудачных:
+    OUTBOX_RETRY_DELAY, удваивается с каждой попыткой, не больше
+    OUTBOX_MAX_RETRY_DELAY секунд.
+    """
+    return timedelta(seconds=min(
+        settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_MAX_RETRY_DELAY
+    ))
+
+
+def process_events(batch_size):
+    """
+    Забирает до batch_size необработанных событий (select_for_update с
+    skip_locked - несколько воркеров не делят события) и вызывает их
+    обработчики. Берутся только события, чьё next_attempt_at наступило.
+    Каждое событие обрабатывается в своей точке сохранения: успешные
+    удаляются, у неудачных растёт attempts и next_attempt_at
+    откладывается на get_retry_delay.
+    Возвращает количество обработанных и неудачных событий.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(OutboxEvent.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            next_attempt_at__lte=now,
+            attempts__lt=settings.OUTBOX_MAX_ATTEMPTS
+        ).order_by('pk')[:batch_size])
+        processed, failed = [], []
+        for event in events:
+            try:
+                with transaction.atomic():
+                    if event.event_type not in HANDLERS:
+                        raise LookupError(
+                            f'Нет обработчиков для {event.event_type}'
+                        )
+                    for handler in HANDLERS[event.event_type]:
+                        handler(**event.payload)
+            except Exception as error:
+                event.attempts += 1
+                event.last_error = repr(error)
+                event.next_attempt_at = now + get_retry_delay(event.attempts)
+                failed.append(event)
+            else:
+                processed.append(event.pk)
+        OutboxEvent.objects.filter(pk__in=processed).delete()
+        OutboxEvent.objects.bulk_update(
+            failed, ['attempts', 'last_error', 'next_attempt_at']
+        )
+    return len(processed), len(failed)
+
+
+@handles('recipe_created')
+def fan_out_created_recipe(recipe_id):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is not None:
+        fan_out_recipe(recipe)
+
+
+@handles('recipe_created', 'recipe_updated')
+def update_recipe_indexes(recipe_id):
+    """Пересчитывает похожие рецепты и индекс подбора по ингредиентам."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is not None:
+        update_similar_recipes(recipe)
+        update_pantry_index(recipe_id)
+
+
+@handles('favorite_added', 'shopping_cart_added')
+def count_trending_activity(list_name, pk, recipe_id):
+    """Учитывает добавление в избранное или корзину в рейтинге."""
+    instance = LIST_MODELS[list_name].objects.filter(pk=pk).first()
+    if instance is not None:
+        add_trending_activity(instance)
+
+
+@handles('favorite_added')
+def increment_favorites_count(list_name, pk, recipe_id):
+    """Увеличивает счётчик избранного рецепта."""
+    change_favorites_count(recipe_id, 1)
+
+
+@handles('favorite_removed')
+def decrement_favorites_count(recipe_id):
+    """Уменьшает счётчик избранного рецепта."""
+    change_favorites_count(recipe_id, -1)
+
+
+@handles('subscribed')
+def backfill_feed(user_id, author_id):
+    """
+    Добавляет рецепты автора в ленту подписчика, если подписка ещё есть
+    (отписка могла обработаться раньше).
+    """
+    subscription = Subscribe.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).select_related('user', 'author').first()
+    if subscription is not None:
+        add_author_to_feed(subscription.user, subscription.author)
+
+
+@handles('unsubscribed')
+def clear_feed(user_id, author_id):
+    """Убирает рецепты автора из ленты бывшего подписчика."""
+    remove_author_from_feed(user_id, author_id)
@@ -1,4 +1,13 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+from recipes.feed import get_feed_page, get_feed_recipes
+from .filtersets import RECIPE_ORDERINGS
 
 
 class PageNumberWithLimitPagination(PageNumberPagination):
@@ -8,3 +17,164 @@ class PageNumberWithLimitPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
     max_page_size = 30
+
+
+class FeedCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация для ленты подписок (по убыванию даты публикации).
+    Параметр limit - количество объектов на странице.
+    """
+    ordering = ('-pub_date', '-pk')
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 30
+
+    def paginate_feed(self, user, queryset, request):
+        """
+        Страница ленты юзера по позиции из курсора (pub_date и id рецепта
+        последнего показанного рецепта), без OFFSET и подсчёта строк.
+        Рецепты читаются из queryset (Recipe.values() с id).
+        """
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = None
+        if self.cursor is not None:
+            pub_date, _, recipe_id = self.cursor.position.rpartition('_')
+            pub_date = parse_datetime(pub_date)
+            if pub_date is None or not recipe_id.isdigit():
+                raise NotFound(self.invalid_cursor_message)
+            position = (pub_date, int(recipe_id))
+        rows = get_feed_page(user, position, self.page_size + 1, reverse)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        self.has_next = has_more if not reverse else self.cursor is not None
+        self.has_previous = has_more if reverse else self.cursor is not None
+        self.rows = rows
+        return get_feed_recipes(rows, queryset)
+
+    def get_feed_link(self, row, reverse):
+        pub_date, recipe_id = row
+        return self.encode_cursor(
+            Cursor(0, reverse, f'{pub_date.isoformat()}_{recipe_id}')
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self.get_feed_link(self.rows[-1], False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.rows:
+            return None
+        return self.get_feed_link(self.rows[0], True)
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация списка рецептов, включается параметром
+    cursor (пустой - первая страница).
+    Порядок - из ?ordering= (RECIPE_ORDERINGS), по умолчанию -pub_date.
+    Позиция в курсоре - значения всех полей сортировки последнего
+    показанного рецепта (с id), страница выбирается условием по ним без
+    OFFSET, по составным индексам Recipe.
+    Рецепты - строки Recipe.values() с полями сортировки.
+    """
+    ordering = ('-pub_date', '-id')
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 30
+    position_parsers = {'pub_date': parse_datetime, 'trending': float}
+
+    def get_ordering(self, request, queryset, view):
+        return RECIPE_ORDERINGS.get(
+            request.query_params.get('ordering'), self.ordering
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        has_position = (
+            self.cursor is not None and self.cursor.position is not None
+        )
+        reverse = has_position and self.cursor.reverse
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        if has_position:
+            queryset = queryset.filter(self.get_position_filter(
+                ordering, self.decode_position(self.cursor.position)
+            ))
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        self.has_next = has_more if not reverse else has_position
+        self.has_previous = has_more if reverse else has_position
+        self.page = rows
+        return rows
+
+    def get_position_filter(self, ordering, values):
+        """
+        Условие «после позиции» для порядка ordering: первое поле не
+        дальше значения позиции (диапазон по индексу), остальные - как
+        сравнение кортежей.
+        """
+        condition = None
+        for field, value in reversed(list(zip(ordering, values))):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            after = Q(**{f'{name}__{lookup}': value})
+            if condition is not None:
+                after |= Q(**{name: value}) & condition
+            condition = after
+        field, value = ordering[0], values[0]
+        lookup = 'lte' if field.startswith('-') else 'gte'
+        return Q(**{f'{field.lstrip("-")}__{lookup}': value}) & condition
+
+    def encode_position(self, row):
+        """Значения полей сортировки рецепта для курсора (JSON)."""
+        return json.dumps(
+            [row[field.lstrip('-')] for field in self.ordering],
+            default=lambda value: value.isoformat()
+        )
+
+    def decode_position(self, position):
+        """Значения полей сортировки из курсора."""
+        try:
+            values = json.loads(position)
+            if len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.position_parsers.get(field.lstrip('-'), int)(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_page_link(self, row, reverse):
+        return self.encode_cursor(
+            Cursor(0, reverse, self.encode_position(row))
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_page_link(self.page[-1], False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.get_page_link(self.page[0], True)
@@ -0,0 +1,110 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+
+
+PROFILE_FORMATS = ('prof', 'collapsed')
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профайлер одного потока.
+    Фоновый поток раз в PROFILING_SAMPLE_INTERVAL секунд снимает стек
+    профилируемого потока; результат - свёрнутые стеки для flamegraph.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = Counter()
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} '
+                    f'({os.path.basename(code.co_filename)}:'
+                    f'{code.co_firstlineno})'
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def enable(self):
+        self.sampler.start()
+
+    def disable(self):
+        self.stopped.set()
+        self.sampler.join()
+
+    def dump_stats(self, path):
+        with open(path, 'w') as file:
+            for stack, count in self.samples.items():
+                file.write(f'{stack} {count}\n')
+
+
+def get_profiler(profile_format):
+    """Профайлер для формата: cProfile для .prof, сэмплер для .collapsed."""
+    if profile_format == 'collapsed':
+        return SamplingProfiler(settings.PROFILING_SAMPLE_INTERVAL)
+    return cProfile.Profile()
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper, записывающая SQL-запросы и их время."""
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'params': repr(params),
+                'many': many,
+                'time': time.perf_counter() - start,
+            })
+
+
+def save_profile(request, profiler, profile_format, queries, duration):
+    """
+    Сохраняет профиль и SQL-запросы в PROFILING_ROOT.
+    Возвращает имена файлов; старые профили сверх PROFILING_MAX_FILES
+    удаляются.
+    """
+    os.makedirs(settings.PROFILING_ROOT, exist_ok=True)
+    name = f'{time.strftime("%Y%m%d%H%M%S")}-{uuid4().hex[:8]}'
+    profile_name = f'{name}.{profile_format}'
+    queries_name = f'{name}.sql.json'
+    profiler.dump_stats(os.path.join(settings.PROFILING_ROOT, profile_name))
+    with open(os.path.join(settings.PROFILING_ROOT, queries_name), 'w') as f:
+        json.dump({
+            'method': request.method,
+            'path': request.get_full_path(),
+            'duration': duration,
+            'count': len(queries),
+            'time': sum(query['time'] for query in queries),
+            'queries': queries,
+        }, f, ensure_ascii=False, indent=2)
+    prune_profiles()
+    return profile_name, queries_name
+
+
+def prune_profiles():
+    """Удаляет самые старые файлы профилей сверх PROFILING_MAX_FILES."""
+    names = sorted(os.listdir(settings.PROFILING_ROOT))
+    for name in names[:-settings.PROFILING_MAX_FILES]:
+        os.remove(os.path.join(settings.PROFILING_ROOT, name))
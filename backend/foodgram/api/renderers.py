@@ -0,0 +1,74 @@
+from decimal import Decimal
+from math import isfinite
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+
+def has_special_floats(data):
+    """
+    Есть ли в данных числа, которые orjson выводит не так, как json:
+    float в экспоненциальной записи, NaN и бесконечности (orjson выдаёт
+    null вместо ошибки или NaN), Decimal (приводится к float в default).
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, float):
+            if not isfinite(value) or 'e' in repr(value):
+                return True
+        elif isinstance(value, Decimal):
+            return True
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson.
+    Выдаёт те же байты, что и JSONRenderer с настройками по умолчанию
+    (компактный UTF-8, экранированные \\u2028 и \\u2029).
+    Для выдачи с отступами (indent) и данных с особыми числами
+    (has_special_floats) используется стандартный рендерер: он же
+    применяет strict (ошибка на NaN и бесконечности). Он же - для данных,
+    которые orjson не сериализует (например, int больше 64 бит).
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            indent is not None
+            or not self.compact
+            or self.ensure_ascii
+            or has_special_floats(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encoders.JSONEncoder().default,
+                option=(
+                    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                )
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace(
+            '\u2029'.encode(), b'\\u2029'
+        )
+
+
+class PDFFormatRenderer(ORJSONRenderer):
+    """
+    Разрешает параметр ?format=pdf.
+    Сам PDF отдаётся файлом в обход рендеров, через этот рендерер
+    проходят только ответы с ошибками, они выдаются в JSON.
+    """
+    format = 'pdf'
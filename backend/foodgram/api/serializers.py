@@ -1,15 +1,27 @@
+import json
 import re
+from collections import defaultdict
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
-from rest_framework.validators import UniqueValidator, UniqueTogetherValidator
-from djoser.serializers import UserCreateSerializer
+from rest_framework.validators import UniqueTogetherValidator
+from djoser.serializers import TokenCreateSerializer, UserCreateSerializer
 
+from recipes.cache import (get_fragment_keys, get_fragments,
+                           invalidate_recipe_responses, set_fragments)
+from recipes.images import delete_unused_images
 from recipes.models import (FavoriteRecipes, Ingredient, IngredientRecipe,
-                            Recipe, RecipeTag, ShoppingCart, Tag)
-from users.models import Subscribe
+                            Recipe, RecipeTag, ShoppingCart, Tag,
+                            get_free_tag_bits)
+from recipes.shopping_list import bump_recipe_carts
+from recipes.tags import get_tags_mask
+from users.models import Subscribe, filter_by_email, normalize_email
 from .fields import Base64ImageField
+from .metrics import count_cache_request
+from .outbox import publish
 
 
 User = get_user_model()
@@ -28,6 +40,14 @@ class TagSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Это не код цвета Hex')
         return value
 
+    def validate(self, data):
+        """Проверяет, что для нового тега есть свободный бит маски."""
+        if self.instance is None and not get_free_tag_bits(1):
+            raise serializers.ValidationError(
+                'Достигнуто максимальное количество тегов.'
+            )
+        return data
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для ингредиентов."""
@@ -39,19 +59,29 @@ class IngredientSerializer(serializers.ModelSerializer):
 class UserWriteSerializer(UserCreateSerializer):
     """
     Сериализатор для юзеров.
-    Делает поле username обязательным, а email нечувствительным к регистру.
+    Делает поле username обязательным, а email нечувствительным к регистру
+    (уникальность проверяется по индексу на lower(email)).
     """
-    email = serializers.EmailField(
-        validators=[
-            UniqueValidator(queryset=User.objects.all(), lookup='iexact'),
-        ]
-    )
+    email = serializers.EmailField()
 
     class Meta:
         model = User
         fields = ('id', 'first_name', 'last_name', 'email', 'username',
                   'password')
 
+    def validate_email(self, value):
+        if filter_by_email(User.objects.all(), value).exists():
+            raise serializers.ValidationError(
+                'Пользователь с таким email уже существует.'
+            )
+        return normalize_email(value)
+
+
+class EmailTokenCreateSerializer(TokenCreateSerializer):
+    """Получение токена по email без учёта регистра."""
+    def validate_email(self, value):
+        return normalize_email(value)
+
 
 class UserBaseSerializer(serializers.ModelSerializer):
     """
@@ -70,7 +100,10 @@ class UserBaseSerializer(serializers.ModelSerializer):
     def get_is_subscribed(self, obj):
         """
         Вычисляет, подписан ли текущий пользователь на этого.
+        Использует аннотацию is_subscribed, если она есть в queryset.
         """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         current_user = self.context.get('request').user
         return (
             current_user.is_authenticated
@@ -160,6 +193,150 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
 
+RECIPE_READ_VALUES = (
+    'id', 'author_id', 'name', 'text', 'image', 'cooking_time', 'portions',
+    'pub_date', 'favorites_count', 'trending', 'version'
+)
+
+
+def get_image_url(name, request):
+    """Абсолютный URL картинки рецепта по имени файла (как ImageField)."""
+    if not name:
+        return None
+    url = Recipe._meta.get_field('image').storage.url(name)
+    return request.build_absolute_uri(url)
+
+
+def build_recipe_fragments(recipe_ids):
+    """
+    Не зависящая от пользователя часть выдачи рецептов: теги и
+    ингредиенты, одним запросом каждые на все рецепты.
+    """
+    tags = defaultdict(list)
+    for link in RecipeTag.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('pk').values(
+        'recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'
+    ):
+        tags[link['recipe_id']].append({
+            'id': link['tag__id'],
+            'name': link['tag__name'],
+            'color': link['tag__color'],
+            'slug': link['tag__slug'],
+        })
+    ingredients = defaultdict(list)
+    for link in IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('pk').values(
+        'recipe_id', 'ingredient__id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    ):
+        ingredients[link['recipe_id']].append({
+            'id': link['ingredient__id'],
+            'name': link['ingredient__name'],
+            'measurement_unit': link['ingredient__measurement_unit'],
+            'amount': link['amount'],
+        })
+    return {
+        recipe_id: {
+            'tags': tags[recipe_id],
+            'ingredients': ingredients[recipe_id],
+        }
+        for recipe_id in recipe_ids
+    }
+
+
+def get_recipe_fragments(recipe_versions):
+    """
+    Фрагменты рецептов из кэша ответов по id и версии рецепта
+    ({id: Recipe.version}).
+    Кэш читается и пополняется одним запросом на страницу, в БД
+    собираются только недостающие фрагменты.
+    """
+    recipe_ids = list(recipe_versions)
+    keys = get_fragment_keys(recipe_versions)
+    fragments = get_fragments(keys)
+    for recipe_id in recipe_ids:
+        count_cache_request('fragments', recipe_id in fragments)
+    missing = [
+        recipe_id for recipe_id in recipe_ids if recipe_id not in fragments
+    ]
+    if missing:
+        built = build_recipe_fragments(missing)
+        set_fragments(keys, built)
+        fragments.update(built)
+    return fragments
+
+
+def represent_recipe_rows(rows, request):
+    """
+    Собирает выдачу RecipeReadSerializer из словарей Recipe.values()
+    (поля RECIPE_READ_VALUES).
+    Теги и ингредиенты берутся из кэша фрагментов, авторы и отметки
+    текущего пользователя загружаются одним запросом каждые на всю
+    страницу.
+    """
+    recipe_ids = [row['id'] for row in rows]
+    fragments = get_recipe_fragments(
+        {row['id']: row['version'] for row in rows}
+    )
+    authors = {
+        author['id']: author for author in User.objects.filter(
+            pk__in={row['author_id'] for row in rows}
+        ).values('id', 'email', 'first_name', 'last_name', 'username')
+    }
+    subscribed, favorited, in_shopping_cart = set(), set(), {}
+    current_user = request.user
+    if current_user.is_authenticated:
+        subscribed = set(Subscribe.objects.filter(
+            user=current_user, author__in=authors
+        ).values_list('author_id', flat=True))
+        favorited = set(FavoriteRecipes.objects.filter(
+            user=current_user, recipe__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        in_shopping_cart = dict(ShoppingCart.objects.filter(
+            user=current_user, recipe__in=recipe_ids
+        ).values_list('recipe_id', 'portions_to_shop'))
+    return [
+        {
+            'id': row['id'],
+            'tags': fragments[row['id']]['tags'],
+            'author': {
+                **authors[row['author_id']],
+                'is_subscribed': row['author_id'] in subscribed,
+            },
+            'ingredients': fragments[row['id']]['ingredients'],
+            'name': row['name'],
+            'text': row['text'],
+            'image': get_image_url(row['image'], request),
+            'cooking_time': row['cooking_time'],
+            'is_favorited': row['id'] in favorited,
+            'is_in_shopping_cart': in_shopping_cart.get(row['id'], 0),
+            'portions': row['portions'],
+        }
+        for row in rows
+    ]
+
+
+class RecipeValuesListSerializer(serializers.ListSerializer):
+    """Собирает выдачу для всей страницы рецептов разом."""
+    def to_representation(self, data):
+        return represent_recipe_rows(list(data), self.context['request'])
+
+
+class RecipeValuesReadSerializer(serializers.BaseSerializer):
+    """
+    Быстрый сериализатор для чтения рецептов (список и один рецепт).
+    Принимает словари Recipe.values(RECIPE_READ_VALUES) и выдаёт то же,
+    что RecipeReadSerializer, без полей-сериализаторов DRF.
+    """
+    class Meta:
+        list_serializer_class = RecipeValuesListSerializer
+
+    def to_representation(self, instance):
+        return represent_recipe_rows([instance], self.context['request'])[0]
+
+
 class IngredientIdAmountSerializer(serializers.ModelSerializer):
     id = serializers.SlugRelatedField(
         source='ingredient',
@@ -197,14 +374,51 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('author',)
 
+    def to_internal_value(self, data):
+        """
+        В multipart/form-data ингредиенты можно передать JSON-строкой
+        в поле ingredients (как в JSON-запросе), теги - повторяющимся
+        полем tags. Картинка приходит файлом.
+        """
+        if hasattr(data, 'getlist') and 'ingredients' in data:
+            try:
+                ingredients = json.loads(data['ingredients'])
+            except ValueError:
+                raise serializers.ValidationError(
+                    {'ingredients': 'Ожидается JSON-список ингредиентов'}
+                )
+            form = data.dict()
+            form['ingredients'] = ingredients
+            if 'tags' in data:
+                form['tags'] = data.getlist('tags')
+            data = form
+        return super().to_internal_value(data)
+
     def create(self, validated_data):
         """
         Создаёт объект рецепта.
         Создаёт связь многое-ко-многим с моделью Tag, Ingredient.
+        Заполняет маску тегов рецепта.
+        Публикует событие recipe_created (раскладка по лентам подписчиков,
+        похожие рецепты, индекс подбора - в process_outbox).
+        После коммита сбрасывает кэш ответов для анонимных юзеров.
         """
+        with transaction.atomic():
+            current_recipe = self.create_recipe(validated_data)
+            publish('recipe_created', recipe_id=current_recipe.pk)
+            transaction.on_commit(
+                lambda: invalidate_recipe_responses(current_recipe.pk)
+            )
+        return current_recipe
+
+    def create_recipe(self, validated_data):
+        """Создаёт рецепт со связями с Tag и Ingredient."""
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        current_recipe = Recipe.objects.create(**validated_data)
+        current_recipe = Recipe.objects.create(
+            **validated_data,
+            tags_mask=get_tags_mask(tag.bit for tag in tags)
+        )
         bulk_tags = [
             RecipeTag(
                 recipe=current_recipe,
@@ -236,13 +450,32 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         Частично обновляет существующй рецепт.
         Полностью перезаписывает связи IngredietnRecipe (если такое поле было
         передано).
+        Пересчитывает маску тегов (если переданы теги).
+        Публикует событие recipe_updated (похожие рецепты и индекс
+        подбора - в process_outbox) и меняет версии корзин с рецептом.
+        После коммита сбрасывает кэш ответов для анонимных юзеров и удаляет
+        заменённую картинку, если она больше не используется.
         """
-        instance.image = validated_data.get('image', instance.image)
-        if 'ingredients' in validated_data:
-            IngredientRecipe.objects.filter(recipe=instance).delete()
-            ingredients = validated_data.pop('ingredients')
-            self.create_ingredient_recipe_link(instance, ingredients)
-        return super().update(instance, validated_data)
+        old_image = instance.image.name
+        with transaction.atomic():
+            instance.image = validated_data.get('image', instance.image)
+            if 'tags' in validated_data:
+                instance.tags_mask = get_tags_mask(
+                    tag.bit for tag in validated_data['tags']
+                )
+            if 'ingredients' in validated_data:
+                IngredientRecipe.objects.filter(recipe=instance).delete()
+                ingredients = validated_data.pop('ingredients')
+                self.create_ingredient_recipe_link(instance, ingredients)
+            instance = super().update(instance, validated_data)
+            publish('recipe_updated', recipe_id=instance.pk)
+            bump_recipe_carts([instance.pk])
+            if instance.image.name != old_image:
+                delete_unused_images([old_image])
+            transaction.on_commit(
+                lambda: invalidate_recipe_responses(instance.pk)
+            )
+        return instance
 
     def check_positive(self, value, text):
         """Проверяет, что значение в поле > 0."""
@@ -298,6 +531,26 @@ class RecipeShortSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'cooking_time', 'image')
 
 
+class RecipeCoverageSerializer(RecipeShortSerializer):
+    """
+    Сериализатор для подбора рецептов по имеющимся ингредиентам.
+    Доп.поле coverage - доля ингредиентов рецепта, которые есть у юзера.
+    """
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeShortSerializer.Meta):
+        fields = RecipeShortSerializer.Meta.fields + ('coverage',)
+
+
+class PantrySerializer(serializers.Serializer):
+    """Сериализатор для списка id имеющихся у юзера ингредиентов."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.PANTRY_MAX_INGREDIENTS
+    )
+
+
 class UserSubscribeSerializer(UserBaseSerializer):
     """
     Сериализатор для показа юзера с его рецептами.
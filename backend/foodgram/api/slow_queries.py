@@ -0,0 +1,102 @@
+import os
+import re
+import traceback
+from collections import defaultdict
+from hashlib import md5
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from .models import SlowQuery
+
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDERS_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+SPACES_RE = re.compile(r'\s+')
+IGNORED_FILES = (
+    __file__, os.path.join(os.path.dirname(__file__), 'middleware.py')
+)
+
+
+def normalize_sql(sql):
+    """
+    Приводит SQL к общему виду: литералы и параметры заменяются на ?,
+    списки параметров IN (?, ?, ...) сворачиваются в (...).
+    """
+    sql = LITERAL_RE.sub('?', sql.replace('%s', '?'))
+    sql = PLACEHOLDERS_RE.sub('(...)', sql)
+    return SPACES_RE.sub(' ', sql).strip()
+
+
+def get_stack():
+    """Последние кадры стека из кода проекта (без библиотек)."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and frame.filename not in IGNORED_FILES
+        and 'site-packages' not in frame.filename
+    ]
+    return ''.join(
+        traceback.format_list(frames[-settings.SLOW_QUERY_STACK_DEPTH:])
+    )
+
+
+def make_slow_query(sql, duration):
+    """Медленный запрос без вьюсета (он известен только в конце запроса)."""
+    sql = normalize_sql(sql)
+    return SlowQuery(
+        fingerprint=md5(sql.encode()).hexdigest(),
+        sql=sql,
+        duration=duration,
+        stack=get_stack()
+    )
+
+
+def save_slow_queries(slow_queries, view):
+    """
+    Сохраняет медленные запросы и удаляет записи сверх
+    SLOW_QUERY_MAX_ROWS. Внутри незавершённой транзакции не пишет.
+    """
+    if not slow_queries or connection.in_atomic_block:
+        return
+    for slow_query in slow_queries:
+        slow_query.view = view
+    try:
+        last = SlowQuery.objects.bulk_create(slow_queries)[-1]
+        if last.pk is None:
+            last = SlowQuery.objects.only('pk').order_by('-pk').first()
+        SlowQuery.objects.filter(
+            pk__lte=last.pk - settings.SLOW_QUERY_MAX_ROWS
+        ).delete()
+    except DatabaseError:
+        pass
+
+
+def summarize_slow_queries(queryset):
+    """
+    Сводка по отпечаткам: количество, суммарное, p95 и максимальное
+    время, вьюсеты. Отсортирована по суммарному времени.
+    """
+    groups = defaultdict(lambda: {'durations': [], 'views': set()})
+    for fingerprint, sql, duration, view in queryset.values_list(
+        'fingerprint', 'sql', 'duration', 'view'
+    ).order_by():
+        group = groups[fingerprint]
+        group['sql'] = sql
+        group['durations'].append(duration)
+        group['views'].add(view)
+    summary = []
+    for fingerprint, group in groups.items():
+        durations = np.array(group['durations'])
+        summary.append({
+            'fingerprint': fingerprint,
+            'sql': group['sql'],
+            'views': ', '.join(sorted(filter(None, group['views']))),
+            'count': len(durations),
+            'total': durations.sum(),
+            'p95': np.percentile(durations, 95),
+            'max': durations.max(),
+        })
+    return sorted(summary, key=lambda row: row['total'], reverse=True)
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe
+from .testing import FoodgramTestCase
+
+
+class AdminTest(FoodgramTestCase):
+    """Страницы админки рецептов и юзеров на больших таблицах."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self.create_user(
+            'admin', is_staff=True, is_superuser=True
+        )
+        self.author = self.create_user('author')
+        self.tags = self.create_tags()
+        self.ingredients = self.create_ingredients('Мука', 'Яйца')
+        self.recipe = self.create_recipe(
+            self.author, self.tags, self.ingredients
+        )
+        self.client.force_login(self.admin)
+
+    def count_changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        urls = ('/admin/recipes/recipe/', '/admin/users/user/')
+        before = [self.count_changelist_queries(url) for url in urls]
+        for index in range(3):
+            self.create_recipe(
+                self.create_user(f'author{index}'),
+                self.tags, self.ingredients
+            )
+        self.assertEqual(
+            [self.count_changelist_queries(url) for url in urls], before
+        )
+
+    def test_change_pages_show_related_counts(self):
+        for url, link in (
+            (f'/admin/recipes/recipe/{self.recipe.pk}/change/',
+             f'recipe__id__exact={self.recipe.pk}'),
+            (f'/admin/users/user/{self.author.pk}/change/',
+             f'author__id__exact={self.author.pk}'),
+        ):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), link)
+
+    def test_add_pages_render_without_related_counts(self):
+        for url in ('/admin/recipes/recipe/add/', '/admin/users/user/add/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_delete_marks_recipe_for_deletion(self):
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipe.pk}/delete/',
+            {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            Recipe.all_objects.get(pk=self.recipe.pk).pending_deletion
+        )
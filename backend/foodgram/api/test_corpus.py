@@ -0,0 +1,63 @@
+import os
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import Recipe
+from users.models import User
+from .testing import FoodgramTestCase
+
+
+class CorpusTest(FoodgramTestCase):
+    """Выгрузка и загрузка рецептов в JSON Lines."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        tags = self.create_tags()
+        ingredients = self.create_ingredients('Мука', 'Яйца')
+        for index in range(3):
+            self.create_recipe(
+                self.author, tags[index % 2:], ingredients[index % 2:],
+                name=f'Рецепт {index}'
+            )
+        self.path = os.path.join(self.files_root, 'corpus.jsonl')
+        call_command('export_recipes', self.path, stdout=StringIO())
+
+    def get_corpus(self):
+        return sorted(
+            (
+                recipe.name, recipe.author.email, recipe.pub_date,
+                recipe.tags_mask,
+                sorted(recipe.tags.values_list('slug', flat=True)),
+                sorted(recipe.ingredients.values_list(
+                    'ingredient__name', 'amount'
+                ))
+            )
+            for recipe in Recipe.objects.all()
+        )
+
+    def import_corpus(self):
+        stderr = StringIO()
+        call_command(
+            'import_recipes', self.path, '--batch-size=2',
+            stdout=StringIO(), stderr=stderr
+        )
+        return stderr.getvalue()
+
+    def test_import_restores_exported_recipes(self):
+        corpus = self.get_corpus()
+        Recipe.all_objects.all().delete()
+        self.author.delete()
+        self.assertEqual(self.import_corpus(), '')
+        self.assertEqual(self.get_corpus(), corpus)
+
+    def test_username_conflict_is_reported(self):
+        Recipe.all_objects.all().delete()
+        User.objects.filter(pk=self.author.pk).update(
+            email='other@foodgram.ru'
+        )
+        report = self.import_corpus()
+        self.assertIn('Пропущено рецептов: 3', report)
+        self.assertIn('author', report)
+        self.assertFalse(Recipe.objects.exists())
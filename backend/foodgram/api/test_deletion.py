@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import (FavoriteRecipes, IngredientRecipe, Recipe,
+                            RecipeTag, ShoppingCart)
+from recipes.storage import image_storage
+from users.models import User
+from .testing import OTHER_IMAGE, FoodgramTestCase
+
+
+class BackgroundDeletionTest(FoodgramTestCase):
+    """Удаление рецептов и юзеров пометкой и командой process_deletions."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.reader = self.create_user('reader')
+        tags = self.create_tags()
+        ingredients = self.create_ingredients('Мука', 'Яйца')
+        self.recipe = self.create_recipe(self.author, tags, ingredients)
+        self.other = self.create_recipe(
+            self.reader, tags, ingredients, image=OTHER_IMAGE
+        )
+        for user, recipe in (
+            (self.reader, self.recipe), (self.author, self.other)
+        ):
+            for action in ('favorite', 'shopping_cart'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.get_client(user).post(
+                        f'/api/recipes/{recipe.pk}/{action}/'
+                    )
+                self.assertEqual(response.status_code, 201)
+        self.process_outbox()
+
+    def process_deletions(self):
+        output = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('process_deletions', batch_size=1, stdout=output)
+        return output.getvalue()
+
+    def assert_recipe_rows_deleted(self, recipe):
+        self.assertFalse(Recipe.all_objects.filter(pk=recipe.pk).exists())
+        for model in (IngredientRecipe, RecipeTag, FavoriteRecipes,
+                      ShoppingCart):
+            self.assertFalse(model.objects.filter(recipe=recipe).exists())
+
+    def test_deleted_recipe_is_hidden_then_removed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.get_client(self.author).delete(
+                f'/api/recipes/{self.recipe.pk}/'
+            )
+        self.assertEqual(response.status_code, 204)
+        response = self.get_client().get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(
+            Recipe.all_objects.get(pk=self.recipe.pk).pending_deletion
+        )
+        self.assertIn('Удалено рецептов: 1, юзеров: 0',
+                      self.process_deletions())
+        self.assert_recipe_rows_deleted(self.recipe)
+        self.assertFalse(image_storage.exists(self.recipe.image.name))
+        self.assertTrue(Recipe.objects.filter(pk=self.other.pk).exists())
+
+    def test_deleted_user_is_deactivated_then_removed(self):
+        self.assertEqual(
+            Recipe.objects.get(pk=self.other.pk).favorites_count, 1
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.get_client(self.author).delete(
+                '/api/users/me/', {'current_password': 'password-12345'},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(User.objects.get(pk=self.author.pk).is_active)
+        response = self.get_client().get('/api/recipes/')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.other.pk]
+        )
+        self.assertIn('Удалено рецептов: 1, юзеров: 1',
+                      self.process_deletions())
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assert_recipe_rows_deleted(self.recipe)
+        self.assertFalse(FavoriteRecipes.objects.filter(
+            recipe=self.other
+        ).exists())
+        self.assertEqual(
+            Recipe.objects.get(pk=self.other.pk).favorites_count, 0
+        )
@@ -0,0 +1,90 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import FeedEntry
+from .testing import FoodgramTestCase
+
+
+class FeedTest(FoodgramTestCase):
+    """Лента подписок: раскладка по лентам и курсорная пагинация."""
+
+    def setUp(self):
+        super().setUp()
+        self.tags = self.create_tags()
+        self.ingredients = self.create_ingredients('Мука', 'Соль')
+        self.author = self.create_user('author')
+        self.reader = self.create_user('reader')
+        self.client = self.get_client(self.reader)
+        response = self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+
+    def create_recipes(self, count):
+        return [
+            self.create_recipe(
+                self.author, self.tags, self.ingredients, name=f'Рецепт {i}'
+            ).pk
+            for i in range(count)
+        ]
+
+    def read_feed(self, limit):
+        """Все страницы ленты по ссылкам next."""
+        pages = []
+        url = f'/api/recipes/feed/?limit={limit}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([recipe['id'] for recipe in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_recipes_are_fanned_out_to_followers(self):
+        recipe_ids = self.create_recipes(5)
+        self.process_outbox()
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 5
+        )
+        pages = self.read_feed(limit=2)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), recipe_ids[::-1])
+
+    def test_previous_link_returns_previous_page(self):
+        self.create_recipes(4)
+        self.process_outbox()
+        first = self.client.get('/api/recipes/feed/?limit=2').data
+        second = self.client.get(first['next']).data
+        previous = self.client.get(second['previous']).data
+        self.assertEqual(previous['results'], first['results'])
+
+    def test_unsubscribe_clears_feed(self):
+        self.create_recipes(2)
+        self.process_outbox()
+        self.client.delete(f'/api/users/{self.author.pk}/subscribe/')
+        self.process_outbox()
+        self.assertEqual(self.read_feed(limit=6), [[]])
+
+    @override_settings(FEED_PULL_FOLLOWERS_THRESHOLD=1)
+    def test_popular_authors_are_pulled_on_read(self):
+        recipe_ids = self.create_recipes(3)
+        self.process_outbox()
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.read_feed(limit=2), [
+            recipe_ids[:0:-1], recipe_ids[:1]
+        ])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/feed/?cursor=bad')
+        self.assertEqual(response.status_code, 404)
+
+    def count_feed_queries(self, limit):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/recipes/feed/?limit={limit}')
+        self.assertEqual(len(response.data['results']), limit)
+        return len(queries)
+
+    def test_page_queries_do_not_grow_with_page_size(self):
+        self.create_recipes(6)
+        self.process_outbox()
+        self.assertEqual(
+            self.count_feed_queries(1), self.count_feed_queries(6)
+        )
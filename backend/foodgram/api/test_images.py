@@ -0,0 +1,69 @@
+import base64
+import hashlib
+import os
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import override_settings
+
+from recipes.storage import HASH_LENGTH, image_storage
+from .testing import IMAGE, OTHER_IMAGE, FoodgramTestCase
+
+
+class ContentHashedImageTest(FoodgramTestCase):
+    """Картинки рецептов под именами из хэша содержимого."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.tags = self.create_tags()
+        self.ingredients = self.create_ingredients('Мука')
+
+    def test_same_image_is_stored_once(self):
+        first = self.create_recipe(self.author, self.tags, self.ingredients)
+        second = self.create_recipe(self.author, self.tags, self.ingredients)
+        content = base64.b64decode(IMAGE.split(',')[1])
+        digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+        self.assertEqual(first.image.name, f'recipes/images/{digest}.png')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(len(image_storage.listdir('recipes/images')[1]), 1)
+
+    def test_replaced_image_is_deleted_only_without_recipes(self):
+        first = self.create_recipe(self.author, self.tags, self.ingredients)
+        second = self.create_recipe(self.author, self.tags, self.ingredients)
+        client = self.get_client(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.patch(
+                f'/api/recipes/{first.pk}/', {'image': OTHER_IMAGE},
+                format='json'
+            )
+        first.refresh_from_db()
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertTrue(image_storage.exists(second.image.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            client.patch(
+                f'/api/recipes/{second.pk}/', {'image': OTHER_IMAGE},
+                format='json'
+            )
+        second.refresh_from_db()
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(
+            image_storage.listdir('recipes/images')[1],
+            [os.path.basename(first.image.name)]
+        )
+
+    def test_collect_deletes_only_old_orphans(self):
+        recipe = self.create_recipe(self.author, self.tags, self.ingredients)
+        orphan = image_storage.save(
+            'recipes/images/orphan.png', ContentFile(b'orphan')
+        )
+        output = StringIO()
+        call_command('collect_recipe_images', stdout=output)
+        self.assertIn('Удалено картинок: 0', output.getvalue())
+        with override_settings(RECIPE_IMAGE_GC_GRACE=timedelta(hours=-1)):
+            call_command('collect_recipe_images', stdout=output)
+        self.assertIn('Удалено картинок: 1', output.getvalue())
+        self.assertFalse(image_storage.exists(orphan))
+        self.assertTrue(image_storage.exists(recipe.image.name))
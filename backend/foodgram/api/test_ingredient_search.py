@@ -0,0 +1,58 @@
+from threading import Thread
+from unittest.mock import patch
+
+from recipes.ingredient_search import ingredient_search_index
+from .testing import FoodgramTestCase
+
+
+class IngredientSearchTest(FoodgramTestCase):
+    """Ранжированный поиск ингредиентов с учётом опечаток."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_ingredients(
+            'Молоко', 'Кокосовое молоко', 'Мука', 'Молотый перец', 'Соль'
+        )
+        self.admin = self.create_user('admin', is_staff=True)
+
+    def search(self, query):
+        response = self.get_client().get(
+            '/api/ingredients/', {'name': query}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_name_prefix_goes_before_word_prefix(self):
+        self.assertEqual(
+            self.search('моло'),
+            ['Молоко', 'Молотый перец', 'Кокосовое молоко']
+        )
+
+    def test_typo_finds_similar_names(self):
+        self.assertEqual(self.search('малоко')[0], 'Молоко')
+        self.assertEqual(self.search('сахар'), [])
+
+    def test_new_ingredient_is_found_after_create(self):
+        self.assertEqual(self.search('сах'), [])
+        response = self.get_client(self.admin).post(
+            '/api/ingredients/',
+            {'name': 'Сахар', 'measurement_unit': 'г'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.search('сах'), ['Сахар'])
+
+    def test_search_in_synced_index_does_not_wait_for_lock(self):
+        self.search('моло')
+        results = []
+        version = ingredient_search_index.version
+        # Поток не видит тестовую транзакцию, версию ему подставляем.
+        with ingredient_search_index.lock, patch(
+            'recipes.ingredient_search.get_version', return_value=version
+        ):
+            thread = Thread(target=lambda: results.append(
+                ingredient_search_index.search('соль', 10)
+            ))
+            thread.start()
+            thread.join(timeout=5)
+        self.assertEqual(len(results), 1)
@@ -0,0 +1,39 @@
+from prometheus_client import REGISTRY
+
+from .testing import FoodgramTestCase
+
+
+class MetricsTest(FoodgramTestCase):
+    """Метрики запросов в формате Prometheus."""
+
+    def get_sample(self, name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_is_counted_by_viewset_and_action(self):
+        view_labels = {'viewset': 'IngredientViewSet', 'action': 'list'}
+        labels = {**view_labels, 'method': 'GET', 'status': '200'}
+        count = self.get_sample(
+            'foodgram_request_duration_seconds_count', labels
+        )
+        queries = self.get_sample(
+            'foodgram_request_db_queries_count', view_labels
+        )
+        response = self.get_client().get('/api/ingredients/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_sample(
+            'foodgram_request_duration_seconds_count', labels
+        ), count + 1)
+        self.assertEqual(self.get_sample(
+            'foodgram_request_db_queries_count', view_labels
+        ), queries + 1)
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        self.get_client().get('/api/tags/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        content = response.content.decode()
+        self.assertIn('# TYPE foodgram_request_duration_seconds histogram',
+                      content)
+        self.assertIn('viewset="TagViewSet"', content)
+        self.assertIn('foodgram_active_requests', content)
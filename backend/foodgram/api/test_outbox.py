@@ -0,0 +1,139 @@
+import base64
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+
+from recipes.models import Recipe
+from .models import OutboxEvent
+from .outbox import HANDLERS, process_events, publish
+from .testing import IMAGE, FoodgramTestCase
+
+
+class AdminRecipeEventsTest(FoodgramTestCase):
+    """Рецепты из админки публикуют те же события, что и из API."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self.create_user(
+            'admin', is_staff=True, is_superuser=True
+        )
+        self.author = self.create_user('author')
+        self.tags = self.create_tags()
+        self.ingredients = self.create_ingredients('Мука')
+        self.client.force_login(self.admin)
+
+    def get_form(self, url, **fields):
+        """Данные формы рецепта с инлайнами тегов и ингредиентов."""
+        response = self.client.get(url)
+        data = {
+            'author': self.author.pk,
+            'name': 'Блины',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'portions': 2,
+        }
+        for inline in response.context['inline_admin_formsets']:
+            formset = inline.formset
+            prefix = formset.prefix
+            data.update({
+                f'{prefix}-TOTAL_FORMS': 1,
+                f'{prefix}-INITIAL_FORMS': formset.initial_form_count(),
+                f'{prefix}-MIN_NUM_FORMS': 0,
+                f'{prefix}-MAX_NUM_FORMS': 1000,
+            })
+            for form in formset.initial_forms:
+                data[f'{form.prefix}-id'] = form.instance.pk
+                data[f'{form.prefix}-recipe'] = form.instance.recipe_id
+            if formset.model.__name__ == 'RecipeTag':
+                data[f'{prefix}-0-tag'] = self.tags[0].pk
+            else:
+                data[f'{prefix}-0-ingredient'] = self.ingredients[0].pk
+                data[f'{prefix}-0-amount'] = 10
+        data.update(fields)
+        return data
+
+    def get_events(self):
+        return list(OutboxEvent.objects.values_list('event_type', 'payload'))
+
+    def test_admin_create_and_change_publish_events(self):
+        image = SimpleUploadedFile(
+            'photo.png', base64.b64decode(IMAGE.split(',')[1]),
+            content_type='image/png'
+        )
+        response = self.client.post(
+            '/admin/recipes/recipe/add/',
+            self.get_form('/admin/recipes/recipe/add/', image=image)
+        )
+        self.assertEqual(response.status_code, 302)
+        recipe = Recipe.objects.get()
+        self.assertEqual(
+            self.get_events(),
+            [('recipe_created', {'recipe_id': recipe.pk})]
+        )
+        self.process_outbox()
+        url = f'/admin/recipes/recipe/{recipe.pk}/change/'
+        response = self.client.post(url, self.get_form(url, name='Оладьи'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            self.get_events(),
+            [('recipe_updated', {'recipe_id': recipe.pk})]
+        )
+        self.assertEqual(Recipe.objects.get().tags_mask, 1 << self.tags[0].bit)
+
+
+@override_settings(
+    OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_DELAY=10, OUTBOX_MAX_RETRY_DELAY=15
+)
+class OutboxRetryTest(FoodgramTestCase):
+    """Повторы неудачных событий outbox с растущей паузой."""
+
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        patcher = patch.dict(HANDLERS, {'test_event': [self.handler]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def handler(self, fail):
+        self.calls.append(fail)
+        if fail:
+            raise ValueError('ошибка обработчика')
+
+    def process_at(self, now):
+        with patch('api.outbox.timezone.now', return_value=now):
+            return process_events(batch_size=10)
+
+    def test_failed_event_is_retried_with_backoff(self):
+        publish('test_event', fail=True)
+        now = timezone.now()
+        self.assertEqual(self.process_at(now), (0, 1))
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('ошибка обработчика', event.last_error)
+        self.assertEqual(event.next_attempt_at, now + timedelta(seconds=10))
+        self.assertEqual(self.process_at(now + timedelta(seconds=5)), (0, 0))
+        self.assertEqual(self.process_at(event.next_attempt_at), (0, 1))
+        event.refresh_from_db()
+        self.assertEqual(
+            event.next_attempt_at - now, timedelta(seconds=10 + 15)
+        )
+        self.process_at(event.next_attempt_at)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 3)
+        self.assertEqual(
+            self.process_at(event.next_attempt_at + timedelta(days=1)),
+            (0, 0)
+        )
+        self.assertEqual(len(self.calls), 3)
+
+    def test_successful_event_is_deleted(self):
+        publish('test_event', fail=False)
+        publish('unknown_event')
+        self.assertEqual(self.process_at(timezone.now()), (1, 1))
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('event_type', flat=True)),
+            ['unknown_event']
+        )
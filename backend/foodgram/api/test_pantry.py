@@ -0,0 +1,70 @@
+from recipes.pantry import pantry_index
+from .testing import FoodgramTestCase
+
+
+class PantryTest(FoodgramTestCase):
+    """Подбор рецептов по имеющимся ингредиентам."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.flour, self.eggs, self.milk = self.create_ingredients(
+            'Мука', 'Яйца', 'Молоко'
+        )
+        self.salt, = self.create_ingredients(
+            'Соль', measurement_unit='по вкусу'
+        )
+        self.pancakes = self.create_recipe(
+            self.author, [], [self.flour, self.eggs, self.milk, self.salt]
+        )
+        self.omelette = self.create_recipe(
+            self.author, [], [self.eggs, self.milk]
+        )
+        self.boiled_eggs = self.create_recipe(
+            self.author, [], [self.eggs, self.salt]
+        )
+        self.process_outbox()
+
+    def match(self, *ingredients):
+        query = '&'.join(
+            f'ingredients={ingredient.pk}' for ingredient in ingredients
+        )
+        response = self.get_client().get(f'/api/recipes/pantry/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [(item['id'], item['coverage']) for item in response.data]
+
+    def delete_recipe(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.get_client(self.author).delete(
+                f'/api/recipes/{recipe.pk}/'
+            )
+        self.assertEqual(response.status_code, 204)
+
+    def test_recipes_are_ranked_by_coverage(self):
+        self.assertEqual(self.match(self.eggs, self.milk), [
+            (self.omelette.pk, 1.0),
+            (self.boiled_eggs.pk, 1.0),
+            (self.pancakes.pk, 2 / 3),
+        ])
+
+    def test_index_follows_recipe_updates(self):
+        self.match(self.eggs)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_client(self.author).patch(
+                f'/api/recipes/{self.omelette.pk}/',
+                {'ingredients': [{'id': self.flour.pk, 'amount': 1}]},
+                format='json'
+            )
+        self.process_outbox()
+        self.assertEqual(self.match(self.flour), [
+            (self.omelette.pk, 1.0), (self.pancakes.pk, 1 / 3)
+        ])
+
+    def test_deleted_recipes_are_not_matched(self):
+        self.match(self.eggs)
+        self.delete_recipe(self.boiled_eggs)
+        self.delete_recipe(self.omelette)
+        expected = [(self.pancakes.pk, 1 / 3)]
+        self.assertEqual(self.match(self.eggs), expected)
+        pantry_index.version = None
+        self.assertEqual(self.match(self.eggs), expected)
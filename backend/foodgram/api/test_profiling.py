@@ -0,0 +1,75 @@
+import json
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .testing import FoodgramTestCase
+
+
+class ProfilingTest(FoodgramTestCase):
+    """Профилирование запросов по требованию админа."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self.create_user('admin', is_staff=True)
+        self.user = self.create_user('user')
+
+    def get_client(self, user=None):
+        """
+        Клиент с токеном: мидлварь определяет юзера сама, через
+        аутентификаторы DRF.
+        """
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def download(self, url, user):
+        response = self.get_client(user).get(url)
+        content = b''.join(getattr(response, 'streaming_content', []))
+        return response, content
+
+    def test_admin_gets_profile_by_header(self):
+        response = self.get_client(self.admin).get(
+            '/api/recipes/', HTTP_X_PROFILE='prof'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['X-Profile'].endswith('.prof/'))
+        download, content = self.download(response['X-Profile'], self.admin)
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(content)
+        download, content = self.download(
+            response['X-Profile-Queries'], self.admin
+        )
+        self.assertEqual(download.status_code, 200)
+        queries = json.loads(content)
+        self.assertEqual(queries['path'], '/api/recipes/')
+        self.assertEqual(queries['count'], len(queries['queries']))
+
+    def test_admin_gets_collapsed_stacks_by_param(self):
+        response = self.get_client(self.admin).get(
+            '/api/recipes/?profile=collapsed'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['X-Profile'].endswith('.collapsed/'))
+
+    def test_profiling_is_only_for_admins(self):
+        for user in (None, self.user):
+            with self.subTest(user=user):
+                response = self.get_client(user).get(
+                    '/api/ingredients/', HTTP_X_PROFILE='prof'
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('X-Profile', response)
+
+    def test_download_is_only_for_admins(self):
+        response = self.get_client(self.admin).get(
+            '/api/recipes/', HTTP_X_PROFILE='prof'
+        )
+        download = self.get_client(self.user).get(response['X-Profile'])
+        self.assertEqual(download.status_code, 403)
+        download = self.get_client(self.admin).get(
+            '/api/profiles/..%2Fsettings.py/'
+        )
+        self.assertEqual(download.status_code, 404)
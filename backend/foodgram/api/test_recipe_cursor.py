@@ -0,0 +1,77 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe
+from .testing import FoodgramTestCase
+
+
+class RecipeCursorPaginationTest(FoodgramTestCase):
+    """Keyset-пагинация списка рецептов в порядке ?ordering=."""
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        tags = self.create_tags()
+        ingredients = self.create_ingredients('Мука')
+        self.recipes = [
+            self.create_recipe(
+                author, tags, ingredients, name=f'Рецепт {index}',
+                cooking_time=10 + index % 3
+            )
+            for index in range(11)
+        ]
+        # Повторы значений сортировки на границах страниц.
+        for recipe in self.recipes:
+            Recipe.objects.filter(pk=recipe.pk).update(
+                favorites_count=recipe.pk % 2,
+                trending=float(recipe.pk % 3) / 7
+            )
+        self.anonymous = self.get_client()
+
+    def walk(self, url):
+        """Проходит все страницы по ссылкам next, собирая id и SQL."""
+        ids = []
+        sql = []
+        pages = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.anonymous.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            sql.extend(query['sql'] for query in queries)
+            url = response.data['next']
+        return ids, sql, pages
+
+    def test_pages_cover_all_recipes_in_order(self):
+        for ordering, expected in (
+            ('popularity', Recipe.objects.order_by('-favorites_count', '-id')),
+            ('cooking_time', Recipe.objects.order_by('cooking_time', 'id')),
+            ('trending', Recipe.objects.order_by(
+                '-trending', '-pub_date', '-id'
+            )),
+            ('-pub_date', Recipe.objects.order_by('-pub_date', '-id')),
+        ):
+            with self.subTest(ordering=ordering):
+                ids, sql, pages = self.walk(
+                    f'/api/recipes/?cursor=&ordering={ordering}&limit=3'
+                )
+                self.assertEqual(
+                    ids, list(expected.values_list('id', flat=True))
+                )
+                self.assertEqual(len(pages), 4)
+                self.assertFalse(
+                    any('OFFSET' in query for query in sql), sql
+                )
+
+    def test_previous_link_returns_previous_page(self):
+        _, _, pages = self.walk('/api/recipes/?cursor=&ordering=popularity'
+                                '&limit=4')
+        response = self.anonymous.get(pages[2]['previous'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], pages[1]['results'])
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.anonymous.get('/api/recipes/?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
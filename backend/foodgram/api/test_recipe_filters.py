@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .testing import FoodgramTestCase
+
+
+class RecipeListFilterTest(FoodgramTestCase):
+    """Фильтры is_favorited и is_in_shopping_cart списка рецептов."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+        author = self.create_user('author')
+        tags = self.create_tags()
+        ingredients = self.create_ingredients('Мука')
+        self.favorite, self.in_cart, self.both, self.other = [
+            self.create_recipe(author, tags, ingredients, name=name)
+            for name in ('Избранное', 'Корзина', 'Оба', 'Другой')
+        ]
+        self.user_client = self.get_client(self.user)
+        for action, recipes in (
+            ('favorite', (self.favorite, self.both)),
+            ('shopping_cart', (self.in_cart, self.both)),
+        ):
+            for recipe in recipes:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.user_client.post(
+                        f'/api/recipes/{recipe.pk}/{action}/'
+                    )
+                self.assertEqual(response.status_code, 201)
+
+    def filter_ids(self, client=None, **params):
+        client = client or self.user_client
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        self.queries = [query['sql'] for query in queries]
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_filters_and_their_negations(self):
+        cases = (
+            ({'is_favorited': 1}, {self.favorite, self.both}),
+            ({'is_favorited': 0}, {self.in_cart, self.other}),
+            ({'is_in_shopping_cart': 1}, {self.in_cart, self.both}),
+            ({'is_in_shopping_cart': 0}, {self.favorite, self.other}),
+            ({'is_favorited': 1, 'is_in_shopping_cart': 0}, {self.favorite}),
+            ({'is_favorited': 1, 'tags': 'tag0'}, {self.favorite, self.both}),
+        )
+        for params, recipes in cases:
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.filter_ids(**params),
+                    {recipe.pk for recipe in recipes}
+                )
+
+    def test_filters_use_exists_without_distinct(self):
+        self.filter_ids(is_favorited=1, is_in_shopping_cart=0)
+        page_query = next(
+            sql for sql in self.queries
+            if 'FROM "recipes_recipe"' in sql and 'LIMIT' in sql
+        )
+        self.assertIn('EXISTS', page_query)
+        self.assertNotIn('DISTINCT', page_query)
+
+    def test_filters_are_ignored_for_anonymous(self):
+        self.assertEqual(
+            self.filter_ids(self.get_client(), is_favorited=1),
+            {self.favorite.pk, self.in_cart.pk, self.both.pk, self.other.pk}
+        )
@@ -0,0 +1,91 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe, SharedVersion
+from .testing import FoodgramTestCase
+
+
+class AnonymousResponseCacheTest(FoodgramTestCase):
+    """Кэш ответов списка и рецепта для анонимных юзеров."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.tags = self.create_tags()
+        self.ingredients = self.create_ingredients('Мука')
+        self.recipe = self.create_recipe(
+            self.author, self.tags, self.ingredients, name='Блины'
+        )
+        self.anonymous = self.get_client()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.anonymous.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def rename_recipe(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.get_client(self.author).patch(
+                f'/api/recipes/{self.recipe.pk}/', {'name': name},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_repeated_requests_are_served_from_cache(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/'):
+            with self.subTest(url=url):
+                data, queries = self.get(url)
+                cached_data, cached_queries = self.get(url)
+                self.assertEqual(cached_data, data)
+                self.assertEqual(cached_queries, 1)
+                self.assertGreater(queries, cached_queries)
+
+    def test_query_parameter_order_shares_cache_entry(self):
+        self.get('/api/recipes/?limit=2&page=1')
+        _, queries = self.get('/api/recipes/?page=1&limit=2')
+        self.assertEqual(queries, 1)
+
+    def test_recipe_write_invalidates_list_and_detail(self):
+        self.get('/api/recipes/')
+        self.get(f'/api/recipes/{self.recipe.pk}/')
+        self.rename_recipe('Оладьи')
+        data, _ = self.get('/api/recipes/')
+        self.assertEqual(data['results'][0]['name'], 'Оладьи')
+        data, _ = self.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(data['name'], 'Оладьи')
+
+    def test_tag_and_ingredient_renames_reach_cached_detail(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        self.get(url)
+        admin = self.get_client(self.create_user('admin', is_staff=True))
+        for path, data in (
+            (f'/api/tags/{self.tags[0].pk}/', {'name': 'Завтрак'}),
+            (f'/api/ingredients/{self.ingredients[0].pk}/',
+             {'name': 'Мука пшеничная'}),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = admin.patch(path, data, format='json')
+            self.assertEqual(response.status_code, 200)
+        data, _ = self.get(url)
+        self.assertIn('Завтрак', [tag['name'] for tag in data['tags']])
+        self.assertEqual(data['ingredients'][0]['name'], 'Мука пшеничная')
+
+    def test_recipe_versions_are_not_shared_versions(self):
+        self.rename_recipe('Оладьи')
+        self.assertFalse(SharedVersion.objects.filter(
+            key=f'recipes:{self.recipe.pk}'
+        ).exists())
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).version,
+            self.recipe.version + 1
+        )
+
+    def test_authenticated_users_bypass_cache(self):
+        client = self.get_client(self.create_user('reader'))
+        client.get(f'/api/recipes/{self.recipe.pk}/')
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            name='Без сброса кэша'
+        )
+        response = client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.data['name'], 'Без сброса кэша')
@@ -0,0 +1,89 @@
+from concurrent.futures import Future
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from recipes import shopping_list
+from .testing import FoodgramTestCase
+
+
+class ShoppingListTest(FoodgramTestCase):
+    """Список покупок: версия корзины в ETag, PDF из кэша на диске."""
+
+    url = '/api/recipes/download_shopping_cart/'
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('reader')
+        self.client = self.get_client(self.user)
+        self.flour, self.salt = self.create_ingredients('Мука', 'Соль')
+        self.recipe = self.create_recipe(
+            self.create_user('author'), [], [self.flour], portions=2
+        )
+        self.client.post(f'/api/recipes/{self.recipe.pk}/shopping_cart/')
+
+    def download(self, url=None, **headers):
+        return self.client.get(url or self.url, **headers)
+
+    def test_text_list_sums_ingredients(self):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('▻ Мука (г) - 10', response.content.decode())
+        self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/',
+            {'portions_to_shop': 6}, format='json'
+        )
+        self.assertIn('▻ Мука (г) - 30', self.download().content.decode())
+
+    def test_etag_follows_cart_version(self):
+        etag = self.download()['ETag']
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/',
+            {'portions_to_shop': 4}, format='json'
+        )
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_ingredient_change_changes_etag(self):
+        etag = self.download()['ETag']
+        admin = self.create_user('admin', is_staff=True, is_superuser=True)
+        self.get_client(admin).patch(
+            f'/api/ingredients/{self.flour.pk}/', {'name': 'Мука ржаная'},
+            format='json'
+        )
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Мука ржаная', response.content.decode())
+
+    @override_settings(SHOPPING_LIST_PDF_ACCEL_REDIRECT=True)
+    def test_pdf_is_rendered_once_per_version(self):
+        response = self.download(f'{self.url}?format=pdf')
+        self.assertEqual(response.status_code, 200)
+        path = response['X-Accel-Redirect']
+        with patch.object(shopping_list, 'render_pdf') as render_pdf:
+            response = self.download(f'{self.url}?format=pdf')
+        render_pdf.assert_not_called()
+        self.assertEqual(response['X-Accel-Redirect'], path)
+
+    @override_settings(SHOPPING_LIST_PDF_ACCEL_REDIRECT=False)
+    def test_pdf_file_response(self):
+        response = self.download(f'{self.url}?format=pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(
+            b'%PDF'
+        ))
+
+    @override_settings(SHOPPING_LIST_PDF_WAIT=0)
+    def test_slow_pdf_returns_accepted_with_poll_url(self):
+        self.addCleanup(shopping_list.pending.clear)
+        with patch.object(shopping_list, 'executor') as executor:
+            executor.submit.return_value = Future()
+            response = self.download(f'{self.url}?format=pdf')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertTrue(response['Location'].endswith(
+            f'{self.url}?format=pdf'
+        ))
@@ -0,0 +1,73 @@
+from django.test import override_settings
+
+from recipes.models import SimilarRecipe
+from recipes.similarity import rebuild_similar_recipes
+from .testing import FoodgramTestCase
+
+
+class SimilarRecipesTest(FoodgramTestCase):
+    """Похожие рецепты: пересчёт после записи рецепта и выдача."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.tags = self.create_tags(1)
+        self.flour, self.eggs, self.milk, self.salt = self.create_ingredients(
+            'Мука', 'Яйца', 'Молоко', 'Соль'
+        )
+
+    def get_similar_ids(self, recipe):
+        response = self.get_client().get(f'/api/recipes/{recipe.pk}/similar/')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+
+    def test_similar_recipes_are_ordered_by_score(self):
+        pancakes = self.create_recipe(
+            self.author, self.tags, [self.flour, self.eggs, self.milk]
+        )
+        crepes = self.create_recipe(
+            self.author, self.tags, [self.flour, self.eggs, self.milk]
+        )
+        bread = self.create_recipe(self.author, [], [self.flour, self.salt])
+        self.process_outbox()
+        self.assertEqual(self.get_similar_ids(pancakes), [crepes.pk, bread.pk])
+        self.assertEqual(self.get_similar_ids(bread), [crepes.pk, pancakes.pk])
+
+    @override_settings(SIMILAR_RECIPES_TOP_K=1)
+    def test_neighbour_lists_are_backfilled(self):
+        pancakes = self.create_recipe(
+            self.author, [], [self.flour, self.eggs]
+        )
+        crepes = self.create_recipe(self.author, [], [self.flour, self.eggs])
+        bread = self.create_recipe(self.author, [], [self.flour, self.salt])
+        self.process_outbox()
+        self.assertEqual(self.get_similar_ids(pancakes), [crepes.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_client(self.author).patch(
+                f'/api/recipes/{crepes.pk}/',
+                self.get_recipe_data([], [self.milk]),
+                format='json'
+            )
+        self.process_outbox()
+        self.assertEqual(self.get_similar_ids(pancakes), [bread.pk])
+        self.assertEqual(self.get_similar_ids(crepes), [])
+
+    @override_settings(SIMILAR_RECIPES_MAX_CANDIDATES=2)
+    def test_common_ingredients_do_not_make_candidates(self):
+        recipes = [
+            self.create_recipe(self.author, [], [self.salt, ingredient])
+            for ingredient in (self.flour, self.flour, self.eggs)
+        ]
+        self.process_outbox()
+        self.assertEqual(self.get_similar_ids(recipes[0]), [recipes[1].pk])
+        self.assertEqual(self.get_similar_ids(recipes[2]), [])
+        incremental = set(
+            SimilarRecipe.objects.values_list('recipe', 'similar', 'score')
+        )
+        rebuild_similar_recipes()
+        self.assertEqual(
+            set(SimilarRecipe.objects.values_list(
+                'recipe', 'similar', 'score'
+            )),
+            incremental
+        )
@@ -0,0 +1,64 @@
+from django.test import override_settings
+from rest_framework.test import APITransactionTestCase
+
+from .models import SlowQuery
+from .slow_queries import normalize_sql
+from .testing import TEST_CACHES, FoodgramTestCase
+
+
+@override_settings(CACHES=TEST_CACHES, SLOW_QUERY_THRESHOLD=0)
+class SlowQueryCaptureTest(APITransactionTestCase):
+    """
+    Запись медленных запросов мидлварью.
+    Внутри транзакции запросы не пишутся, поэтому тест без обёртки
+    TestCase.
+    """
+
+    def test_slow_queries_are_saved_with_view(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        slow_query = SlowQuery.objects.get()
+        self.assertEqual(slow_query.view, 'TagViewSet.list')
+        self.assertIn('FROM "recipes_tag"', slow_query.sql)
+        self.assertIn('test_slow_queries.py', slow_query.stack)
+
+    @override_settings(SLOW_QUERY_MAX_ROWS=2)
+    def test_old_rows_are_pruned(self):
+        for _ in range(3):
+            self.client.get('/api/tags/')
+        self.assertEqual(SlowQuery.objects.count(), 2)
+
+
+class SlowQuerySummaryTest(FoodgramTestCase):
+    """Нормализация SQL и сводка по отпечаткам в админке."""
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql(
+                "SELECT *  FROM t WHERE id IN (%s, %s, %s) AND name = 'x'"
+                ' LIMIT 21'
+            ),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?'
+        )
+
+    def test_changelist_shows_summary_by_fingerprint(self):
+        SlowQuery.objects.bulk_create([
+            SlowQuery(fingerprint='a', sql='SELECT a', duration=duration,
+                      view='TagViewSet.list')
+            for duration in (0.1, 0.2, 0.3)
+        ] + [
+            SlowQuery(fingerprint='b', sql='SELECT b', duration=1,
+                      view='RecipeViewSet.list')
+        ])
+        self.client.force_login(
+            self.create_user('admin', is_staff=True, is_superuser=True)
+        )
+        response = self.client.get('/admin/api/slowquery/')
+        self.assertEqual(response.status_code, 200)
+        summary = response.context['summary']
+        self.assertEqual(
+            [(row['fingerprint'], row['count']) for row in summary],
+            [('b', 1), ('a', 3)]
+        )
+        self.assertAlmostEqual(summary[1]['max'], 0.3)
+        self.assertEqual(summary[1]['views'], 'TagViewSet.list')
@@ -0,0 +1,67 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe, Tag
+from .testing import FoodgramTestCase
+
+
+class TagMaskTest(FoodgramTestCase):
+    """Фильтр рецептов по маске тегов и обновление масок."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self.create_user('admin', is_staff=True)
+        self.author = self.create_user('author')
+        self.tags = self.create_tags(3)
+        ingredients = self.create_ingredients('Мука')
+        self.first = self.create_recipe(
+            self.author, self.tags[:1], ingredients
+        )
+        self.second = self.create_recipe(
+            self.author, self.tags[1:2], ingredients
+        )
+
+    def filter_ids(self, *slugs):
+        response = self.get_client().get('/api/recipes/', {'tags': slugs})
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_filter_by_any_of_tags(self):
+        self.assertEqual(self.filter_ids('tag0'), {self.first.pk})
+        self.assertEqual(
+            self.filter_ids('tag0', 'tag1'), {self.first.pk, self.second.pk}
+        )
+        self.assertEqual(self.filter_ids('tag2'), set())
+
+    def test_renamed_slug_is_filtered(self):
+        response = self.get_client(self.admin).patch(
+            f'/api/tags/{self.tags[0].pk}/', {'slug': 'breakfast'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.filter_ids('breakfast'), {self.first.pk})
+
+    def test_deleted_tag_bit_is_cleared_only_in_linked_recipes(self):
+        bit = self.tags[0].bit
+        second_mask = Recipe.objects.get(pk=self.second.pk).tags_mask
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_client(self.admin).delete(
+                f'/api/tags/{self.tags[0].pk}/'
+            )
+        self.assertEqual(response.status_code, 204)
+        update = next(
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE "recipes_recipe"')
+        )
+        self.assertIn('&', update.split('WHERE', 1)[1])
+        self.assertEqual(
+            Recipe.objects.get(pk=self.first.pk).tags_mask & (1 << bit), 0
+        )
+        self.assertEqual(
+            Recipe.objects.get(pk=self.second.pk).tags_mask, second_mask
+        )
+        new_tag = Tag.objects.create(
+            name='Новый', color='#FFFFFF', slug='new'
+        )
+        self.assertEqual(new_tag.bit, bit)
+        self.assertEqual(self.filter_ids('new'), set())
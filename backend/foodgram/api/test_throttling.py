@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+from django.core.cache import caches
+
+from .testing import FoodgramTestCase
+from .throttles import (THROTTLE_CACHE_ALIAS, CacheScopedRateThrottle,
+                        CacheSlotStore, get_slot_store)
+
+
+class AdmissionControlTest(FoodgramTestCase):
+    """Ограничение частоты и одновременности дорогих запросов."""
+
+    url = '/api/recipes/download_shopping_cart/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.get_client(self.create_user('reader'))
+
+    @patch.object(
+        CacheScopedRateThrottle, 'THROTTLE_RATES', {'shopping_list': '2/min'}
+    )
+    def test_rate_limit(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_concurrency_limit(self):
+        store = get_slot_store()
+        slots = [store.acquire('shopping_list', 2) for _ in range(2)]
+        try:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '5')
+        finally:
+            for slot in slots:
+                store.release(slot)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_requests_release_their_slots(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(get_slot_store().counters['shopping_list'], 0)
+
+
+class CacheSlotStoreTest(FoodgramTestCase):
+    """Слоты в общем кэше: по ключу на слот, с истечением."""
+
+    def test_slots_are_limited(self):
+        store = CacheSlotStore()
+        first, second = store.acquire('scope', 2), store.acquire('scope', 2)
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertIsNone(store.acquire('scope', 2))
+        store.release(first)
+        self.assertIsNotNone(store.acquire('scope', 2))
+
+    def test_expired_slot_release_keeps_new_owner(self):
+        store = CacheSlotStore()
+        expired = store.acquire('scope', 1)
+        caches[THROTTLE_CACHE_ALIAS].delete(expired[0])
+        current = store.acquire('scope', 1)
+        store.release(expired)
+        self.assertIsNone(store.acquire('scope', 1))
+        store.release(current)
+        self.assertIsNotNone(store.acquire('scope', 1))
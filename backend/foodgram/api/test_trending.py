@@ -0,0 +1,66 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import FavoriteRecipes, Recipe
+from .testing import FoodgramTestCase
+
+
+class TrendingTest(FoodgramTestCase):
+    """Сортировка рецептов по популярности с затуханием."""
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        ingredients = self.create_ingredients('Мука')
+        self.recipes = [
+            self.create_recipe(author, [], ingredients, name=f'Рецепт {i}')
+            for i in range(3)
+        ]
+        self.users = [self.create_user(f'user{i}') for i in range(3)]
+
+    def add_to_list(self, user, recipe, list_name):
+        response = self.get_client(user).post(
+            f'/api/recipes/{recipe.pk}/{list_name}/'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def get_trending_ids(self):
+        response = self.get_client().get('/api/recipes/?ordering=trending')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_recipes_are_ordered_by_activity(self):
+        first, second, third = self.recipes
+        for user in self.users[:2]:
+            self.add_to_list(user, second, 'favorite')
+        self.add_to_list(self.users[0], first, 'shopping_cart')
+        self.process_outbox()
+        self.assertEqual(
+            self.get_trending_ids(), [second.pk, first.pk, third.pk]
+        )
+
+    def test_old_activity_decays(self):
+        first, second, third = self.recipes
+        for user in self.users[:2]:
+            self.add_to_list(user, first, 'favorite')
+        FavoriteRecipes.objects.update(
+            created=FavoriteRecipes.objects.get(
+                user=self.users[0]
+            ).created - timedelta(days=7)
+        )
+        self.add_to_list(self.users[2], second, 'favorite')
+        self.process_outbox()
+        self.assertEqual(
+            self.get_trending_ids(), [second.pk, first.pk, third.pk]
+        )
+
+    def test_rebuild_matches_incremental_updates(self):
+        for user, recipe in zip(self.users, self.recipes[1:] * 2):
+            self.add_to_list(user, recipe, 'favorite')
+        self.process_outbox()
+        incremental = dict(Recipe.objects.values_list('pk', 'trending'))
+        call_command('update_trending', stdout=StringIO())
+        for pk, trending in Recipe.objects.values_list('pk', 'trending'):
+            self.assertAlmostEqual(trending, incremental[pk])
@@ -0,0 +1,86 @@
+import base64
+import json
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from recipes.models import Recipe
+from .testing import IMAGE, FoodgramTestCase
+
+
+class MultipartRecipeUploadTest(FoodgramTestCase):
+    """Создание и изменение рецепта через multipart/form-data."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.tags = self.create_tags()
+        self.ingredients = self.create_ingredients('Мука', 'Яйца')
+        self.author_client = self.get_client(self.author)
+
+    def get_image(self):
+        return SimpleUploadedFile(
+            'photo.png', base64.b64decode(IMAGE.split(',')[1]),
+            content_type='image/png'
+        )
+
+    def get_form(self, **kwargs):
+        form = {
+            'tags': [tag.pk for tag in self.tags],
+            'ingredients': json.dumps([
+                {'id': ingredient.pk, 'amount': 5}
+                for ingredient in self.ingredients
+            ]),
+            'name': 'Блины',
+            'text': 'Описание',
+            'cooking_time': 20,
+            'portions': 2,
+            'image': self.get_image(),
+        }
+        form.update(kwargs)
+        return form
+
+    def test_create_from_multipart_form(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.post(
+                '/api/recipes/', self.get_form(), format='multipart'
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(
+            set(recipe.tags.values_list('pk', flat=True)),
+            {tag.pk for tag in self.tags}
+        )
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('amount', flat=True)),
+            [5, 5]
+        )
+        self.assertTrue(recipe.image.name.startswith('recipes/images/'))
+        self.assertTrue(recipe.image.name.endswith('.png'))
+
+    def test_multipart_image_matches_base64_image(self):
+        recipe = self.create_recipe(self.author, self.tags, self.ingredients)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.patch(
+                f'/api/recipes/{recipe.pk}/', {'image': self.get_image()},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            Recipe.objects.get(pk=recipe.pk).image.name, recipe.image.name
+        )
+
+    def test_invalid_form_fields(self):
+        cases = (
+            {'ingredients': 'не JSON'},
+            {'image': SimpleUploadedFile(
+                'photo.png', b'not an image', content_type='image/png'
+            )},
+        )
+        for form in cases:
+            with self.subTest(form=list(form)):
+                response = self.author_client.post(
+                    '/api/recipes/', self.get_form(**form),
+                    format='multipart'
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(list(form)[0], response.data)
@@ -0,0 +1,96 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .testing import FoodgramTestCase
+
+
+class IsSubscribedTest(FoodgramTestCase):
+    """Поле is_subscribed в списке и профиле юзеров."""
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.create_user('reader')
+        self.author = self.create_user('author')
+        self.other = self.create_user('other')
+        self.client = self.get_client(self.reader)
+        self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+
+    def get_subscriptions(self, client):
+        response = client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        return {
+            user['username']: user['is_subscribed']
+            for user in response.data['results']
+        }
+
+    def test_user_list_and_profile(self):
+        self.assertEqual(self.get_subscriptions(self.client), {
+            'reader': False, 'author': True, 'other': False
+        })
+        for user, is_subscribed in ((self.author, True), (self.other, False)):
+            response = self.client.get(f'/api/users/{user.pk}/')
+            self.assertEqual(response.data['is_subscribed'], is_subscribed)
+
+    def test_anonymous_users_are_not_subscribed(self):
+        self.assertEqual(
+            set(self.get_subscriptions(self.get_client()).values()), {False}
+        )
+
+    def test_list_queries_do_not_grow_with_users(self):
+        with CaptureQueriesContext(connection) as before:
+            self.client.get('/api/users/')
+        for index in range(3):
+            self.client.post(
+                f'/api/users/{self.create_user(f"user{index}").pk}/subscribe/'
+            )
+        with CaptureQueriesContext(connection) as after:
+            self.client.get('/api/users/')
+        self.assertEqual(len(after), len(before))
+
+
+class EmailLoginTest(FoodgramTestCase):
+    """Регистрация и вход по email без учёта регистра."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+
+    def register(self, email, username):
+        return self.get_client().post('/api/users/', {
+            'email': email,
+            'username': username,
+            'first_name': 'Имя',
+            'last_name': 'Фамилия',
+            'password': 'password-12345',
+        }, format='json')
+
+    def test_login_ignores_email_case(self):
+        for email in ('user@foodgram.ru', ' USER@Foodgram.ru '):
+            with self.subTest(email=email):
+                response = self.get_client().post('/api/auth/token/login/', {
+                    'email': email, 'password': 'password-12345'
+                }, format='json')
+                self.assertEqual(response.status_code, 200, response.data)
+                self.assertIn('auth_token', response.data)
+
+    def test_wrong_password_is_rejected(self):
+        response = self.get_client().post('/api/auth/token/login/', {
+            'email': 'USER@foodgram.ru', 'password': 'wrong-password'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_registration_normalizes_and_checks_email(self):
+        response = self.register('User@Foodgram.RU', 'second')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+        response = self.register('New@Foodgram.RU', 'new')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['email'], 'new@foodgram.ru')
+        with CaptureQueriesContext(connection) as queries:
+            self.get_client().post('/api/auth/token/login/', {
+                'email': 'NEW@foodgram.ru', 'password': 'password-12345'
+            }, format='json')
+        self.assertTrue(any(
+            'LOWER("users_user"."email")' in query['sql']
+            for query in queries
+        ))
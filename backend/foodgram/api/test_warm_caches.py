@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITransactionTestCase
+
+from recipes.models import Recipe
+from users.models import User
+from .management.commands.warm_caches import Command
+from .testing import TEST_CACHES
+
+
+@override_settings(CACHES=TEST_CACHES, WARM_CACHE_HOST='testserver')
+class WarmCachesTest(APITransactionTestCase):
+    """
+    Прогрев кэша ответов командой warm_caches.
+    Команда ходит в API из своих потоков, поэтому тест без обёртки
+    TestCase.
+    """
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        author = User.objects.create_user(
+            username='author', email='author@foodgram.ru',
+            password='password-12345', first_name='Имя', last_name='Фамилия'
+        )
+        self.popular, self.other, self.unpopular = [
+            Recipe.objects.create(
+                author=author, name=name, text='Описание', cooking_time=10,
+                image='recipes/images/photo.png', portions=2,
+                favorites_count=favorites_count
+            )
+            for name, favorites_count in (
+                ('Популярный', 5), ('Другой', 3), ('Без избранного', 0)
+            )
+        ]
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_warmed_responses_are_hit_by_anonymous_requests(self):
+        output = StringIO()
+        call_command(
+            'warm_caches', '--urls', '/api/recipes/', '--top', '1',
+            stdout=output
+        )
+        self.assertIn('Прогрето адресов: 2 (с ошибкой: 0)', output.getvalue())
+        self.assertEqual(self.count_queries('/api/recipes/'), 1)
+        self.assertEqual(
+            self.count_queries(f'/api/recipes/{self.popular.pk}/'), 1
+        )
+        self.assertGreater(
+            self.count_queries(f'/api/recipes/{self.other.pk}/'), 1
+        )
+
+    def test_top_recipes_are_ordered_by_favorites_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            recipe_ids = Command().get_top_recipe_ids(5)
+        self.assertEqual(recipe_ids, [self.popular.pk, self.other.pk])
+        self.assertNotIn('GROUP BY', queries[0]['sql'])
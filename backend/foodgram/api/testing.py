@@ -0,0 +1,129 @@
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.ingredient_search import ingredient_search_index
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.pantry import pantry_index
+from users.models import User
+from .outbox import process_events
+
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+OTHER_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8DwHwAFBQIAX8jx0gAAAABJRU5ErkJggg=='
+)
+TEST_CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'test-{alias}',
+    }
+    for alias in ('default', 'responses', 'throttling')
+}
+
+
+class FoodgramTestCase(APITestCase):
+    """
+    Базовый класс тестов API.
+    Кэши - в памяти, файлы (картинки, PDF, профили) - во временном
+    каталоге. Перед каждым тестом кэши и каталог файлов очищаются,
+    а индексы в памяти процесса забывают версию (версии в БД и id
+    откатываются вместе с тестом).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.files_root = tempfile.mkdtemp()
+        cls.files_settings = override_settings(
+            CACHES=TEST_CACHES,
+            MEDIA_ROOT=cls.files_root,
+            SHOPPING_LIST_PDF_ROOT=f'{cls.files_root}/shopping_lists',
+            PROFILING_ROOT=f'{cls.files_root}/profiles',
+        )
+        cls.files_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.files_settings.disable()
+        shutil.rmtree(cls.files_root, ignore_errors=True)
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        pantry_index.version = None
+        ingredient_search_index.version = None
+        shutil.rmtree(self.files_root, ignore_errors=True)
+
+    def create_user(self, username, **kwargs):
+        return User.objects.create_user(
+            username=username,
+            email=f'{username}@foodgram.ru',
+            password='password-12345',
+            first_name='Имя',
+            last_name='Фамилия',
+            **kwargs
+        )
+
+    def get_client(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def create_tags(self, count=2):
+        return [
+            Tag.objects.create(
+                name=f'Тег {index}', color=f'#00000{index}', slug=f'tag{index}'
+            )
+            for index in range(count)
+        ]
+
+    def create_ingredients(self, *names, measurement_unit='г'):
+        return [
+            Ingredient.objects.create(
+                name=name, measurement_unit=measurement_unit
+            )
+            for name in names
+        ]
+
+    def get_recipe_data(self, tags, ingredients, **kwargs):
+        data = {
+            'tags': [tag.pk for tag in tags],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 10}
+                for ingredient in ingredients
+            ],
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'image': IMAGE,
+            'cooking_time': 10,
+            'portions': 2,
+        }
+        data.update(kwargs)
+        return data
+
+    def create_recipe(self, author, tags, ingredients, **kwargs):
+        """Создаёт рецепт через API (со всеми хуками записи)."""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.get_client(author).post(
+                '/api/recipes/',
+                self.get_recipe_data(tags, ingredients, **kwargs),
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        return Recipe.objects.get(pk=response.data['id'])
+
+    def process_outbox(self):
+        """Обрабатывает все события outbox, как process_outbox."""
+        processed, failed = process_events(batch_size=1000)
+        self.assertEqual(failed, 0)
+        return processed
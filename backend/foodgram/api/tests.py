@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from .renderers import ORJSONRenderer
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    """ORJSONRenderer выдаёт те же байты, что и JSONRenderer."""
+
+    def assert_same_output(self, data):
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_same_output(self):
+        cases = [
+            None,
+            {},
+            [],
+            {'count': 2, 'next': None, 'results': [1, 'два', True]},
+            {'text': 'строка с разделителями "и" \\ \n\t'},
+            {'emoji': '\U0001f373', 'control': '\x00\x1f'},
+            {1: 'int key', 'nested': {'list': [[], {}, [None]]}},
+            {'floats': [0.0, -0.0, 0.5, 1.0, 0.1 + 0.2, 123456.789]},
+            {'floats': [1e-05, 1e+16, 1.5e+300, 2.5e-300, 5e-324]},
+            {'int': 2 ** 63, 'big': 2 ** 70, 'negative': -2 ** 70},
+            {'decimal': Decimal('1.50'), 'small': Decimal('1E-7')},
+            {'date': datetime(2023, 1, 1, 12, 30, 15, 123456,
+                              tzinfo=timezone.utc),
+             'naive': datetime(2023, 1, 1),
+             'uuid': UUID('12345678-1234-5678-1234-567812345678')},
+            ReturnDict({'results': ReturnList([{'id': 1}], serializer=None)},
+                       serializer=None),
+            ({'tuple': (1, 2.5)}, ),
+        ]
+        for data in cases:
+            with self.subTest(data=data):
+                self.assert_same_output(data)
+
+    def test_non_finite_floats_are_rejected(self):
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    ORJSONRenderer().render({'value': value})
+
+    def test_non_finite_floats_when_not_strict(self):
+        data = {'values': [float('nan'), float('inf'), float('-inf')]}
+        renderer, json_renderer = ORJSONRenderer(), JSONRenderer()
+        renderer.strict = json_renderer.strict = False
+        self.assertEqual(renderer.render(data), json_renderer.render(data))
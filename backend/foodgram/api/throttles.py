@@ -0,0 +1,94 @@
+from collections import defaultdict
+from functools import lru_cache
+from threading import Lock
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import ScopedRateThrottle
+
+
+THROTTLE_CACHE_ALIAS = 'throttling'
+
+
+class CacheScopedRateThrottle(ScopedRateThrottle):
+    """
+    ScopedRateThrottle со счётчиками в отдельном кэше 'throttling'.
+    Scope берётся из атрибута throttle_scope вьюсета (может зависеть от
+    action), запросы без scope не ограничиваются.
+    """
+    @property
+    def cache(self):
+        return caches[THROTTLE_CACHE_ALIAS]
+
+
+class ServerBusy(APIException):
+    """Все слоты для тяжёлых запросов заняты (ответ 503 с Retry-After)."""
+    status_code = 503
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'server_busy'
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+class LocalSlotStore:
+    """
+    Счётчики занятых слотов в памяти процесса (лимит на воркер).
+    acquire возвращает слот для release или None, если слотов нет.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.counters = defaultdict(int)
+
+    def acquire(self, key, limit):
+        with self.lock:
+            if self.counters[key] >= limit:
+                return None
+            self.counters[key] += 1
+            return key
+
+    def release(self, slot):
+        with self.lock:
+            self.counters[slot] -= 1
+
+
+class CacheSlotStore:
+    """
+    Занятые слоты в кэше 'throttling': по ключу на слот, занимается через
+    add (атомарно) с меткой запроса и живёт CONCURRENCY_SLOT_TIMEOUT.
+    С общим кэшем лимит действует на все воркеры вместе; слот упавшего
+    воркера освобождается по истечении ключа.
+    """
+    key_prefix = 'concurrency:'
+
+    def __init__(self):
+        self.cache = caches[THROTTLE_CACHE_ALIAS]
+
+    def acquire(self, key, limit):
+        token = uuid4().hex
+        for number in range(limit):
+            slot_key = f'{self.key_prefix}{key}:{number}'
+            if self.cache.add(
+                slot_key, token, settings.CONCURRENCY_SLOT_TIMEOUT
+            ):
+                return slot_key, token
+        return None
+
+    def release(self, slot):
+        """
+        Освобождает слот, если он ещё наш (ключ мог истечь и достаться
+        другому запросу).
+        """
+        slot_key, token = slot
+        if self.cache.get(slot_key) == token:
+            self.cache.delete(slot_key)
+
+
+@lru_cache(maxsize=None)
+def get_slot_store():
+    """Хранилище слотов из настройки CONCURRENCY_SLOT_STORE."""
+    return import_string(settings.CONCURRENCY_SLOT_STORE)()
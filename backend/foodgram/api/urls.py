@@ -2,7 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (IngredientViewSet, RecipeViewSet, TagViewSet,
-                    UserCustomViewSet)
+                    UserCustomViewSet, download_profile)
 
 
 app_name = 'api'
@@ -16,4 +16,5 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('profiles/<str:name>/', download_profile, name='profiles'),
 ]
@@ -1,20 +1,40 @@
+import os
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http.response import HttpResponse
+from django.db import transaction
+from django.http import Http404
+from django.http.response import FileResponse, HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import permissions, status, viewsets
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import F
+from rest_framework.settings import api_settings
+from django.db.models import BooleanField, Exists, F, OuterRef, Value
 
+from recipes.deletion import (mark_recipes_for_deletion,
+                              mark_users_for_deletion)
+from recipes.ingredient_search import invalidate_ingredient_search
 from recipes.models import (FavoriteRecipes, Ingredient, IngredientRecipe,
                             Recipe, ShoppingCart, Tag)
+from recipes.pantry import pantry_index
+from recipes.shopping_list import (bump_cart_versions, get_cart_version,
+                                   get_shopping_list_pdf)
+from recipes.tags import clear_tag_bits, invalidate_tag_bits
 from users.models import Subscribe
 from .filtersets import NameFilterSet, RecipeFilterSet
+from .metrics import SHOPPING_LIST_SIZE, render_metrics
+from .mixins import AdmissionControlMixin, AnonymousCacheMixin
+from .outbox import publish
+from .paginators import FeedCursorPagination, RecipeCursorPagination
 from .permissions import IsAdminOrReadOnly, IsAuthorOrAdminOrReadOnly
+from .renderers import PDFFormatRenderer
 from .serializers import (FavoriteRecipesSerializer, IngredientSerializer,
-                          RecipeReadSerializer, RecipeShortSerializer,
+                          PantrySerializer, RecipeCoverageSerializer,
+                          RECIPE_READ_VALUES, RecipeReadSerializer,
+                          RecipeShortSerializer, RecipeValuesReadSerializer,
                           RecipeWriteSerializer, ShoppingCartSerializer,
                           SubscribeSerializer, TagSerializer,
                           UserSubscribeSerializer)
@@ -23,25 +43,62 @@ from .serializers import (FavoriteRecipesSerializer, IngredientSerializer,
 User = get_user_model()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousCacheMixin, AdmissionControlMixin,
+                    viewsets.ModelViewSet):
     """
     Вьюсет для работы с /recipes.
+    Список и рецепт для анонимных юзеров отдаются из кэша.
+    Запись рецептов и список покупок ограничены по частоте и
+    количеству одновременных запросов.
+    Список, рецепт и лента читаются через values() и
+    RecipeValuesReadSerializer.
+    Список с параметром cursor листается курсором в порядке ?ordering=.
+    Рецепт создаётся и редактируется JSON-ом с картинкой в base64 или
+    multipart/form-data с картинкой файлом (пишется во временный файл).
     {id}/favorite/ - добавление рецепта в избранное.
     {id}/shopping_cart/ - добавление рецепта в корзину.
                         - с portions_to_shop - в теле обновляет количество
                           порций в корзине.
     download_shopping_cart/ - загружает .txt со списком покупок.
+                            - с ?format=pdf - загружает .pdf.
+    feed/ - лента рецептов авторов, на которых подписан юзер.
+    {id}/similar/ - похожие рецепты.
+    pantry/ - подбор рецептов по имеющимся ингредиентам.
     """
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilterSet
+    throttle_scopes = {
+        'create': 'recipe_write',
+        'update': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'download_shopping_cart': 'shopping_list',
+    }
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve', 'feed'):
+            return self.queryset.values(*RECIPE_READ_VALUES)
+        return super().get_queryset()
+
+    @property
+    def paginator(self):
+        """С параметром cursor список листается курсором (keyset)."""
+        if (
+            self.action == 'list'
+            and 'cursor' in self.request.query_params
+            and not hasattr(self, '_paginator')
+        ):
+            self._paginator = RecipeCursorPagination()
+        return super().paginator
 
     def get_serializer_class(self):
         if self.action == 'favorite':
             return FavoriteRecipesSerializer
         elif self.action == 'shopping_cart':
             return ShoppingCartSerializer
+        elif self.action in ('list', 'retrieve', 'feed'):
+            return RecipeValuesReadSerializer
         elif self.request.method == 'GET':
             return RecipeReadSerializer
         return RecipeWriteSerializer
@@ -50,6 +107,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         Базовый @action для работы со списками юзера.
         Добавляет рецепт в список или удаляет из него.
+        Вместе с изменением публикует событие <список>_added или
+        favorite_removed: рейтинг популярности и счётчик избранного
+        пересчитывает process_outbox. Изменение корзины меняет её версию.
         Ответ по сериализатору RecipeShortSerializer.
         """
         recipe = self.get_object()
@@ -60,7 +120,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 user=current_user,
                 recipe=recipe
             )
-            self.perform_destroy(instance)
+            with transaction.atomic():
+                self.perform_remove_from_list(instance)
+                if model_name == FavoriteRecipes:
+                    publish('favorite_removed', recipe_id=recipe.pk)
+                else:
+                    bump_cart_versions([current_user.pk])
             return Response(status=status.HTTP_204_NO_CONTENT)
         if self.request.method == "PATCH":
             instance = get_object_or_404(
@@ -74,7 +139,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 partial=True
             )
             serializer.is_valid(raise_exception=True)
-            self.perform_update(serializer)
+            with transaction.atomic():
+                self.perform_update(serializer)
+                bump_cart_versions([current_user.pk])
             return Response(serializer.data)
         data_with_recipe = self.request.data.copy()
         data_with_recipe['recipe'] = recipe.pk
@@ -85,7 +152,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
             data_with_recipe['portions_to_shop'] = recipe.portions
         serializer = self.get_serializer(data=data_with_recipe)
         serializer.is_valid(raise_exception=True)
-        serializer.save(user=current_user, recipe=recipe)
+        with transaction.atomic():
+            instance = serializer.save(user=current_user, recipe=recipe)
+            publish(
+                f'{self.action}_added',
+                list_name=self.action,
+                pk=instance.pk,
+                recipe_id=recipe.pk
+            )
+            if model_name == ShoppingCart:
+                bump_cart_versions([current_user.pk])
         headers = self.get_success_headers(serializer.data)
         instance_serializer = RecipeShortSerializer(recipe)
         return Response(
@@ -138,6 +214,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     continue
                 ingredient_set.append(list(ingred))
                 ingredient_set_len += 1
+        SHOPPING_LIST_SIZE.observe(ingredient_set_len)
         recipe_queryset = Recipe.objects.filter(
             in_shopping_cart__user=self.request.user
         )
@@ -157,9 +234,37 @@ class RecipeViewSet(viewsets.ModelViewSet):
             header += f'{recipe.name}, '
         return header[:-2] + '\n'
 
-    @action(detail=False, permission_classes=(permissions.IsAuthenticated,))
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        renderer_classes=(
+            *api_settings.DEFAULT_RENDERER_CLASSES, PDFFormatRenderer
+        )
+    )
     def download_shopping_cart(self, request, *args, **kwargs):
-        """Создаёт и отдаёт .txt файл со списком покупок."""
+        """
+        Создаёт и отдаёт .txt или .pdf файл со списком покупок.
+        ETag - версия корзины (без построения списка): при совпадении с
+        If-None-Match ответ 304 без обращения к рецептам корзины.
+        """
+        current_user = self.request.user
+        file_format = request.accepted_renderer.format
+        version = get_cart_version(current_user.pk)
+        etag = f'"{version}-{file_format}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return HttpResponse(
+                status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag}
+            )
+        if file_format == 'pdf':
+            response = self.download_shopping_cart_pdf(version)
+        else:
+            response = self.download_shopping_cart_txt()
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def download_shopping_cart_txt(self):
+        """Отдаёт .txt со списком покупок."""
         current_user = self.request.user
         ingredient_list = self.create_str_ingredient_list()
         filename = current_user.username + '_ingredients_list.txt'
@@ -172,23 +277,135 @@ class RecipeViewSet(viewsets.ModelViewSet):
             filename)
         return response
 
+    def download_shopping_cart_pdf(self, version):
+        """
+        Отдаёт PDF списка покупок версии корзины version из кэша на диске.
+        PDF рисуется в фоновом пуле процессов; если он не успел за доли
+        секунды - ответ 202 с Retry-After и адресом для повторного запроса
+        в Location, повторный запрос получит готовый файл.
+        В проде файл отдаёт nginx по X-Accel-Redirect.
+        """
+        current_user = self.request.user
+        path = get_shopping_list_pdf(
+            current_user.pk, version, self.create_str_ingredient_list
+        )
+        if path is None:
+            return Response(
+                {'detail': 'Список покупок готовится, повторите запрос.'},
+                status=status.HTTP_202_ACCEPTED,
+                headers={
+                    'Retry-After': settings.SHOPPING_LIST_PDF_RETRY_AFTER,
+                    'Location': self.request.build_absolute_uri(),
+                }
+            )
+        filename = current_user.username + '_ingredients_list.pdf'
+        if not settings.SHOPPING_LIST_PDF_ACCEL_REDIRECT:
+            return FileResponse(
+                open(path, 'rb'), as_attachment=True, filename=filename
+            )
+        response = HttpResponse(content_type='application/pdf')
+        response['X-Accel-Redirect'] = settings.SHOPPING_LIST_PDF_URL + (
+            os.path.relpath(path, settings.SHOPPING_LIST_PDF_ROOT)
+        )
+        response['Content-Disposition'] = 'attachment; filename={0}'.format(
+            filename)
+        return response
+
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        pagination_class=FeedCursorPagination
+    )
+    def feed(self, request, *args, **kwargs):
+        """
+        Показывает ленту рецептов авторов, на которых подписан текущий юзер.
+        Курсорная пагинация по убыванию даты публикации, рецепты страницы
+        читаются через values() как в списке.
+        """
+        page = self.paginator.paginate_feed(
+            request.user, self.get_queryset(), request
+        )
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True)
+    def similar(self, request, *args, **kwargs):
+        """
+        Показывает предрассчитанные похожие рецепты (по убыванию сходства).
+        Выдача по сокращённому типу RecipeShortSerializer.
+        """
+        recipe = self.get_object()
+        similar_recipes = Recipe.objects.filter(
+            similar_to__recipe=recipe
+        ).order_by('-similar_to__score')
+        serializer = RecipeShortSerializer(similar_recipes, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False)
+    def pantry(self, request, *args, **kwargs):
+        """
+        Подбирает рецепты по имеющимся ингредиентам (?ingredients=1&...).
+        Рецепты ранжируются по доле имеющихся ингредиентов (без 'по вкусу').
+        Выдача по типу RecipeCoverageSerializer, без пагинации.
+        """
+        query_serializer = PantrySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        matches = pantry_index.match(
+            query_serializer.validated_data['ingredients'],
+            settings.PANTRY_MAX_RESULTS
+        )
+        recipes = Recipe.objects.in_bulk([pk for pk, _ in matches])
+        ranked_recipes = []
+        for pk, coverage in matches:
+            if pk in recipes:
+                recipes[pk].coverage = coverage
+                ranked_recipes.append(recipes[pk])
+        serializer = RecipeCoverageSerializer(ranked_recipes, many=True)
+        return Response(serializer.data)
+
+    def perform_destroy(self, instance):
+        """
+        Рецепт помечается на удаление (сразу пропадает из выдачи), строки
+        и картинку удаляет process_deletions.
+        """
+        mark_recipes_for_deletion([instance.pk])
+
+    def perform_remove_from_list(self, instance):
+        """Удаляет рецепт из избранного или корзины юзера."""
+        instance.delete()
+
 
 class TagViewSet(viewsets.ModelViewSet):
     """
     Вьюсет для работы с /tags.
     Без пагинации.
+    Изменения сбрасывают кэш битов тегов, удаление тега убирает его бит
+    из масок рецептов.
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        invalidate_tag_bits()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_tag_bits()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        clear_tag_bits([instance.bit])
+        invalidate_tag_bits()
+
 
 class IngredientViewSet(viewsets.ModelViewSet):
     """
     Вьюсет для работы с /ingredients.
     Без пагинации.
-    Поиск по полю name (вхождение с начала).
+    Ранжированный поиск по полю name (с ограничением числа результатов).
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -197,11 +414,56 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filter_class = NameFilterSet
     pagination_class = None
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        invalidate_ingredient_search()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_ingredient_search()
 
-class UserCustomViewSet(UserViewSet):
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_ingredient_search()
+
+
+class UserCustomViewSet(AdmissionControlMixin, UserViewSet):
     """
     Дополненный вьюсет для работы с /users.
+    Поле is_subscribed вычисляется в queryset (аннотация Exists).
+    Подписки ограничены по частоте и количеству одновременных запросов.
+    Юзеры, помеченные на удаление, не показываются; удаление юзера
+    помечает его на удаление (строки удаляет process_deletions).
     """
+    throttle_scopes = {
+        'subscribe': 'subscriptions',
+        'subscriptions': 'subscriptions',
+    }
+
+    def get_queryset(self):
+        """Аннотирует is_subscribed для текущего юзера."""
+        queryset = super().get_queryset().filter(pending_deletion=False)
+        current_user = self.request.user
+        if not current_user.is_authenticated:
+            return queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Subscribe.objects.filter(
+                    user=current_user,
+                    author=OuterRef('pk')
+                )
+            )
+        )
+
+    def perform_destroy(self, instance):
+        mark_users_for_deletion([instance.pk])
+
+    def perform_unsubscribe(self, instance):
+        """Удаляет подписку юзера на автора."""
+        instance.delete()
+
     def get_serializer_class(self):
         if self.action == 'subscribe':
             return SubscribeSerializer
@@ -218,6 +480,8 @@ class UserCustomViewSet(UserViewSet):
         """
         Подписка на автора.
         Создаёт или удаляет объект подписки Subscribe.
+        Вместе с ней публикует событие subscribed или unsubscribed: ленту
+        подписок обновляет process_outbox.
         """
         author = self.get_object()
         current_user = self.request.user
@@ -225,11 +489,21 @@ class UserCustomViewSet(UserViewSet):
             instance = get_object_or_404(
                 Subscribe, user=current_user, author=author
             )
-            self.perform_destroy(instance)
+            with transaction.atomic():
+                self.perform_unsubscribe(instance)
+                publish(
+                    'unsubscribed',
+                    user_id=current_user.pk,
+                    author_id=author.pk
+                )
             return Response(status=status.HTTP_204_NO_CONTENT)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(user=current_user, author=author)
+        with transaction.atomic():
+            serializer.save(user=current_user, author=author)
+            publish(
+                'subscribed', user_id=current_user.pk, author_id=author.pk
+            )
         headers = self.get_success_headers(serializer.data)
         instance_serializer = UserSubscribeSerializer(
             author, context={'request': request}
@@ -251,10 +525,28 @@ class UserCustomViewSet(UserViewSet):
         Выдача по расширенному типу UserSubscribeSerializer.
         """
         current_user = self.request.user
-        subscriptions = User.objects.filter(followers__user=current_user)
+        subscriptions = User.objects.filter(
+            followers__user=current_user, pending_deletion=False
+        )
         page = self.paginate_queryset(subscriptions)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(subscriptions, many=True)
         return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes((permissions.IsAdminUser,))
+def download_profile(request, name):
+    """Отдаёт файл профиля или SQL-запросов из ProfilingMiddleware."""
+    path = os.path.join(settings.PROFILING_ROOT, name)
+    if os.path.basename(name) != name or not os.path.isfile(path):
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
+
+def metrics(request):
+    """Метрики приложения в формате Prometheus (для сборщика, без nginx)."""
+    content, content_type = render_metrics()
+    return HttpResponse(content, content_type=content_type)
@@ -1,4 +1,6 @@
 import os
+import tempfile
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -30,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,6 +40,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -106,6 +110,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -116,11 +123,28 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'api.paginators.PageNumberWithLimitPagination'
+    'DEFAULT_PAGINATION_CLASS': 'api.paginators.PageNumberWithLimitPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttles.CacheScopedRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'shopping_list': '10/min',
+        'recipe_write': '30/hour',
+        'subscriptions': '60/min',
+    },
 }
 
 AUTH_USER_MODEL = 'users.User'
 
+AUTHENTICATION_BACKENDS = [
+    'users.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
@@ -133,5 +157,122 @@ DJOSER = {
         'user': 'api.serializers.UserGetSerializer',
         'current_user': 'api.serializers.UserGetSerializer',
         'user_create': 'api.serializers.UserWriteSerializer',
+        'token_create': 'api.serializers.EmailTokenCreateSerializer',
     }
 }
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    },
+    'responses': {
+        'BACKEND': os.getenv(
+            'RESPONSE_CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'RESPONSE_CACHE_LOCATION',
+            default=os.path.join(tempfile.gettempdir(), 'foodgram_responses')
+        ),
+        'TIMEOUT': 300,
+    },
+    'throttling': {
+        'BACKEND': os.getenv(
+            'THROTTLE_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('THROTTLE_CACHE_LOCATION', default='throttling'),
+    },
+}
+
+CONCURRENCY_SLOT_STORE = os.getenv(
+    'CONCURRENCY_SLOT_STORE', default='api.throttles.LocalSlotStore'
+)
+CONCURRENCY_LIMITS = {
+    'shopping_list': 2,
+    'recipe_write': 4,
+    'subscriptions': 4,
+}
+CONCURRENCY_RETRY_AFTER = 5
+CONCURRENCY_SLOT_TIMEOUT = 60
+
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+DELETION_BATCH_SIZE = 500
+
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_POLL_INTERVAL = 1
+OUTBOX_RETRY_DELAY = 10
+OUTBOX_MAX_RETRY_DELAY = 60 * 60
+
+WARM_CACHE_URLS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/recipes/?page=3',
+)
+WARM_CACHE_TOP_RECIPES = 50
+WARM_CACHE_THREADS = 4
+# Хост входит в ключ кэша ответов: по умолчанию - первый из ALLOWED_HOSTS.
+WARM_CACHE_HOST = os.getenv('WARM_CACHE_HOST', default=next(
+    (host.lstrip('.') for host in ALLOWED_HOSTS if host != '*'), 'localhost'
+))
+
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 100
+FEED_PULL_FOLLOWERS_THRESHOLD = 10000
+FEED_PULL_AUTHORS_CACHE_TIMEOUT = 600
+
+SIMILAR_RECIPES_TOP_K = 10
+SIMILAR_RECIPES_TAG_WEIGHT = 0.5
+SIMILAR_RECIPES_BATCH_SIZE = 500
+SIMILAR_RECIPES_CHUNK_SIZE = 10000
+SIMILAR_RECIPES_MAX_CANDIDATES = 5000
+
+PANTRY_MAX_INGREDIENTS = 50
+PANTRY_MAX_RESULTS = 30
+PANTRY_CHUNK_SIZE = 10000
+PANTRY_MAX_DELTAS = 10000
+
+TRENDING_EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+TRENDING_HALF_LIFE = timedelta(days=3)
+TRENDING_WINDOW = timedelta(days=30)
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_SHOPPING_CART_WEIGHT = 0.5
+TRENDING_CHUNK_SIZE = 10000
+
+SHOPPING_LIST_PDF_ROOT = os.path.join(BASE_DIR, 'shopping_lists')
+SHOPPING_LIST_PDF_URL = '/protected/shopping_lists/'
+SHOPPING_LIST_PDF_ACCEL_REDIRECT = os.getenv(
+    'SHOPPING_LIST_PDF_ACCEL_REDIRECT', default='True'
+) == 'True'
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+SHOPPING_LIST_PDF_WORKERS = 2
+SHOPPING_LIST_PDF_WAIT = 0.5
+SHOPPING_LIST_PDF_RETRY_AFTER = 2
+
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+PROFILING_QUERY_PARAM = 'profile'
+PROFILING_ROOT = os.path.join(BASE_DIR, 'profiles')
+PROFILING_SAMPLE_INTERVAL = 0.005
+PROFILING_MAX_FILES = 200
+
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_MAX_ROWS = 10000
+SLOW_QUERY_STACK_DEPTH = 8
+
+RECIPE_IMAGE_GC_GRACE = timedelta(hours=1)
+
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SEARCH_SIMILARITY = 0.3
+
+CORPUS_CHUNK_SIZE = 2000
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
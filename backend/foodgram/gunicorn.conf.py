@@ -0,0 +1,28 @@
+import os
+import shutil
+
+
+# Метрики воркеров собираются через файлы только под gunicorn: у
+# manage.py (migrate, cron, process_outbox) переменной нет и метрики
+# остаются в памяти процесса. Переменная задаётся до импорта
+# prometheus_client: тип хранилища значений он выбирает при импорте.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+
+
+def on_starting(server):
+    """Очищает файлы метрик прошлого запуска."""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def post_worker_init(worker):
+    """Запускает в воркере пул процессов отрисовки PDF списков покупок."""
+    from recipes.shopping_list import start_executor
+    start_executor()
+
+
+def child_exit(server, worker):
+    """Убирает из метрик запросы в обработке завершившегося воркера."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
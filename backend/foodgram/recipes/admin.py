@@ -1,6 +1,17 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.safestring import mark_safe
 
+from api.outbox import publish
+from .admin_utils import (BackgroundDeletionMixin, EstimatedCountPaginator,
+                          related_list_link)
+from .cache import invalidate_recipe_responses
+from .deletion import mark_recipes_for_deletion
+from .images import delete_unused_images
+from .ingredient_search import invalidate_ingredient_search
+from .popularity import update_favorites_counts
+from .shopping_list import bump_cart_versions, bump_recipe_carts
+from .tags import clear_tag_bits, invalidate_tag_bits, update_tags_masks
 from .models import (FavoriteRecipes, Ingredient, IngredientRecipe, Recipe,
                      RecipeTag, ShoppingCart, Tag)
 
@@ -8,75 +19,218 @@ from .models import (FavoriteRecipes, Ingredient, IngredientRecipe, Recipe,
 class IngredientInline(admin.TabularInline):
     model = IngredientRecipe
     extra = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient'
+        )
 
 
 class TagsInline(admin.TabularInline):
     model = RecipeTag
     extra = 1
 
-
-class FavoriteInline(admin.TabularInline):
-    model = FavoriteRecipes
-    extra = 1
-
-
-class ShoppingCartInline(admin.TabularInline):
-    model = ShoppingCart
-    extra = 1
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('recipe', 'tag')
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(BackgroundDeletionMixin, admin.ModelAdmin):
     """
     Отображение в админке модели Recipe
-    Доп.поле "В избранном" - счетчик добавления в избранное
-    Содержит инлайны для связи с Tag, Ingredient, ShoppingCart, Favorite
+    Доп.поле "В избранном" - счетчик добавления в избранное (favorites_count)
+    Содержит инлайны для связи с Tag, Ingredient
+    Избранное и корзина показываются количеством со ссылкой на список
+    Автор выбирается через автодополнение, фильтр по автору - через поиск
+    Изменения сбрасывают кэш ответов API для анонимных юзеров и меняют
+    версии корзин с рецептом
+    Маска тегов пересчитывается после сохранения инлайнов
+    Заменённые картинки без других рецептов удаляются
+    Удаление помечает рецепты на удаление (строки и картинки удаляет
+    process_deletions), помеченные рецепты видны в списке
     """
     list_editable = ('name', 'text')
     list_display = (
         'pk', 'name', 'author', 'text', 'in_favorite', 'get_tags', 'get_image'
     )
-    search_fields = ('name',)
-    list_filter = ('author', 'tags__name')
-    inlines = (
-        IngredientInline, TagsInline, ShoppingCartInline, FavoriteInline
-    )
+    search_fields = ('name', 'author__username')
+    list_filter = ('tags__name', 'pending_deletion')
+    autocomplete_fields = ('author',)
+    readonly_fields = ('favorites_summary', 'shopping_cart_summary')
+    inlines = (IngredientInline, TagsInline)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return Recipe.all_objects.select_related(
+            'author'
+        ).prefetch_related('tags')
+
+    def save_model(self, request, obj, form, change):
+        old_image = None
+        if change and 'image' in form.changed_data:
+            old_image = Recipe.objects.filter(
+                pk=obj.pk
+            ).values_list('image', flat=True).first()
+        super().save_model(request, obj, form, change)
+        delete_unused_images([old_image])
+
+    def save_related(self, request, form, formsets, change):
+        """
+        После сохранения тегов и ингредиентов пересчитывает маску тегов и
+        публикует то же событие, что и API (recipe_created или
+        recipe_updated: ленты, похожие рецепты, индекс подбора).
+        """
+        with transaction.atomic():
+            super().save_related(request, form, formsets, change)
+            update_tags_masks([form.instance.pk])
+            publish(
+                'recipe_updated' if change else 'recipe_created',
+                recipe_id=form.instance.pk
+            )
+            invalidate_recipe_responses(form.instance.pk)
+            bump_recipe_carts([form.instance.pk])
+
+    def delete_model(self, request, obj):
+        mark_recipes_for_deletion([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        mark_recipes_for_deletion(queryset.values_list('pk', flat=True))
 
     def in_favorite(self, obj):
-        return obj.favorited_by.count()
+        return obj.favorites_count
     in_favorite.short_description = 'В избранном'
+    in_favorite.admin_order_field = 'favorites_count'
 
     def get_tags(self, obj):
-        return list(obj.tags.values_list('name', flat=True))
+        return [tag.name for tag in obj.tags.all()]
     get_tags.short_description = 'Тэги'
 
     def get_image(self, obj):
         return mark_safe(f'<img src={obj.image.url} width="80" hieght="30"')
     get_image.short_description = 'Картинка'
 
+    def favorites_summary(self, obj):
+        return related_list_link(
+            FavoriteRecipes, obj.favorited_by.count(), recipe__id__exact=obj.pk
+        )
+    favorites_summary.short_description = 'В избранном'
+
+    def shopping_cart_summary(self, obj):
+        return related_list_link(
+            ShoppingCart, obj.in_shopping_cart.count(),
+            recipe__id__exact=obj.pk
+        )
+    shopping_cart_summary.short_description = 'В корзине'
+
 
 class IngredientAdmin(admin.ModelAdmin):
-    """Oтображение в админке модели Ingredient"""
+    """
+    Oтображение в админке модели Ingredient
+    Изменения сбрасывают индекс поиска ингредиентов
+    """
     list_editable = ('name', 'measurement_unit')
     list_display = ('pk', 'name', 'measurement_unit')
     search_fields = ('name',)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_ingredient_search()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_ingredient_search()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_ingredient_search()
+
 
 class TagAdmin(admin.ModelAdmin):
-    """Oтображение в админке модели Tag"""
+    """
+    Oтображение в админке модели Tag
+    Изменения сбрасывают кэш битов тегов, удаление тега убирает его бит
+    из масок рецептов
+    """
     list_editable = ('name', 'slug', 'color')
-    list_display = ('pk', 'name', 'slug', 'color')
+    list_display = ('pk', 'name', 'slug', 'color', 'bit')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_tag_bits()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        clear_tag_bits([obj.bit])
+        invalidate_tag_bits()
+
+    def delete_queryset(self, request, queryset):
+        bits = list(queryset.values_list('bit', flat=True))
+        super().delete_queryset(request, queryset)
+        clear_tag_bits(bits)
+        invalidate_tag_bits()
 
 
 class ShoppingCartAdmin(admin.ModelAdmin):
-    """Oтображение в админке модели ShoppingCart"""
+    """
+    Oтображение в админке модели ShoppingCart
+    Изменения меняют версии корзин затронутых юзеров
+    """
     list_editable = ('recipe', 'user')
     list_display = ('pk', 'recipe', 'user')
+    list_select_related = ('recipe', 'user')
+    autocomplete_fields = ('recipe', 'user')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        old_user_id = None
+        if change and 'user' in form.changed_data:
+            old_user_id = ShoppingCart.objects.filter(
+                pk=obj.pk
+            ).values_list('user_id', flat=True).first()
+        super().save_model(request, obj, form, change)
+        bump_cart_versions({obj.user_id, old_user_id} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_cart_versions([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        bump_cart_versions(user_ids)
 
 
 class FavoriteRecipesAdmin(admin.ModelAdmin):
-    """Oтображение в админке модели FavoriteRecipes"""
+    """
+    Oтображение в админке модели FavoriteRecipes
+    Изменения пересчитывают счётчик избранного затронутых рецептов
+    """
     list_editable = ('recipe', 'user')
     list_display = ('pk', 'recipe', 'user')
+    list_select_related = ('recipe', 'user')
+    autocomplete_fields = ('recipe', 'user')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        old_recipe_id = None
+        if change and 'recipe' in form.changed_data:
+            old_recipe_id = FavoriteRecipes.objects.filter(
+                pk=obj.pk
+            ).values_list('recipe_id', flat=True).first()
+        super().save_model(request, obj, form, change)
+        update_favorites_counts([obj.recipe_id, old_recipe_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        update_favorites_counts([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        update_favorites_counts(recipe_ids)
 
 
 admin.site.register(Recipe, RecipeAdmin)
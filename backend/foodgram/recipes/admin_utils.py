@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from django.utils.http import urlencode
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц в админке.
+    Для нефильтрованного списка в PostgreSQL берёт количество строк из
+    статистики pg_class вместо COUNT(*), если таблица больше
+    ADMIN_ESTIMATED_COUNT_THRESHOLD строк.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+def related_list_link(model, count, **filters):
+    """
+    Ссылка на отфильтрованный список объектов model в админке с их
+    количеством (вместо инлайна со всеми связанными строками).
+    На странице добавления (объекта ещё нет) - прочерк.
+    """
+    if None in filters.values():
+        return '-'
+    opts = model._meta
+    url = reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+    return format_html(
+        '<a href="{}?{}">{}: {}</a>',
+        url, urlencode(filters), opts.verbose_name_plural, count
+    )
+
+
+class BackgroundDeletionMixin:
+    """
+    Удаление в админке без сборщика Django: страница подтверждения
+    перечисляет только сами объекты, без зависимых строк.
+    delete_model и delete_queryset в админке помечают объекты на удаление,
+    строки удаляет process_deletions.
+    """
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            set(),
+            []
+        )
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Subquery
+
+from .models import Recipe, SharedVersion
+from .versions import bump_version, bump_versions, get_version
+
+
+RESPONSE_CACHE_ALIAS = 'responses'
+LIST_VERSION_KEY = 'recipes:list'
+FRAGMENTS_VERSION_KEY = 'fragments'
+FRAGMENT_KEY = 'recipes:{}:{}:fragment:{}'
+RECIPE_CACHE_VERSION = 'recipes:{}:{}:{}'
+
+
+def get_response_cache():
+    """Кэш ответов API для анонимных запросов."""
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+def invalidate_recipe_responses(recipe_id=None):
+    """
+    Сбрасывает закэшированные списки рецептов, страницу и фрагмент рецепта
+    recipe_id (версии в БД: кэш ответов вытесняет записи и не может их
+    хранить). Версия рецепта - Recipe.version.
+    Вызывается после создания, редактирования и удаления рецепта.
+    """
+    bump_version(LIST_VERSION_KEY)
+    if recipe_id is not None:
+        Recipe.all_objects.filter(pk=recipe_id).update(
+            version=F('version') + 1
+        )
+
+
+def get_list_cache_version():
+    """Версия закэшированных списков рецептов."""
+    return '{}:{}'.format(LIST_VERSION_KEY, get_version(LIST_VERSION_KEY))
+
+
+def get_recipe_cache_version(recipe_id):
+    """
+    Версия закэшированной страницы рецепта одним запросом: Recipe.version
+    и общая версия фрагментов (страница меняется и при изменении тегов и
+    ингредиентов). None, если рецепта нет.
+    """
+    row = Recipe.objects.filter(pk=recipe_id).annotate(
+        fragments_version=Subquery(SharedVersion.objects.filter(
+            key=FRAGMENTS_VERSION_KEY
+        ).values('version'))
+    ).values_list('version', 'fragments_version').first()
+    if row is None:
+        return None
+    recipe_version, fragments_version = row
+    return RECIPE_CACHE_VERSION.format(
+        recipe_id, recipe_version, fragments_version or 0
+    )
+
+
+def get_fragment_keys(recipe_versions):
+    """
+    Ключи фрагментов рецептов по словарю {id: Recipe.version}: id, версия
+    рецепта и общая версия фрагментов (меняется при изменении тегов и
+    ингредиентов).
+    """
+    fragments_version = get_version(FRAGMENTS_VERSION_KEY)
+    return {
+        recipe_id: FRAGMENT_KEY.format(
+            recipe_id, recipe_version, fragments_version
+        )
+        for recipe_id, recipe_version in recipe_versions.items()
+    }
+
+
+def get_fragments(keys):
+    """Закэшированные фрагменты по ключам (одним запросом к кэшу)."""
+    cached = get_response_cache().get_many(list(keys.values()))
+    return {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items()
+        if key in cached
+    }
+
+
+def set_fragments(keys, fragments):
+    """Сохраняет фрагменты рецептов (одним запросом к кэшу)."""
+    get_response_cache().set_many(
+        {keys[recipe_id]: fragment
+         for recipe_id, fragment in fragments.items()},
+        settings.RECIPE_FRAGMENT_TIMEOUT
+    )
+
+
+def invalidate_recipe_fragments():
+    """
+    Сбрасывает фрагменты всех рецептов и кэш ответов.
+    Вызывается после изменения тегов и ингредиентов.
+    """
+    bump_versions([FRAGMENTS_VERSION_KEY, LIST_VERSION_KEY])
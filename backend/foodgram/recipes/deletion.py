@@ -0,0 +1,146 @@
+from django.db import models
+
+from users.models import User
+from .cache import invalidate_recipe_responses
+from .images import delete_unused_images
+from .models import FavoriteRecipes, Recipe
+from .pantry import reset_pantry_index, update_pantry_index
+from .popularity import update_favorites_counts
+from .shopping_list import bump_recipe_carts
+
+
+def mark_recipes_for_deletion(recipe_ids):
+    """
+    Помечает рецепты на удаление: они сразу пропадают из выдачи, а строки
+    удаляет process_deletions. Меняет версии корзин с этими рецептами и
+    убирает их из индекса подбора.
+    """
+    recipe_ids = list(recipe_ids)
+    Recipe.all_objects.filter(pk__in=recipe_ids).update(
+        pending_deletion=True
+    )
+    bump_recipe_carts(recipe_ids)
+    for recipe_id in recipe_ids:
+        update_pantry_index(recipe_id)
+        invalidate_recipe_responses(recipe_id)
+
+
+def mark_users_for_deletion(user_ids):
+    """
+    Деактивирует юзеров (вход и токены перестают работать) и помечает на
+    удаление их и их рецепты, меняет версии корзин с этими рецептами и
+    перестраивает индекс подбора. Строки удаляет process_deletions.
+    """
+    user_ids = list(user_ids)
+    User.objects.filter(pk__in=user_ids).update(
+        is_active=False, pending_deletion=True
+    )
+    Recipe.all_objects.filter(author__in=user_ids).update(
+        pending_deletion=True
+    )
+    bump_recipe_carts(
+        Recipe.all_objects.filter(author__in=user_ids).values('pk')
+    )
+    reset_pantry_index()
+    invalidate_recipe_responses()
+
+
+def delete_dependents(model, pks, batch_size):
+    """
+    Удаляет строки, ссылающиеся на объекты model с id из pks: по
+    CASCADE - пачками (рекурсивно), по SET_NULL - обнуляет ссылку,
+    связи многие-ко-многим - строки автоматических промежуточных таблиц.
+    """
+    deleted = 0
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if through._meta.auto_created:
+            deleted += delete_in_batches(through._base_manager.filter(
+                **{f'{field.m2m_field_name()}__in': pks}
+            ), batch_size)
+    for relation in model._meta.related_objects:
+        if relation.many_to_many:
+            if relation.through._meta.auto_created:
+                deleted += delete_in_batches(
+                    relation.through._base_manager.filter(**{
+                        f'{relation.field.m2m_reverse_field_name()}__in': pks
+                    }),
+                    batch_size
+                )
+            continue
+        related = relation.related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': pks}
+        )
+        if relation.on_delete is models.CASCADE:
+            deleted += delete_in_batches(related, batch_size)
+        elif relation.on_delete is models.SET_NULL:
+            related.update(**{relation.field.name: None})
+    return deleted
+
+
+def delete_rows(model, pks, batch_size):
+    """
+    Удаляет объекты model с id из pks и зависимые строки сырыми DELETE,
+    без загрузки объектов сборщиком Django.
+    """
+    deleted = delete_dependents(model, pks, batch_size)
+    queryset = model._base_manager.filter(pk__in=pks)
+    return deleted + queryset._raw_delete(queryset.db)
+
+
+def delete_in_batches(queryset, batch_size):
+    """
+    Удаляет строки queryset пачками по batch_size (вместе с зависимыми).
+    Возвращает количество удалённых строк.
+    """
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += delete_rows(queryset.model, pks, batch_size)
+
+
+def delete_pending_recipes(batch_size):
+    """
+    Удаляет помеченные рецепты (и рецепты помеченных юзеров) пачками,
+    убирает их из индекса подбора и удаляет картинки без рецептов.
+    Возвращает количество удалённых рецептов.
+    """
+    Recipe.all_objects.filter(
+        author__pending_deletion=True, pending_deletion=False
+    ).update(pending_deletion=True)
+    queryset = Recipe.all_objects.filter(pending_deletion=True)
+    deleted = 0
+    while True:
+        recipes = list(queryset.values_list('pk', 'image')[:batch_size])
+        if not recipes:
+            return deleted
+        pks = [pk for pk, _ in recipes]
+        delete_rows(Recipe, pks, batch_size)
+        for pk in pks:
+            update_pantry_index(pk)
+            invalidate_recipe_responses(pk)
+        delete_unused_images([image for _, image in recipes])
+        deleted += len(pks)
+
+
+def delete_pending_users(batch_size):
+    """
+    Удаляет помеченных юзеров пачками и пересчитывает счётчики избранного
+    рецептов, которые они добавляли в избранное.
+    Возвращает количество удалённых юзеров.
+    """
+    queryset = User.objects.filter(pending_deletion=True)
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        recipe_ids = list(set(FavoriteRecipes.objects.filter(
+            user__in=pks
+        ).values_list('recipe_id', flat=True)))
+        delete_rows(User, pks, batch_size)
+        for start in range(0, len(recipe_ids), batch_size):
+            update_favorites_counts(recipe_ids[start:start + batch_size])
+        deleted += len(pks)
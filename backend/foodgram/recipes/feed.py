@@ -0,0 +1,141 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from users.models import Subscribe
+from .models import FeedEntry, Recipe
+
+
+PULL_AUTHORS_CACHE_KEY = 'feed:pull_authors'
+
+
+def get_pull_author_ids():
+    """
+    Возвращает множество id популярных авторов (подписчиков не меньше
+    FEED_PULL_FOLLOWERS_THRESHOLD).
+    Рецепты таких авторов не раскладываются по лентам, а подтягиваются
+    при чтении ленты. Результат кэшируется.
+    """
+    def count_pull_authors():
+        return set(
+            Subscribe.objects.values('author').annotate(
+                followers_count=Count('pk')
+            ).filter(
+                followers_count__gte=settings.FEED_PULL_FOLLOWERS_THRESHOLD
+            ).values_list('author', flat=True)
+        )
+    return cache.get_or_set(
+        PULL_AUTHORS_CACHE_KEY,
+        count_pull_authors,
+        settings.FEED_PULL_AUTHORS_CACHE_TIMEOUT
+    )
+
+
+def bulk_create_entries(entries):
+    """Создаёт записи ленты пачками по FEED_FANOUT_BATCH_SIZE."""
+    entries = iter(entries)
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    batch = list(islice(entries, batch_size))
+    while batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, batch_size))
+
+
+def fan_out_recipe(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    if recipe.author_id in get_pull_author_ids():
+        return
+    follower_ids = Subscribe.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True).iterator(
+        chunk_size=settings.FEED_FANOUT_BATCH_SIZE
+    )
+    bulk_create_entries(
+        FeedEntry(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+        for user_id in follower_ids
+    )
+
+
+def add_author_to_feed(user, author):
+    """
+    Добавляет в ленту пользователя последние FEED_BACKFILL_SIZE рецептов
+    автора, на которого он подписался.
+    """
+    if author.pk in get_pull_author_ids():
+        return
+    recipes = author.recipes.values_list('pk', 'pub_date')[
+        :settings.FEED_BACKFILL_SIZE
+    ]
+    bulk_create_entries(
+        FeedEntry(user=user, recipe_id=recipe_id, pub_date=pub_date)
+        for recipe_id, pub_date in recipes
+    )
+
+
+def remove_author_from_feed(user, author):
+    """Убирает из ленты юзера рецепты автора, от которого он отписался."""
+    FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def get_feed_page(user, position, limit, reverse=False):
+    """
+    Страница ленты подписок пользователя: до limit пар (pub_date, id
+    рецепта) после позиции position (пара того же вида или None) в порядке
+    убывания, при reverse - до неё в порядке возрастания.
+    Разложенные записи FeedEntry читаются по индексу (user, -pub_date,
+    -recipe), рецепты популярных авторов (pull-on-read) - по индексу
+    (author, -pub_date, -id); обе выборки ограничены limit и сливаются.
+    """
+    pull_author_ids = list(
+        Subscribe.objects.filter(
+            user=user,
+            author__in=get_pull_author_ids()
+        ).values_list('author', flat=True)
+    )
+    sources = [
+        (FeedEntry.objects.filter(user=user), 'recipe_id'),
+        (Recipe.objects.filter(author__in=pull_author_ids), 'pk'),
+    ]
+    if not pull_author_ids:
+        sources.pop()
+    rows = []
+    for queryset, id_field in sources:
+        if position is not None:
+            pub_date, recipe_id = position
+            if reverse:
+                queryset = queryset.filter(pub_date__gte=pub_date).filter(
+                    Q(pub_date__gt=pub_date)
+                    | Q(**{f'{id_field}__gt': recipe_id})
+                )
+            else:
+                queryset = queryset.filter(pub_date__lte=pub_date).filter(
+                    Q(pub_date__lt=pub_date)
+                    | Q(**{f'{id_field}__lt': recipe_id})
+                )
+        ordering = ('pub_date', id_field)
+        if not reverse:
+            ordering = tuple(f'-{field}' for field in ordering)
+        rows.extend(
+            queryset.order_by(*ordering).values_list('pub_date', id_field)[
+                :limit
+            ]
+        )
+    return sorted(set(rows), reverse=not reverse)[:limit]
+
+
+def get_feed_recipes(rows, queryset):
+    """
+    Загружает рецепты страницы ленты из queryset (Recipe.values() с id)
+    одним запросом в порядке rows.
+    """
+    recipes = {
+        recipe['id']: recipe
+        for recipe in queryset.filter(
+            pk__in=[recipe_id for _, recipe_id in rows]
+        )
+    }
+    return [
+        recipes[recipe_id] for _, recipe_id in rows if recipe_id in recipes
+    ]
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Recipe
+from .storage import image_storage
+
+
+IMAGE_DIRECTORY = 'recipes/images'
+
+
+def delete_unused_images(names):
+    """
+    После коммита удаляет файлы картинок, на которые больше не ссылается
+    ни один рецепт (один файл может быть у нескольких рецептов).
+    """
+    names = set(filter(None, names))
+    if not names:
+        return
+
+    def delete():
+        used = set(Recipe.objects.filter(
+            image__in=names
+        ).values_list('image', flat=True))
+        for name in names - used:
+            image_storage.delete(name)
+
+    transaction.on_commit(delete)
+
+
+def collect_unused_images():
+    """
+    Удаляет из каталога картинок файлы без рецептов, кроме созданных
+    позже RECIPE_IMAGE_GC_GRACE назад (их рецепт может ещё сохраняться).
+    Возвращает количество удалённых файлов.
+    """
+    if not image_storage.exists(IMAGE_DIRECTORY):
+        return 0
+    _, files = image_storage.listdir(IMAGE_DIRECTORY)
+    names = {f'{IMAGE_DIRECTORY}/{file}' for file in files}
+    for name in Recipe.objects.values_list('image', flat=True).iterator(
+        chunk_size=settings.CORPUS_CHUNK_SIZE
+    ):
+        names.discard(name)
+    deadline = datetime.now(timezone.utc) - settings.RECIPE_IMAGE_GC_GRACE
+    deleted = 0
+    for name in names:
+        if image_storage.get_modified_time(name) < deadline:
+            image_storage.delete(name)
+            deleted += 1
+    return deleted
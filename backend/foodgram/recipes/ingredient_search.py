@@ -0,0 +1,252 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from threading import Lock
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import (BooleanField, Case, FloatField, Func,
+                              IntegerField, Q, Value, When)
+from django.db.models.functions import Upper
+
+from .cache import invalidate_recipe_fragments
+from .models import Ingredient
+from .shopping_list import bump_all_carts
+from .versions import bump_version, get_version
+
+
+VERSION_KEY = 'ingredients'
+WORD_RE = re.compile(r'\w+')
+
+
+class TrigramSimilarity(Func):
+    """similarity() из pg_trgm."""
+    function = 'SIMILARITY'
+    output_field = FloatField()
+
+
+class TrigramMatch(Func):
+    """
+    Оператор % из pg_trgm (похожесть не ниже pg_trgm.similarity_threshold,
+    порог задаёт set_similarity_threshold).
+    """
+    arg_joiner = ' %% '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def get_trigrams(text):
+    """Триграммы строки как в pg_trgm: по словам, с пробелами по краям."""
+    trigrams = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def get_word_starts(name):
+    """Хвосты названия, начинающиеся со второго и следующих слов."""
+    return [
+        name[position + 1:]
+        for position, char in enumerate(name)
+        if char == ' ' and position + 1 < len(name)
+    ]
+
+
+IngredientSearchData = namedtuple('IngredientSearchData', (
+    'ids', 'names', 'prefixes', 'word_prefixes', 'postings', 'trigram_counts'
+))
+
+
+class IngredientSearchIndex:
+    """
+    Индекс названий ингредиентов в памяти процесса.
+    Отсортированные названия и хвосты со слов - для поиска по началу
+    названия и слова, триграммы - для поиска с опечатками.
+    Перестраивается, когда меняется общая версия ингредиентов в БД.
+    Данные индекса заменяются целиком, поэтому поиск идёт без блокировки;
+    блокировка нужна только, чтобы не строить индекс в нескольких потоках.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.data = IngredientSearchData(
+            [], [], [], [], {}, np.empty(0, dtype=np.int32)
+        )
+
+    def rebuild(self, version):
+        """Строит индекс по всем ингредиентам."""
+        rows = Ingredient.objects.order_by('pk').values_list('pk', 'name')
+        ids = []
+        names = []
+        postings = defaultdict(list)
+        trigram_counts = []
+        for position, (pk, name) in enumerate(rows.iterator()):
+            name = name.lower()
+            ids.append(pk)
+            names.append(name)
+            trigrams = get_trigrams(name)
+            trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                postings[trigram].append(position)
+        self.data = IngredientSearchData(
+            ids=ids,
+            names=names,
+            prefixes=sorted(
+                (name, position) for position, name in enumerate(names)
+            ),
+            word_prefixes=sorted(
+                (word_start, position)
+                for position, name in enumerate(names)
+                for word_start in get_word_starts(name)
+            ),
+            postings={
+                trigram: np.array(positions, dtype=np.int32)
+                for trigram, positions in postings.items()
+            },
+            trigram_counts=np.array(trigram_counts, dtype=np.int32),
+        )
+        self.version = version
+
+    def sync(self):
+        """
+        Перестраивает индекс, если ингредиенты изменились.
+        Версия в БД читается без блокировки; под блокировкой она
+        проверяется ещё раз, чтобы индекс построил только один поток.
+        Возвращает актуальные данные индекса.
+        """
+        version = get_version(VERSION_KEY)
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.rebuild(version)
+        return self.data
+
+    def get_prefix_matches(self, entries, prefix):
+        """Позиции записей, начинающихся с prefix (бинарный поиск)."""
+        index = bisect_left(entries, (prefix,))
+        while index < len(entries) and entries[index][0].startswith(prefix):
+            yield entries[index][1]
+            index += 1
+
+    def get_similarities(self, data, query):
+        """Похожесть запроса на каждое название (как similarity())."""
+        postings = [
+            data.postings[trigram]
+            for trigram in get_trigrams(query)
+            if trigram in data.postings
+        ]
+        if not postings:
+            return np.zeros(len(data.names))
+        shared = np.bincount(
+            np.concatenate(postings), minlength=len(data.names)
+        )
+        total = len(get_trigrams(query)) + data.trigram_counts - shared
+        return shared / np.maximum(total, 1)
+
+    def search(self, query, limit):
+        """
+        Возвращает до limit id ингредиентов: сначала совпадения с началом
+        названия, затем с началом слова, затем похожие по триграммам;
+        внутри группы - по убыванию похожести и по названию.
+        """
+        query = query.lower()
+        data = self.sync()
+        similarities = self.get_similarities(data, query)
+        ranks = {}
+        for position in np.flatnonzero(
+            similarities >= settings.INGREDIENT_SEARCH_SIMILARITY
+        ).tolist():
+            ranks[position] = 2
+        for position in self.get_prefix_matches(data.word_prefixes, query):
+            ranks[position] = 1
+        for position in self.get_prefix_matches(data.prefixes, query):
+            ranks[position] = 0
+        top = sorted(ranks, key=lambda position: (
+            ranks[position], -similarities[position], data.names[position]
+        ))[:limit]
+        return [data.ids[position] for position in top]
+
+
+ingredient_search_index = IngredientSearchIndex()
+
+
+def invalidate_ingredient_search():
+    """
+    Публикует новую версию ингредиентов: индексы поиска во всех процессах
+    перестроятся при следующем запросе, фрагменты рецептов сбрасываются,
+    версии корзин (списки покупок) меняются.
+    Вызывается после создания, изменения и удаления ингредиентов.
+    """
+    bump_version(VERSION_KEY)
+    invalidate_recipe_fragments()
+    bump_all_carts()
+
+
+def set_similarity_threshold():
+    """
+    Задаёт порог оператора % для соединения: INGREDIENT_SEARCH_SIMILARITY
+    вместо pg_trgm.similarity_threshold сервера.
+    Порог запоминается для открытого соединения, SET выполняется один раз
+    (внутри транзакции не запоминается: откат отменит и SET).
+    """
+    threshold = settings.INGREDIENT_SEARCH_SIMILARITY
+    connection.ensure_connection()
+    state = (connection.connection, threshold)
+    if getattr(connection, 'similarity_threshold', None) == state:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, false)",
+            [str(threshold)]
+        )
+    if not connection.in_atomic_block:
+        connection.similarity_threshold = state
+
+
+def search_ingredients_postgresql(queryset, query, limit):
+    """
+    Поиск на PostgreSQL: LIKE и оператор % по UPPER(name) используют
+    GIN-индекс pg_trgm (миграция 0011).
+    Порог % - INGREDIENT_SEARCH_SIMILARITY, как у индекса в памяти.
+    """
+    set_similarity_threshold()
+    query = query.upper()
+    return queryset.annotate(
+        upper_name=Upper('name')
+    ).filter(
+        Q(TrigramMatch('upper_name', Value(query)))
+        | Q(upper_name__startswith=query)
+        | Q(upper_name__contains=f' {query}')
+    ).annotate(
+        search_rank=Case(
+            When(upper_name__startswith=query, then=Value(0)),
+            When(upper_name__contains=f' {query}', then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField()
+        ),
+        similarity=TrigramSimilarity('upper_name', Value(query))
+    ).order_by('search_rank', '-similarity', 'name')[:limit]
+
+
+def search_ingredients(queryset, query):
+    """
+    Ранжированный поиск ингредиентов по названию с учётом опечаток,
+    не больше INGREDIENT_SEARCH_LIMIT результатов.
+    На PostgreSQL - запросом с pg_trgm, иначе - индексом в памяти.
+    """
+    limit = settings.INGREDIENT_SEARCH_LIMIT
+    query = query.strip()
+    if not query:
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        return search_ingredients_postgresql(queryset, query, limit)
+    ids = ingredient_search_index.search(query, limit)
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *[When(pk=pk, then=Value(position))
+          for position, pk in enumerate(ids)],
+        output_field=IntegerField()
+    ))
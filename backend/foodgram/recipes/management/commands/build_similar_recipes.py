@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from recipes.similarity import rebuild_similar_recipes
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает похожие рецепты (top-K по пересечению ингредиентов и тегов)
+    для всех рецептов.
+    """
+
+    def handle(self, *args, **options):
+        created = rebuild_similar_recipes()
+        self.stdout.write(f'Сохранено пар похожих рецептов: {created}')
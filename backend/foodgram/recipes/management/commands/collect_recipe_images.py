@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from recipes.images import collect_unused_images
+
+
+class Command(BaseCommand):
+    """
+    Удаляет файлы картинок, на которые не ссылается ни один рецепт
+    (остаются после каскадных и массовых удалений).
+    Запускается периодически (например, из cron).
+    """
+
+    def handle(self, *args, **options):
+        deleted = collect_unused_images()
+        self.stdout.write(f'Удалено картинок: {deleted}')
@@ -0,0 +1,91 @@
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, RecipeTag, Tag
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Выгружает рецепты в файл JSON Lines (одна запись на строку).
+    Порядок записей: tag, ingredient, user (авторы), recipe.
+    Рецепт содержит id тегов, пары [id ингредиента, количество] и путь
+    к картинке в MEDIA_ROOT (сами файлы переносятся отдельно), дата
+    публикации - с микросекундами (порядок лент и курсоров сохраняется).
+    Записи читаются из БД пачками, память не растёт с размером выгрузки.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для выгрузки (.jsonl)')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.CORPUS_CHUNK_SIZE,
+            help='Размер пачки при чтении из БД'
+        )
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        with open(options['path'], 'w', encoding='utf8') as file:
+            self.file = file
+            self.write_values('tag', Tag.objects.values(
+                'id', 'name', 'color', 'slug'
+            ))
+            self.write_values('ingredient', Ingredient.objects.values(
+                'id', 'name', 'measurement_unit'
+            ))
+            self.write_values('user', User.objects.filter(
+                pk__in=Recipe.objects.values('author')
+            ).values(
+                'id', 'username', 'email', 'first_name', 'last_name',
+                'password'
+            ))
+            recipes = Recipe.objects.order_by('pk').values(
+                'id', 'author_id', 'name', 'text', 'cooking_time',
+                'pub_date', 'image', 'portions'
+            ).iterator(chunk_size=self.chunk_size)
+            total = 0
+            chunk = list(islice(recipes, self.chunk_size))
+            while chunk:
+                self.write_recipes(chunk)
+                total += len(chunk)
+                chunk = list(islice(recipes, self.chunk_size))
+        self.stdout.write(f'Выгружено рецептов: {total}')
+
+    def write(self, record_type, record):
+        """Пишет одну запись в файл."""
+        record['type'] = record_type
+        self.file.write(
+            json.dumps(record, ensure_ascii=False, cls=DjangoJSONEncoder)
+            + '\n'
+        )
+
+    def write_values(self, record_type, queryset):
+        """Пишет все записи queryset.values() одного типа."""
+        for record in queryset.iterator(chunk_size=self.chunk_size):
+            self.write(record_type, record)
+
+    def write_recipes(self, chunk):
+        """Дополняет пачку рецептов тегами и ингредиентами и пишет в файл."""
+        recipe_ids = [recipe['id'] for recipe in chunk]
+        tags = defaultdict(list)
+        for recipe_id, tag_id in RecipeTag.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'tag_id'):
+            tags[recipe_id].append(tag_id)
+        ingredients = defaultdict(list)
+        links = IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id', 'amount')
+        for recipe_id, ingredient_id, amount in links:
+            ingredients[recipe_id].append([ingredient_id, amount])
+        for recipe in chunk:
+            recipe['pub_date'] = recipe['pub_date'].isoformat()
+            recipe['tags'] = tags[recipe['id']]
+            recipe['ingredients'] = ingredients[recipe['id']]
+            self.write('recipe', recipe)
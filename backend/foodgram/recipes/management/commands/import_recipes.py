@@ -0,0 +1,272 @@
+import json
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from recipes.cache import invalidate_recipe_responses
+from recipes.ingredient_search import invalidate_ingredient_search
+from recipes.models import (Ingredient, IngredientRecipe, Recipe, RecipeTag,
+                            Tag, get_free_tag_bits)
+from recipes.pantry import reset_pantry_index
+from recipes.tags import get_tags_mask, invalidate_tag_bits
+from users.models import User, normalize_email
+
+
+id_maps = {}
+
+
+def init_worker(maps):
+    """Настраивает Django и таблицы соответствия id в процессе-воркере."""
+    django.setup()
+    id_maps.update(maps)
+
+
+def import_recipe_batch(lines):
+    """
+    Создаёт пачку рецептов с тегами и ингредиентами через bulk_create.
+    Старые id автора, тегов и ингредиентов заменяются на новые.
+    Возвращает количество созданных рецептов.
+    """
+    records = [json.loads(line) for line in lines]
+    recipes = [
+        Recipe(
+            author_id=id_maps['user'][record['author_id']],
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+            image=record['image'],
+            portions=record['portions'],
+            tags_mask=get_tags_mask(
+                id_maps['tag_bit'][tag_id] for tag_id in record['tags']
+            ),
+        )
+        for record in records
+    ]
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            for recipe in recipes:
+                recipe.save()
+        for recipe, record in zip(recipes, records):
+            recipe.pub_date = parse_datetime(record['pub_date'])
+        Recipe.objects.bulk_update(recipes, ['pub_date'])
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag_id=id_maps['tag'][tag_id])
+            for recipe, record in zip(recipes, records)
+            for tag_id in record['tags']
+        )
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient_id=id_maps['ingredient'][ingredient_id],
+                amount=amount
+            )
+            for recipe, record in zip(recipes, records)
+            for ingredient_id, amount in record['ingredients']
+        )
+    return len(recipes)
+
+
+class Command(BaseCommand):
+    """
+    Загружает рецепты из файла JSON Lines, созданного export_recipes.
+    Теги сопоставляются по slug, ингредиенты - по названию и единице
+    измерения, авторы - по email (недостающие создаются). Автор, чей
+    username уже занят юзером с другим email, не создаётся: его рецепты
+    пропускаются и перечисляются в отчёте.
+    Рецепты создаются пачками в нескольких процессах; в очереди держится
+    не больше двух пачек на процесс, поэтому файл не читается в память
+    целиком.
+    Ленты подписок и похожие рецепты не пересчитываются: после загрузки
+    нужно запустить build_similar_recipes.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки (.jsonl)')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.CORPUS_CHUNK_SIZE,
+            help='Количество рецептов в пачке'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Количество процессов (для PostgreSQL)'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.id_maps = {
+            'tag': {}, 'tag_bit': {}, 'ingredient': {}, 'user': {}
+        }
+        self.pending = {'tag': [], 'ingredient': [], 'user': []}
+        self.conflicts = []
+        self.started = False
+        batch = []
+        total = skipped = 0
+        with open(options['path'], encoding='utf8') as file:
+            for line in file:
+                record = json.loads(line)
+                if record['type'] != 'recipe':
+                    self.add_reference(record)
+                    continue
+                if not self.started:
+                    self.start_workers(options['workers'])
+                if record['author_id'] not in self.id_maps['user']:
+                    skipped += 1
+                    continue
+                batch.append(line)
+                if len(batch) >= self.batch_size:
+                    total += self.submit(batch)
+                    batch = []
+        if not self.started:
+            self.start_workers(options['workers'])
+        if batch:
+            total += self.submit(batch)
+        total += self.finish()
+        reset_pantry_index()
+        invalidate_recipe_responses()
+        invalidate_ingredient_search()
+        invalidate_tag_bits()
+        self.stdout.write(f'Загружено рецептов: {total}')
+        if self.conflicts:
+            self.stderr.write(
+                f'Пропущено рецептов: {skipped}. Username занят юзером с '
+                'другим email: ' + ', '.join(self.conflicts)
+            )
+
+    def add_reference(self, record):
+        """Накапливает запись справочника (tag, ingredient, user)."""
+        record_type = record['type']
+        self.pending[record_type].append(record)
+        if len(self.pending[record_type]) >= self.batch_size:
+            self.flush(record_type)
+
+    def flush(self, record_type):
+        """Создаёт накопленные записи справочников и обновляет соответствия."""
+        records = self.pending[record_type]
+        if records:
+            getattr(self, f'import_{record_type}s')(records)
+        self.pending[record_type] = []
+
+    def import_tags(self, records):
+        existing = set(Tag.objects.filter(
+            slug__in=[record['slug'] for record in records]
+        ).values_list('slug', flat=True))
+        missing = [
+            record for record in records if record['slug'] not in existing
+        ]
+        free_bits = get_free_tag_bits(len(missing))
+        if len(free_bits) < len(missing):
+            raise CommandError('Не хватает свободных битов маски тегов.')
+        Tag.objects.bulk_create(
+            (
+                Tag(name=record['name'], color=record['color'],
+                    slug=record['slug'], bit=bit)
+                for record, bit in zip(missing, free_bits)
+            ),
+            ignore_conflicts=True
+        )
+        new_tags = {
+            slug: (pk, bit) for slug, pk, bit in Tag.objects.filter(
+                slug__in=[record['slug'] for record in records]
+            ).values_list('slug', 'pk', 'bit')
+        }
+        for record in records:
+            pk, bit = new_tags[record['slug']]
+            self.id_maps['tag'][record['id']] = pk
+            self.id_maps['tag_bit'][record['id']] = bit
+
+    def import_ingredients(self, records):
+        existing = {
+            (name, unit): pk for pk, name, unit in Ingredient.objects.filter(
+                name__in=[record['name'] for record in records]
+            ).values_list('pk', 'name', 'measurement_unit')
+        }
+        missing = [
+            Ingredient(name=record['name'],
+                       measurement_unit=record['measurement_unit'])
+            for record in records
+            if (record['name'], record['measurement_unit']) not in existing
+        ]
+        if missing:
+            Ingredient.objects.bulk_create(missing)
+            return self.import_ingredients(records)
+        for record in records:
+            self.id_maps['ingredient'][record['id']] = existing[
+                (record['name'], record['measurement_unit'])
+            ]
+
+    def import_users(self, records):
+        for record in records:
+            record['email'] = normalize_email(record['email'])
+        User.objects.bulk_create(
+            (
+                User(username=record['username'], email=record['email'],
+                     first_name=record['first_name'],
+                     last_name=record['last_name'],
+                     password=record['password'])
+                for record in records
+            ),
+            ignore_conflicts=True
+        )
+        new_ids = dict(User.objects.filter(
+            email__in=[record['email'] for record in records]
+        ).values_list('email', 'pk'))
+        for record in records:
+            if record['email'] not in new_ids:
+                self.conflicts.append(record['username'])
+                continue
+            self.id_maps['user'][record['id']] = new_ids[record['email']]
+
+    def start_workers(self, workers):
+        """
+        Создаёт оставшиеся записи справочников и запускает пул процессов
+        (или работу в текущем процессе).
+        """
+        for record_type in self.pending:
+            self.flush(record_type)
+        self.started = True
+        self.futures = set()
+        self.max_pending = workers * 2
+        if workers > 1:
+            connections.close_all()
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_worker,
+                initargs=(self.id_maps,)
+            )
+        else:
+            self.executor = None
+            id_maps.update(self.id_maps)
+
+    def submit(self, batch):
+        """
+        Отправляет пачку рецептов в пул, дожидаясь места в очереди.
+        Возвращает количество рецептов, загруженных к этому моменту.
+        """
+        if self.executor is None:
+            return import_recipe_batch(batch)
+        imported = 0
+        if len(self.futures) >= self.max_pending:
+            done, self.futures = wait(
+                self.futures, return_when=FIRST_COMPLETED
+            )
+            imported = sum(future.result() for future in done)
+        self.futures.add(self.executor.submit(import_recipe_batch, batch))
+        return imported
+
+    def finish(self):
+        """Дожидается оставшихся пачек и останавливает пул."""
+        if self.executor is None:
+            return 0
+        imported = sum(future.result() for future in self.futures)
+        self.executor.shutdown()
+        return imported
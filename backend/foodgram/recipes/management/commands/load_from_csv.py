@@ -2,6 +2,7 @@ from csv import DictReader
 
 from django.core.management import BaseCommand
 
+from recipes.ingredient_search import invalidate_ingredient_search
 from recipes.models import Ingredient
 
 
@@ -16,3 +17,4 @@ class Command(BaseCommand):
                 measurement_unit=row['measurement_unit']
             )
             ingredient.save()
+        invalidate_ingredient_search()
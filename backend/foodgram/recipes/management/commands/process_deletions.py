@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.deletion import delete_pending_recipes, delete_pending_users
+
+
+class Command(BaseCommand):
+    """
+    Удаляет помеченные на удаление рецепты и юзеров вместе с зависимыми
+    строками пачками по DELETION_BATCH_SIZE, затем картинки без рецептов.
+    Запускается периодически (например, из cron).
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.DELETION_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        recipes = delete_pending_recipes(options['batch_size'])
+        users = delete_pending_users(options['batch_size'])
+        self.stdout.write(f'Удалено рецептов: {recipes}, юзеров: {users}')
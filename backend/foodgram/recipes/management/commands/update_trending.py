@@ -0,0 +1,19 @@
+from django.core.management import BaseCommand
+
+from recipes.popularity import update_favorites_counts
+from recipes.trending import rebuild_trending
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает рейтинг популярности рецептов (trending) по добавлениям
+    в избранное и корзину за последние TRENDING_WINDOW и сверяет счётчики
+    избранного рецептов (favorites_count).
+    Запускается периодически (например, из cron).
+    """
+
+    def handle(self, *args, **options):
+        ranked = rebuild_trending()
+        self.stdout.write(f'Рецептов в рейтинге: {ranked}')
+        updated = update_favorites_counts()
+        self.stdout.write(f'Счётчиков избранного пересчитано: {updated}')
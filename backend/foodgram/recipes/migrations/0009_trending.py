@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-19 10:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRank',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('trending', models.FloatField(db_index=True, verbose_name='Популярность')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='favoriterecipes',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-19 10:48
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_trending'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.storage.ContentHashedStorage(), upload_to='recipes/images/', verbose_name='Картинка'),
+        ),
+    ]
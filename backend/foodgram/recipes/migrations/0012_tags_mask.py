@@ -0,0 +1,58 @@
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_tags_masks(apps, schema_editor):
+    """Раздаёт теги биты по порядку id и заполняет маски рецептов."""
+    Tag = apps.get_model('recipes', 'Tag')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeTag = apps.get_model('recipes', 'RecipeTag')
+    tags = list(Tag.objects.order_by('pk'))
+    for bit, tag in enumerate(tags):
+        tag.bit = bit
+    Tag.objects.bulk_update(tags, ['bit'])
+    masks = defaultdict(int)
+    for recipe_id, bit in RecipeTag.objects.values_list(
+        'recipe_id', 'tag__bit'
+    ).iterator():
+        masks[recipe_id] |= 1 << bit
+    Recipe.objects.bulk_update(
+        [Recipe(pk=pk, tags_mask=mask) for pk, mask in masks.items()],
+        ['tags_mask'],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_ingredient_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(
+                editable=False, null=True,
+                verbose_name='Бит в маске тегов рецепта'
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(
+                default=0, editable=False, verbose_name='Маска тегов'
+            ),
+        ),
+        migrations.RunPython(fill_tags_masks, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(
+                editable=False, unique=True,
+                verbose_name='Бит в маске тегов рецепта'
+            ),
+        ),
+    ]
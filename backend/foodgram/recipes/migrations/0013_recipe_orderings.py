@@ -0,0 +1,58 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_favorites_counts(apps, schema_editor):
+    """Заполняет favorites_count рецептов по FavoriteRecipes."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FavoriteRecipes = apps.get_model('recipes', 'FavoriteRecipes')
+    favorites_count = FavoriteRecipes.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        count=Count('pk')
+    ).values('count')
+    Recipe.objects.update(favorites_count=Coalesce(
+        Subquery(favorites_count, output_field=IntegerField()), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_tags_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='В избранном'
+            ),
+        ),
+        migrations.RunPython(
+            fill_favorites_counts, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['cooking_time', 'id'],
+                name='recipe_cooking_time_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-pub_date', '-id', 'cooking_time'],
+                name='recipe_pub_date_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-favorites_count', '-id', 'cooking_time'],
+                name='recipe_popularity_idx'
+            ),
+        ),
+    ]
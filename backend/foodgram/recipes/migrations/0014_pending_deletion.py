@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_orderings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='pending_deletion',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Помечен на удаление'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(pending_deletion=True), fields=['id'], name='recipe_pending_deletion_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2 on 2026-10-19 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PantryDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(unique=True, verbose_name='Версия')),
+                ('recipe_id', models.PositiveIntegerField(null=True, verbose_name='id рецепта')),
+                ('ingredient_ids', models.JSONField(default=list, verbose_name='id ингредиентов')),
+            ],
+            options={
+                'verbose_name': 'Изменение индекса подбора',
+                'verbose_name_plural': 'Изменения индекса подбора',
+                'ordering': ['version'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SharedVersion',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия данных',
+                'verbose_name_plural': 'Версии данных',
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+from django.db.models import FloatField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_trending(apps, schema_editor):
+    """Копирует рейтинг RecipeRank в Recipe.trending."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeRank = apps.get_model('recipes', 'RecipeRank')
+    trending = RecipeRank.objects.filter(
+        recipe=OuterRef('pk')
+    ).values('trending')
+    Recipe.objects.update(trending=Coalesce(
+        Subquery(trending, output_field=FloatField()), 0.0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_shared_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='trending',
+            field=models.FloatField(
+                default=0, editable=False, verbose_name='Популярность'
+            ),
+        ),
+        migrations.RunPython(fill_trending, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-trending', '-pub_date', '-id', 'cooking_time'],
+                name='recipe_trending_idx'
+            ),
+        ),
+    ]
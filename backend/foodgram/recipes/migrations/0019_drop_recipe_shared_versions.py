@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def drop_recipe_versions(apps, schema_editor):
+    """
+    Удаляет общие версии отдельных рецептов (recipes:<id>): версия
+    рецепта теперь в Recipe.version.
+    """
+    SharedVersion = apps.get_model('recipes', 'SharedVersion')
+    SharedVersion.objects.filter(key__regex=r'^recipes:[0-9]+$').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_recipe_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_recipe_versions, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,44 @@
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
 
 from users.models import User
+from .storage import image_storage
+
+
+TAG_MASK_BITS = 63
+
+
+def get_free_tag_bits(count):
+    """До count свободных битов маски тегов по возрастанию."""
+    used = set(Tag.objects.values_list('bit', flat=True))
+    return [bit for bit in range(TAG_MASK_BITS) if bit not in used][:count]
 
 
 class Tag(models.Model):
     """
     Тэги для рецептов (может быть несколько)
     Связаны с Recipe через ManyToManyField и RecipeTag
+    Каждому тегу выделяется бит в маске тегов рецепта (не больше 63 тегов)
     """
     name = models.CharField('Название', max_length=200, unique=True)
     color = models.CharField('Цветовой HEX-код', max_length=7, unique=True)
     slug = models.SlugField('Уникальный слаг', unique=True, max_length=200)
+    bit = models.PositiveSmallIntegerField(
+        'Бит в маске тегов рецепта',
+        unique=True,
+        editable=False
+    )
+
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            free_bits = get_free_tag_bits(1)
+            if not free_bits:
+                raise ValidationError(
+                    f'Тегов не может быть больше {TAG_MASK_BITS}.'
+                )
+            self.bit = free_bits[0]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -29,13 +56,28 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeManager(models.Manager):
+    """Рецепты без помеченных на удаление."""
+    def get_queryset(self):
+        return super().get_queryset().filter(pending_deletion=False)
+
+
 class Recipe(models.Model):
     """
     Модель рецепта
     Связаны с Ingredient через IngredientRecipe (с доп.полем amount)
     Связаны с Tag через ManyToManyField и RecipeTag
+    Теги продублированы в tags_mask (биты Tag.bit) для фильтра без JOIN
+    Количество добавлений в избранное продублировано в favorites_count
+    для сортировки по популярности
     Связаны с User через ForeignKey
+    Картинка хранится под именем из хэша содержимого
+    Удаляемый рецепт помечается pending_deletion и скрывается менеджером
+    objects, строки удаляет фоновая команда process_deletions
+    (all_objects - менеджер со всеми рецептами)
     Автосортиовка по убыванию даты публикации
+    Составные индексы под сортировки ?ordering= (с id для однозначного
+    порядка и keyset-пагинации) и фильтр по cooking_time
     """
     name = models.CharField('Название', max_length=200)
     author = models.ForeignKey(
@@ -57,12 +99,68 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='recipes/images/',
+        storage=image_storage,
         null=False
     )
     portions = models.PositiveIntegerField('Количество порций')
+    tags_mask = models.BigIntegerField(
+        'Маска тегов',
+        default=0,
+        editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    trending = models.FloatField(
+        'Популярность',
+        default=0,
+        editable=False
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=0,
+        editable=False
+    )
+    pending_deletion = models.BooleanField(
+        'Помечен на удаление',
+        default=False,
+        editable=False
+    )
+
+    objects = RecipeManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['cooking_time', 'id'],
+                name='recipe_cooking_time_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', '-id', 'cooking_time'],
+                name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-id', 'cooking_time'],
+                name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=['-trending', '-pub_date', '-id', 'cooking_time'],
+                name='recipe_trending_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['id'],
+                condition=models.Q(pending_deletion=True),
+                name='recipe_pending_deletion_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -154,6 +252,11 @@ class ShoppingCart(models.Model):
         verbose_name='Рецепт',
     )
     portions_to_shop = models.PositiveIntegerField('Количество порций')
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         constraints = [
@@ -181,6 +284,11 @@ class FavoriteRecipes(models.Model):
         related_name='favorited_by',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         constraints = [
@@ -189,3 +297,131 @@ class FavoriteRecipes(models.Model):
                 name='unique_user_fav_recipe_pair'
             )
         ]
+
+
+class FeedEntry(models.Model):
+    """
+    Запись в ленте подписок пользователя (fan-out-on-write)
+    Создаётся для каждого подписчика при публикации рецепта автором
+    Дата публикации дублируется из Recipe для сортировки ленты по индексу
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Владелец ленты',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_user_recipe_feed_pair'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'
+            )
+        ]
+
+
+class SimilarRecipe(models.Model):
+    """
+    Предрассчитанный похожий рецепт (top-K по пересечению ингредиентов и тегов)
+    Заполняется командой build_similar_recipes
+    Пересчитывается для рецепта при его создании и редактировании
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_recipe_similar_pair'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx'
+            )
+        ]
+
+
+class RecipeRank(models.Model):
+    """
+    Рейтинг популярности рецепта (trending)
+    Хранит логарифм суммы добавлений в избранное и корзину с экспоненциальным
+    затуханием, отсчитанного от TRENDING_EPOCH: порядок по этому полю
+    совпадает с порядком по текущему затухшему счёту
+    Обновляется при каждом добавлении и пересчитывается командой
+    update_trending; копируется в Recipe.trending для сортировки по индексу
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank',
+        verbose_name='Рецепт',
+    )
+    trending = models.FloatField('Популярность', db_index=True)
+
+
+class SharedVersion(models.Model):
+    """
+    Версия данных, общая для всех процессов (веб-воркеров, outbox,
+    команд)
+    По ней процессы узнают, что их индексы и кэши в памяти устарели
+    Увеличивается UPDATE в транзакции изменения: пока она не завершена,
+    следующее увеличение ждёт, поэтому версии видны в порядке номеров
+    """
+    key = models.CharField('Ключ', max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField('Версия', default=0)
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
+
+
+class PantryDelta(models.Model):
+    """
+    Изменение индекса подбора рецептов по ингредиентам
+    Процессы применяют к своему индексу в памяти дельты с версией больше
+    своей; дельта без рецепта означает полную перестройку
+    Хранятся последние PANTRY_MAX_DELTAS дельт
+    """
+    version = models.PositiveBigIntegerField('Версия', unique=True)
+    recipe_id = models.PositiveIntegerField('id рецепта', null=True)
+    ingredient_ids = models.JSONField('id ингредиентов', default=list)
+
+    class Meta:
+        ordering = ['version']
+        verbose_name = 'Изменение индекса подбора'
+        verbose_name_plural = 'Изменения индекса подбора'
+
+    def __str__(self):
+        return f'{self.version}: {self.recipe_id}'
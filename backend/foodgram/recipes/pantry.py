@@ -0,0 +1,193 @@
+from threading import Lock
+
+import numpy as np
+from django.conf import settings
+
+from .models import IngredientRecipe, PantryDelta, Recipe
+from .versions import bump_version, get_version
+
+
+VERSION_KEY = 'pantry'
+SLOT_DTYPE = np.uint32
+
+
+def get_counted_links():
+    """
+    Связи рецепт-ингредиент, учитываемые при подборе (без 'по вкусу' и
+    рецептов, помеченных на удаление).
+    """
+    return IngredientRecipe.objects.exclude(
+        ingredient__measurement_unit='по вкусу'
+    ).filter(recipe__pending_deletion=False)
+
+
+class PantryIndex:
+    """
+    Инвертированный индекс ингредиент -> рецепты в памяти процесса.
+    Каждому рецепту выделяется слот (позиция в отсортированном массиве id),
+    списки рецептов ингредиента хранятся как отсортированные массивы слотов.
+    Изменения рецептов передаются между процессами через БД: общая версия
+    и дельта PantryDelta (id рецепта, id его ингредиентов) для каждой
+    версии.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.recipe_ids = np.empty(0, dtype=np.int64)
+        self.totals = np.empty(0, dtype=np.uint16)
+        self.postings = {}
+
+    def rebuild(self, version):
+        """
+        Полностью строит индекс по IngredientRecipe.
+        Связи рецептов, которых нет в прочитанном списке (созданы между
+        запросами), отбрасываются - их добавят дельты.
+        """
+        chunk_size = settings.PANTRY_CHUNK_SIZE
+        recipe_ids = np.fromiter(
+            Recipe.objects.order_by('pk').values_list(
+                'pk', flat=True
+            ).iterator(chunk_size=chunk_size),
+            dtype=np.int64
+        )
+        links = np.fromiter(
+            get_counted_links().values_list(
+                'ingredient_id', 'recipe_id'
+            ).iterator(chunk_size=chunk_size),
+            dtype=[('ingredient', np.int64), ('recipe', np.int64)]
+        )
+        links = links[np.isin(links['recipe'], recipe_ids)]
+        slots = np.searchsorted(recipe_ids, links['recipe']).astype(
+            SLOT_DTYPE
+        )
+        order = np.lexsort((slots, links['ingredient']))
+        ingredients, slots = links['ingredient'][order], slots[order]
+        ingredient_ids, starts = np.unique(ingredients, return_index=True)
+        ends = np.append(starts[1:], len(slots))
+        self.recipe_ids = recipe_ids
+        self.totals = np.bincount(
+            slots, minlength=len(recipe_ids)
+        ).astype(np.uint16)
+        self.postings = {
+            ingredient_id: slots[start:end]
+            for ingredient_id, start, end in zip(
+                ingredient_ids.tolist(), starts, ends
+            )
+        }
+        self.version = version
+
+    def apply(self, recipe_id, ingredient_ids):
+        """
+        Обновляет в индексе ингредиенты одного рецепта.
+        Возвращает False, если рецепту нельзя выделить слот без перестройки.
+        """
+        slot = np.searchsorted(self.recipe_ids, recipe_id)
+        if slot == len(self.recipe_ids):
+            self.recipe_ids = np.append(self.recipe_ids, recipe_id)
+            self.totals = np.append(self.totals, np.uint16(0))
+        elif self.recipe_ids[slot] != recipe_id:
+            return False
+        else:
+            for ingredient_id, posting in self.postings.items():
+                position = np.searchsorted(posting, slot)
+                if position < len(posting) and posting[position] == slot:
+                    self.postings[ingredient_id] = np.delete(
+                        posting, position
+                    )
+        empty = np.empty(0, dtype=SLOT_DTYPE)
+        for ingredient_id in ingredient_ids:
+            posting = self.postings.get(ingredient_id, empty)
+            self.postings[ingredient_id] = np.insert(
+                posting, np.searchsorted(posting, slot), slot
+            )
+        self.totals[slot] = len(ingredient_ids)
+        return True
+
+    def sync(self):
+        """
+        Догоняет общую версию индекса по дельтам из БД (один запрос, если
+        изменений нет) или перестройкой, если нужных дельт уже нет.
+        """
+        if self.version is None:
+            self.rebuild(get_version(VERSION_KEY))
+            return
+        deltas = PantryDelta.objects.filter(
+            version__gt=self.version
+        ).values_list('version', 'recipe_id', 'ingredient_ids')
+        for version, recipe_id, ingredient_ids in deltas:
+            if (
+                version != self.version + 1
+                or recipe_id is None
+                or not self.apply(recipe_id, ingredient_ids)
+            ):
+                self.rebuild(get_version(VERSION_KEY))
+                return
+            self.version = version
+
+    def match(self, ingredient_ids, limit):
+        """
+        Возвращает до limit пар (id рецепта, покрытие), отсортированных по
+        доле имеющихся ингредиентов рецепта, затем по их количеству.
+        """
+        with self.lock:
+            self.sync()
+            postings = [
+                self.postings[ingredient_id]
+                for ingredient_id in set(ingredient_ids)
+                if ingredient_id in self.postings
+            ]
+            if not postings:
+                return []
+            counts = np.bincount(
+                np.concatenate(postings), minlength=len(self.recipe_ids)
+            )
+            slots = np.flatnonzero(counts)
+            counts = counts[slots]
+            coverage = counts / self.totals[slots]
+            top = np.lexsort((-counts, -coverage))[:limit]
+            return list(zip(
+                self.recipe_ids[slots[top]].tolist(),
+                coverage[top].tolist()
+            ))
+
+
+pantry_index = PantryIndex()
+
+
+def publish_delta(recipe_id=None, ingredient_ids=()):
+    """
+    Записывает дельту индекса со следующей общей версией и удаляет дельты
+    старше последних PANTRY_MAX_DELTAS.
+    """
+    version = bump_version(VERSION_KEY)
+    PantryDelta.objects.create(
+        version=version,
+        recipe_id=recipe_id,
+        ingredient_ids=list(ingredient_ids)
+    )
+    PantryDelta.objects.filter(
+        version__lte=version - settings.PANTRY_MAX_DELTAS
+    ).delete()
+
+
+def reset_pantry_index():
+    """
+    Публикует новую версию индекса без рецепта: все процессы перестроят
+    индекс целиком (после массовой загрузки рецептов).
+    """
+    publish_delta()
+
+
+def update_pantry_index(recipe_id):
+    """
+    Публикует новую версию индекса с текущими ингредиентами рецепта
+    (пустой список, если рецепт удалён или помечен на удаление).
+    Вызывается после создания, редактирования, пометки на удаление и
+    удаления рецепта.
+    """
+    publish_delta(
+        recipe_id,
+        get_counted_links().filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', flat=True)
+    )
@@ -0,0 +1,30 @@
+from django.db.models import (Count, F, IntegerField, OuterRef, Subquery,
+                              Value)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import FavoriteRecipes, Recipe
+
+
+def change_favorites_count(recipe_id, delta):
+    """Атомарно меняет favorites_count рецепта на delta (не ниже нуля)."""
+    Recipe.objects.filter(pk=recipe_id).update(
+        favorites_count=Greatest(F('favorites_count') + delta, Value(0))
+    )
+
+
+def update_favorites_counts(recipe_ids=None):
+    """
+    Пересчитывает favorites_count по FavoriteRecipes одним UPDATE
+    (для recipe_ids или для всех рецептов).
+    """
+    favorites_count = FavoriteRecipes.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        count=Count('pk')
+    ).values('count')
+    recipes = Recipe.objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    return recipes.update(favorites_count=Coalesce(
+        Subquery(favorites_count, output_field=IntegerField()), 0
+    ))
@@ -0,0 +1,154 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from tempfile import NamedTemporaryFile
+from threading import Lock
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from .models import ShoppingCart
+from .versions import bump_version, bump_versions, get_versions
+
+
+CART_VERSION_KEY = 'cart:{}'
+CARTS_VERSION_KEY = 'carts'
+PDF_FONT_NAME = 'ShoppingList'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 20 * mm
+
+executor = None
+executor_lock = Lock()
+pending = {}
+
+
+def get_cart_version(user_id):
+    """
+    Версия корзины юзера: счётчик корзины и общий счётчик всех корзин
+    (одним запросом, без построения списка покупок).
+    """
+    user_key = CART_VERSION_KEY.format(user_id)
+    versions = get_versions([user_key, CARTS_VERSION_KEY])
+    return f'{versions[user_key]}-{versions[CARTS_VERSION_KEY]}'
+
+
+def bump_cart_versions(user_ids):
+    """
+    Меняет версии корзин юзеров.
+    Вызывается при добавлении, изменении и удалении рецептов корзины.
+    """
+    bump_versions(CART_VERSION_KEY.format(user_id) for user_id in user_ids)
+
+
+def bump_recipe_carts(recipe_ids):
+    """
+    Меняет версии корзин, в которых есть рецепты recipe_ids.
+    Вызывается при редактировании и удалении рецептов.
+    """
+    bump_cart_versions(set(
+        ShoppingCart.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list('user_id', flat=True)
+    ))
+
+
+def bump_all_carts():
+    """Меняет версии всех корзин (после изменения ингредиентов)."""
+    bump_version(CARTS_VERSION_KEY)
+
+
+def get_pdf_path(user_id, version):
+    """Путь к PDF списка покупок юзера для версии корзины version."""
+    return os.path.join(
+        settings.SHOPPING_LIST_PDF_ROOT, str(user_id), f'{version}.pdf'
+    )
+
+
+def render_pdf(path, shopping_list, font_path):
+    """
+    Рисует список покупок в PDF (выполняется в процессе пула).
+    Файл пишется во временный и переименовывается, PDF прошлых версий
+    корзины этого юзера удаляются.
+    """
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    width, height = A4
+    line_height = PDF_FONT_SIZE * 1.5
+    with NamedTemporaryFile(dir=directory, suffix='.tmp',
+                            delete=False) as file:
+        pdf = canvas.Canvas(file, pagesize=A4)
+        pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+        y = height - PDF_MARGIN
+        for line in shopping_list.splitlines():
+            for part in simpleSplit(line, PDF_FONT_NAME, PDF_FONT_SIZE,
+                                    width - 2 * PDF_MARGIN) or ['']:
+                if y < PDF_MARGIN:
+                    pdf.showPage()
+                    pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+                    y = height - PDF_MARGIN
+                pdf.drawString(PDF_MARGIN, y, part)
+                y -= line_height
+        pdf.save()
+    os.replace(file.name, path)
+    for name in os.listdir(directory):
+        if name.endswith('.pdf') and name != os.path.basename(path):
+            os.remove(os.path.join(directory, name))
+
+
+def start_executor():
+    """
+    Создаёт пул процессов для отрисовки PDF и сразу запускает процессы
+    пула (пустой задачей).
+    Вызывается из хука post_worker_init gunicorn - после форка воркера и
+    до приёма запросов.
+    """
+    global executor
+    executor = ProcessPoolExecutor(
+        max_workers=settings.SHOPPING_LIST_PDF_WORKERS
+    )
+    executor.submit(os.getpid).result()
+
+
+def get_shopping_list_pdf(user_id, version, build_shopping_list):
+    """
+    Возвращает путь к PDF списка покупок версии корзины version.
+    Готовый PDF отдаётся сразу, без построения списка, иначе список
+    строится build_shopping_list() и отрисовка ставится в пул (один раз на
+    версию) и ожидается не дольше SHOPPING_LIST_PDF_WAIT (доли секунды).
+    Если PDF не успел - возвращает None, отрисовка продолжается в фоне.
+    Без пула (manage.py runserver, тесты) PDF рисуется в процессе запроса.
+    """
+    path = get_pdf_path(user_id, version)
+    if os.path.exists(path):
+        return path
+    if executor is None:
+        render_pdf(
+            path, build_shopping_list(), settings.SHOPPING_LIST_PDF_FONT
+        )
+        return path
+    future = pending.get(path)
+    if future is None:
+        shopping_list = build_shopping_list()
+        with executor_lock:
+            future = pending.get(path)
+            if future is None:
+                future = executor.submit(
+                    render_pdf, path, shopping_list,
+                    settings.SHOPPING_LIST_PDF_FONT
+                )
+                pending[path] = future
+                future.add_done_callback(
+                    lambda _: pending.pop(path, None)
+                )
+    try:
+        future.result(timeout=settings.SHOPPING_LIST_PDF_WAIT)
+    except FutureTimeoutError:
+        return None
+    return path
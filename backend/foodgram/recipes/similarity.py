@@ -0,0 +1,286 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from scipy import sparse
+
+from .models import IngredientRecipe, RecipeTag, SimilarRecipe
+
+
+LINK_DTYPE = [('recipe', np.int64), ('feature', np.int64)]
+
+
+def get_ingredient_links():
+    """Связи рецепт-ингредиент без ингредиентов 'по вкусу'."""
+    return IngredientRecipe.objects.exclude(
+        ingredient__measurement_unit='по вкусу'
+    )
+
+
+def get_tag_weight():
+    """Вес совпадения тега в скалярном произведении (квадрат веса тега)."""
+    return settings.SIMILAR_RECIPES_TAG_WEIGHT ** 2
+
+
+def load_links(queryset, recipe_ids=None):
+    """
+    Загружает пары (рецепт, признак) сразу в массив NumPy.
+    Рецепты recipe_ids подставляются в запрос пачками по
+    SIMILAR_RECIPES_CHUNK_SIZE.
+    """
+    chunk_size = settings.SIMILAR_RECIPES_CHUNK_SIZE
+    if recipe_ids is None:
+        return np.fromiter(
+            queryset.iterator(chunk_size=chunk_size), dtype=LINK_DTYPE
+        )
+    recipe_ids = sorted(recipe_ids)
+    return np.concatenate([np.empty(0, dtype=LINK_DTYPE)] + [
+        np.fromiter(
+            queryset.filter(
+                recipe_id__in=recipe_ids[start:start + chunk_size]
+            ).iterator(chunk_size=chunk_size),
+            dtype=LINK_DTYPE
+        )
+        for start in range(0, len(recipe_ids), chunk_size)
+    ])
+
+
+def get_common_ingredient_ids():
+    """
+    Ингредиенты, которые есть больше чем в SIMILAR_RECIPES_MAX_CANDIDATES
+    рецептах (соль, вода). Они учитываются в сходстве, но не делают
+    рецепты кандидатами в похожие: иначе кандидатами был бы почти весь
+    корпус.
+    """
+    return set(
+        get_ingredient_links().values('ingredient').annotate(
+            recipes=Count('recipe')
+        ).filter(
+            recipes__gt=settings.SIMILAR_RECIPES_MAX_CANDIDATES
+        ).values_list('ingredient', flat=True)
+    )
+
+
+def get_candidates(recipe_ids):
+    """
+    Кандидаты в похожие для рецептов recipe_ids - рецепты с общими не
+    частыми ингредиентами (вместе с самими recipe_ids) - и частые
+    ингредиенты рецептов.
+    На каждый ингредиент читается не больше SIMILAR_RECIPES_MAX_CANDIDATES
+    + 1 рецептов: ингредиент, у которого их больше, частый.
+    Возвращает множество id кандидатов и множество частых ингредиентов.
+    """
+    limit = settings.SIMILAR_RECIPES_MAX_CANDIDATES
+    candidate_ids, common_ids = set(recipe_ids), set()
+    ingredient_ids = set(
+        get_ingredient_links().filter(
+            recipe__in=recipe_ids
+        ).values_list('ingredient_id', flat=True)
+    )
+    for ingredient_id in ingredient_ids:
+        ingredient_recipe_ids = list(
+            get_ingredient_links().filter(
+                ingredient_id=ingredient_id
+            ).values_list('recipe_id', flat=True)[:limit + 1]
+        )
+        if len(ingredient_recipe_ids) > limit:
+            common_ids.add(ingredient_id)
+        else:
+            candidate_ids.update(ingredient_recipe_ids)
+    return candidate_ids, common_ids
+
+
+def build_features(common_ids, recipe_ids=None):
+    """
+    Строит матрицу признаков рецептов.
+    Возвращает отсортированные id рецептов, разреженные матрицы
+    рецепт x ингредиент и рецепт x тег, нормы строк и матрицу
+    рецепт x ингредиент без частых ингредиентов common_ids (по ней
+    выбираются пары для оценки).
+    """
+    ingredient_links = load_links(
+        get_ingredient_links().values_list('recipe_id', 'ingredient_id'),
+        recipe_ids
+    )
+    tag_links = load_links(
+        RecipeTag.objects.values_list('recipe_id', 'tag_id'),
+        recipe_ids
+    )
+    ids = np.union1d(ingredient_links['recipe'], tag_links['recipe'])
+    ingredients = build_matrix(ids, ingredient_links)
+    tags = build_matrix(ids, tag_links)
+    norms = np.sqrt(
+        np.asarray(ingredients.sum(axis=1)).ravel()
+        + get_tag_weight() * np.asarray(tags.sum(axis=1)).ravel()
+    )
+    pairing = build_matrix(ids, ingredient_links[
+        ~np.isin(ingredient_links['feature'], list(common_ids))
+    ])
+    return ids, ingredients, tags, norms, pairing
+
+
+def build_matrix(ids, links):
+    """Разреженная матрица рецепт x признак из пар (рецепт, признак)."""
+    feature_ids, cols = np.unique(links['feature'], return_inverse=True)
+    return sparse.csr_matrix(
+        (
+            np.ones(len(links), dtype=np.float32),
+            (np.searchsorted(ids, links['recipe']), cols)
+        ),
+        shape=(len(ids), len(feature_ids))
+    )
+
+
+def score_rows(features, rows):
+    """
+    Считает косинусное сходство рецептов rows со всеми рецептами матрицы.
+    Оцениваются только пары с общими не частыми ингредиентами (сходство
+    считается по всем ингредиентам и тегам), пара рецепта с самим собой
+    исключается.
+    """
+    _, ingredients, tags, norms, pairing = features
+    pairs = (pairing[rows] @ pairing.T).tocoo()
+    pair_rows = rows[pairs.row]
+    pair_cols = pairs.col
+    ingredient_overlap = np.asarray(
+        ingredients[pair_rows].multiply(ingredients[pair_cols]).sum(axis=1)
+    ).ravel()
+    tag_overlap = np.asarray(
+        tags[pair_rows].multiply(tags[pair_cols]).sum(axis=1)
+    ).ravel()
+    scores = (
+        ingredient_overlap + get_tag_weight() * tag_overlap
+    ) / (norms[pair_rows] * norms[pair_cols])
+    not_self = pair_rows != pair_cols
+    return pair_rows[not_self], pair_cols[not_self], scores[not_self]
+
+
+def select_top_k(rows, cols, scores, top_k):
+    """Оставляет для каждой строки top_k пар с наибольшим сходством."""
+    order = np.lexsort((-scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < top_k
+    return rows[keep], cols[keep], scores[keep]
+
+
+def iter_top_k(features, rows):
+    """
+    Отбирает top-K похожих для строк rows блоками по
+    SIMILAR_RECIPES_BATCH_SIZE строк, чтобы число оцениваемых пар (и
+    память) не росло с количеством строк.
+    Выдаёт тройки массивов (строки, столбцы, сходство) по блокам.
+    """
+    batch_size = settings.SIMILAR_RECIPES_BATCH_SIZE
+    for start in range(0, len(rows), batch_size):
+        yield select_top_k(
+            *score_rows(features, rows[start:start + batch_size]),
+            settings.SIMILAR_RECIPES_TOP_K
+        )
+
+
+def create_similar(recipe_ids, similar_ids, scores, **kwargs):
+    """Сохраняет пары похожих рецептов пачками."""
+    SimilarRecipe.objects.bulk_create(
+        (
+            SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                          score=score)
+            for recipe_id, similar_id, score in zip(
+                recipe_ids, similar_ids, scores
+            )
+        ),
+        batch_size=settings.SIMILAR_RECIPES_CHUNK_SIZE,
+        **kwargs
+    )
+
+
+def rebuild_similar_recipes():
+    """
+    Полностью пересчитывает похожие рецепты для всех рецептов.
+    Строки матрицы обрабатываются блоками по SIMILAR_RECIPES_BATCH_SIZE.
+    Возвращает количество сохранённых пар.
+    """
+    features = build_features(get_common_ingredient_ids())
+    ids = features[0]
+    created = 0
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        for rows, cols, scores in iter_top_k(features, np.arange(len(ids))):
+            create_similar(
+                ids[rows].tolist(), ids[cols].tolist(), scores.tolist()
+            )
+            created += len(rows)
+    return created
+
+
+def update_similar_recipes(recipe):
+    """
+    Пересчитывает похожие рецепты после изменения одного рецепта без полной
+    перестройки.
+    Списки самого рецепта и рецептов, в чьих списках он был, считаются
+    заново (из них он мог выпасть - освободившиеся места заполняются).
+    В списки остальных рецептов с общими ингредиентами он добавляется, если
+    похож сильнее их последнего похожего; списки обрезаются до
+    SIMILAR_RECIPES_TOP_K.
+    Матрица строится только по кандидатам (get_candidates), а не по всем
+    рецептам с общими частыми ингредиентами.
+    """
+    affected_ids = set(
+        SimilarRecipe.objects.filter(similar=recipe).values_list(
+            'recipe_id', flat=True
+        )
+    )
+    affected_ids.add(recipe.pk)
+    candidate_ids, common_ids = get_candidates(affected_ids)
+    features = build_features(common_ids, candidate_ids)
+    ids = features[0]
+    affected_rows = np.flatnonzero(np.isin(ids, list(affected_ids)))
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe__in=affected_ids).delete()
+        for rows, cols, scores in iter_top_k(features, affected_rows):
+            create_similar(
+                ids[rows].tolist(), ids[cols].tolist(), scores.tolist()
+            )
+        position = np.searchsorted(ids, recipe.pk)
+        if position == len(ids) or ids[position] != recipe.pk:
+            return
+        _, cols, scores = score_rows(features, np.array([position]))
+        others = ~np.isin(ids[cols], list(affected_ids))
+        add_to_lists(
+            recipe.pk, ids[cols[others]].tolist(), scores[others].tolist()
+        )
+
+
+def add_to_lists(recipe_id, candidate_ids, scores):
+    """
+    Добавляет рецепт recipe_id в списки похожих рецептов candidate_ids, где
+    его сходство больше последнего в заполненном списке, и обрезает
+    заполненные списки до SIMILAR_RECIPES_TOP_K.
+    """
+    top_k = settings.SIMILAR_RECIPES_TOP_K
+    lists = {
+        row['recipe']: row
+        for row in SimilarRecipe.objects.filter(
+            recipe__in=candidate_ids
+        ).values('recipe').annotate(size=Count('pk'), low=Min('score'))
+    }
+    added, full_ids = [], []
+    for candidate_id, score in zip(candidate_ids, scores):
+        current = lists.get(candidate_id)
+        if current is None or current['size'] < top_k:
+            added.append((candidate_id, score))
+        elif score > current['low']:
+            added.append((candidate_id, score))
+            full_ids.append(candidate_id)
+    create_similar(
+        [candidate_id for candidate_id, _ in added],
+        [recipe_id] * len(added),
+        [score for _, score in added]
+    )
+    for candidate_id in full_ids:
+        extra_ids = list(
+            SimilarRecipe.objects.filter(
+                recipe_id=candidate_id
+            ).order_by('-score').values_list('pk', flat=True)[top_k:]
+        )
+        SimilarRecipe.objects.filter(pk__in=extra_ids).delete()
@@ -0,0 +1,34 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+HASH_LENGTH = 32
+
+
+@deconstructible
+class ContentHashedStorage(FileSystemStorage):
+    """
+    Хранилище, называющее файлы хэшем содержимого.
+    Одинаковые картинки хранятся одним файлом, а содержимое по URL никогда
+    не меняется, поэтому nginx отдаёт их с Cache-Control: immutable.
+    """
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        name = f'{digest.hexdigest()[:HASH_LENGTH]}{extension}'
+        if directory:
+            name = f'{directory}/{name}'
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+image_storage = ContentHashedStorage()
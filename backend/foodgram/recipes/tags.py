@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import BooleanField, F, Func
+
+from .cache import invalidate_recipe_fragments
+from .models import Recipe, RecipeTag, Tag
+from .versions import bump_version, get_version
+
+
+VERSION_KEY = 'tags'
+TAG_BITS_KEY = 'tags:bits:{}'
+
+
+def get_tag_bits():
+    """
+    Соответствие slug тега и его бита в маске.
+    Кэшируется в процессе по общей версии тегов из БД, поэтому изменения
+    тегов видны во всех процессах.
+    """
+    key = TAG_BITS_KEY.format(get_version(VERSION_KEY))
+    tag_bits = cache.get(key)
+    if tag_bits is None:
+        tag_bits = dict(Tag.objects.values_list('slug', 'bit'))
+        cache.set(key, tag_bits, timeout=None)
+    return tag_bits
+
+
+def invalidate_tag_bits():
+    """
+    Меняет общую версию тегов и сбрасывает фрагменты рецептов
+    (после изменения тегов).
+    """
+    bump_version(VERSION_KEY)
+    invalidate_recipe_fragments()
+
+
+def get_tags_mask(bits):
+    """Маска тегов рецепта по битам его тегов."""
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return mask
+
+
+def has_any_tag(mask):
+    """Условие для filter(): в маске рецепта есть хотя бы один бит mask."""
+    return Func(
+        F('tags_mask').bitand(mask),
+        template='(%(expressions)s) > 0',
+        output_field=BooleanField()
+    )
+
+
+def update_tags_masks(recipe_ids):
+    """Пересчитывает маски тегов рецептов по RecipeTag."""
+    bits = defaultdict(list)
+    for recipe_id, bit in RecipeTag.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'tag__bit'):
+        bits[recipe_id].append(bit)
+    Recipe.objects.bulk_update(
+        [
+            Recipe(pk=recipe_id, tags_mask=get_tags_mask(bits[recipe_id]))
+            for recipe_id in recipe_ids
+        ],
+        ['tags_mask']
+    )
+
+
+def clear_tag_bits(bits):
+    """
+    Убирает биты удалённых тегов из масок рецептов, чтобы их можно было
+    выдать новым тегам. Обновляются только рецепты с этими битами (в том
+    числе ждущие удаления).
+    """
+    mask = get_tags_mask(bits)
+    if mask:
+        Recipe.all_objects.filter(has_any_tag(mask)).update(
+            tags_mask=F('tags_mask').bitand(~mask)
+        )
@@ -0,0 +1,136 @@
+import math
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Abs, Coalesce, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import FavoriteRecipes, Recipe, RecipeRank, ShoppingCart
+
+
+def get_decay_seconds():
+    """Постоянная времени затухания (период полураспада / ln 2), в секундах."""
+    return settings.TRENDING_HALF_LIFE.total_seconds() / math.log(2)
+
+
+def get_weights():
+    """Веса активности по моделям списков юзера."""
+    return {
+        FavoriteRecipes: settings.TRENDING_FAVORITE_WEIGHT,
+        ShoppingCart: settings.TRENDING_SHOPPING_CART_WEIGHT,
+    }
+
+
+def get_log_score(weight, created):
+    """Логарифм вклада одного добавления, отсчитанный от TRENDING_EPOCH."""
+    age = (created - settings.TRENDING_EPOCH).total_seconds()
+    return math.log(weight) + age / get_decay_seconds()
+
+
+def get_rank_subquery():
+    """
+    Рейтинг рецепта из RecipeRank для UPDATE Recipe (0 - без рейтинга:
+    вклады отсчитываются от TRENDING_EPOCH, поэтому рейтинг с активностью
+    больше 0).
+    """
+    return Coalesce(
+        Subquery(
+            RecipeRank.objects.filter(
+                recipe_id=OuterRef('pk')
+            ).values('trending')
+        ),
+        Value(0.0),
+        output_field=FloatField()
+    )
+
+
+def add_trending_activity(instance):
+    """
+    Учитывает добавление рецепта в избранное или корзину в RecipeRank и
+    копирует рейтинг в Recipe.trending.
+    Сумма вкладов считается в логарифмах: log(e^a + e^b) =
+    max(a, b) + log(1 + e^-|a - b|), поэтому обновление атомарно и не
+    переполняется.
+    """
+    log_score = get_log_score(
+        get_weights()[type(instance)], instance.created
+    )
+    value = Value(log_score)
+    updated = RecipeRank.objects.filter(recipe_id=instance.recipe_id).update(
+        trending=Greatest(F('trending'), value)
+        + Ln(1 + Exp(-Abs(F('trending') - value)))
+    )
+    if not updated:
+        RecipeRank.objects.get_or_create(
+            recipe_id=instance.recipe_id,
+            defaults={'trending': log_score}
+        )
+    Recipe.all_objects.filter(pk=instance.recipe_id).update(
+        trending=get_rank_subquery()
+    )
+
+
+def load_activity(model, since):
+    """Загружает (рецепт, вклад) добавлений моделью model после since."""
+    chunk_size = settings.TRENDING_CHUNK_SIZE
+    activity = np.fromiter(
+        (
+            (recipe_id, created.timestamp())
+            for recipe_id, created in model.objects.filter(
+                created__gte=since
+            ).values_list('recipe_id', 'created').iterator(
+                chunk_size=chunk_size
+            )
+        ),
+        dtype=[('recipe', np.int64), ('created', np.float64)]
+    )
+    epoch = settings.TRENDING_EPOCH.timestamp()
+    log_scores = (
+        math.log(get_weights()[model])
+        + (activity['created'] - epoch) / get_decay_seconds()
+    )
+    return activity['recipe'], log_scores
+
+
+def group_log_sum_exp(recipe_ids, log_scores):
+    """Логарифм суммы экспонент вкладов по каждому рецепту (векторно)."""
+    if not len(recipe_ids):
+        return recipe_ids, log_scores
+    order = np.argsort(recipe_ids, kind='stable')
+    recipe_ids, log_scores = recipe_ids[order], log_scores[order]
+    unique_ids, starts, counts = np.unique(
+        recipe_ids, return_index=True, return_counts=True
+    )
+    maximums = np.maximum.reduceat(log_scores, starts)
+    sums = np.add.reduceat(
+        np.exp(log_scores - np.repeat(maximums, counts)), starts
+    )
+    return unique_ids, maximums + np.log(sums)
+
+
+def rebuild_trending():
+    """
+    Пересчитывает RecipeRank по активности за TRENDING_WINDOW и копирует
+    рейтинги в Recipe.trending.
+    Возвращает количество рецептов в рейтинге.
+    """
+    since = timezone.now() - settings.TRENDING_WINDOW
+    recipe_ids, log_scores = map(np.concatenate, zip(*(
+        load_activity(model, since) for model in get_weights()
+    )))
+    recipe_ids, trending = group_log_sum_exp(recipe_ids, log_scores)
+    with transaction.atomic():
+        RecipeRank.objects.all().delete()
+        RecipeRank.objects.bulk_create(
+            (
+                RecipeRank(recipe_id=recipe_id, trending=score)
+                for recipe_id, score in zip(
+                    recipe_ids.tolist(), trending.tolist()
+                )
+            ),
+            batch_size=settings.TRENDING_CHUNK_SIZE
+        )
+        Recipe.all_objects.update(trending=get_rank_subquery())
+    return len(recipe_ids)
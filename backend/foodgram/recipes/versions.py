@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models import F
+
+from .models import SharedVersion
+
+
+def get_version(key):
+    """Текущая общая версия key (0, если её ещё не увеличивали)."""
+    return SharedVersion.objects.filter(key=key).values_list(
+        'version', flat=True
+    ).first() or 0
+
+
+def get_versions(keys):
+    """Общие версии keys одним запросом (0 для неувеличенных)."""
+    versions = dict(
+        SharedVersion.objects.filter(key__in=keys).values_list(
+            'key', 'version'
+        )
+    )
+    return {key: versions.get(key, 0) for key in keys}
+
+
+def bump_versions(keys):
+    """Увеличивает общие версии keys одним UPDATE."""
+    keys = list(keys)
+    if not keys:
+        return
+    with transaction.atomic():
+        SharedVersion.objects.bulk_create(
+            [SharedVersion(key=key) for key in keys], ignore_conflicts=True
+        )
+        SharedVersion.objects.filter(key__in=keys).update(
+            version=F('version') + 1
+        )
+
+
+def bump_version(key):
+    """
+    Увеличивает общую версию key и возвращает новую.
+    Строка версии блокируется до конца транзакции вызывающего.
+    """
+    with transaction.atomic():
+        SharedVersion.objects.get_or_create(key=key)
+        SharedVersion.objects.filter(key=key).update(
+            version=F('version') + 1
+        )
+        return SharedVersion.objects.get(key=key).version
@@ -1,37 +1,73 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
-from recipes.models import FavoriteRecipes, ShoppingCart
+from recipes.admin_utils import (BackgroundDeletionMixin,
+                                 EstimatedCountPaginator, related_list_link)
+from recipes.deletion import mark_users_for_deletion
+from recipes.models import FavoriteRecipes, Recipe, ShoppingCart
 from .models import Subscribe
 
 
 User = get_user_model()
 
 
-class FavoriteInline(admin.TabularInline):
-    model = FavoriteRecipes
-    extra = 1
-
-
-class ShoppingCartInline(admin.TabularInline):
-    model = ShoppingCart
-    extra = 1
-
-
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(BackgroundDeletionMixin, admin.ModelAdmin):
     """
     Oтображение в админке модели User
-    Содержит инлайны для связи с Recipe через FavoriteRecipes и ShoppingCart
+    Рецепты, избранное и корзина показываются количеством со ссылкой на
+    отфильтрованный список
+    Удаление деактивирует юзеров и помечает их на удаление (строки
+    удаляет process_deletions)
     """
     list_editable = ('password',)
     list_display = ('pk', 'username', 'first_name', 'last_name', 'password')
     search_fields = ('email', 'username')
-    inlines = (FavoriteInline, ShoppingCartInline)
+    list_filter = ('pending_deletion',)
+    readonly_fields = (
+        'recipes_summary', 'favorites_summary', 'shopping_cart_summary'
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_manytomany(self, db_field, request=None, **kwargs):
+        if db_field.name == 'user_permissions':
+            kwargs['queryset'] = db_field.remote_field.model.objects.all(
+            ).select_related('content_type')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    def delete_model(self, request, obj):
+        mark_users_for_deletion([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        mark_users_for_deletion(queryset.values_list('pk', flat=True))
+
+    def recipes_summary(self, obj):
+        return related_list_link(
+            Recipe, obj.recipes.count(), author__id__exact=obj.pk
+        )
+    recipes_summary.short_description = 'Рецепты'
+
+    def favorites_summary(self, obj):
+        return related_list_link(
+            FavoriteRecipes, obj.favorite_recipes.count(),
+            user__id__exact=obj.pk
+        )
+    favorites_summary.short_description = 'Избранное'
+
+    def shopping_cart_summary(self, obj):
+        return related_list_link(
+            ShoppingCart, obj.shopping_cart.count(), user__id__exact=obj.pk
+        )
+    shopping_cart_summary.short_description = 'Корзина'
 
 
 class SubscribeAdmin(admin.ModelAdmin):
     """Oтображение в админке модели Subscribe"""
     list_display = ('pk', 'author', 'user')
+    list_select_related = ('author', 'user')
+    autocomplete_fields = ('author', 'user')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Subscribe, SubscribeAdmin)
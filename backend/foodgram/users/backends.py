@@ -0,0 +1,24 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .models import User, filter_by_email
+
+
+class EmailBackend(ModelBackend):
+    """
+    Вход по email без учёта регистра (djoser, LOGIN_FIELD = 'email').
+    Юзер ищется по индексу на lower(email).
+    """
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        try:
+            user = filter_by_email(User.objects.all(), email).get()
+        except User.DoesNotExist:
+            # Как в ModelBackend: хэширование выравнивает время ответа.
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(
+            user
+        ):
+            return user
+        return None
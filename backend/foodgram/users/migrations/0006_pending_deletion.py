@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-19 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_alter_subscribe_author'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='pending_deletion',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Помечен на удаление'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(pending_deletion=True), fields=['id'], name='user_pending_deletion_idx'),
+        ),
+    ]
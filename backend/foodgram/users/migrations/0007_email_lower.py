@@ -0,0 +1,51 @@
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import Lower
+
+
+def rename_duplicate(email, pk):
+    """Уникальный email для дубля: local+duplicate-pk@domain."""
+    local, _, domain = email.rpartition('@')
+    suffix = f'+duplicate-{pk}@{domain}'
+    return local[:254 - len(suffix)] + suffix
+
+
+def normalize_emails(apps, schema_editor):
+    """
+    Переводит email юзеров в нижний регистр.
+    Из email, различающихся только регистром, остаётся у юзера с последним
+    входом (при равенстве - с меньшим id), остальные получают email
+    local+duplicate-id@domain и деактивируются.
+    """
+    User = apps.get_model('users', 'User')
+    duplicates = User.objects.values(
+        email_lower=Lower('email')
+    ).annotate(
+        count=Count('pk')
+    ).filter(count__gt=1).values_list('email_lower', flat=True)
+    for email in duplicates.iterator():
+        users = User.objects.alias(
+            email_lower=Lower('email')
+        ).filter(email_lower=email).order_by(
+            F('last_login').desc(nulls_last=True), 'pk'
+        )
+        for user in users[1:]:
+            user.email = rename_duplicate(email, user.pk)
+            user.is_active = False
+            user.save(update_fields=['email', 'is_active'])
+    User.objects.exclude(email=Lower('email')).update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_pending_deletion'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(Lower('email'), name='user_email_lower_idx'),
+        ),
+    ]
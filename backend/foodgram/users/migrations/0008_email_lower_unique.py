@@ -0,0 +1,21 @@
+from django.db import migrations
+
+# UniqueConstraint по выражению появился только в Django 4.0, поэтому
+# индекс на lower(email) делается уникальным в БД, а в состоянии моделей
+# остаётся models.Index(Lower('email')).
+CREATE_INDEX = 'CREATE {}INDEX "user_email_lower_idx" ON "users_user" (LOWER("email"))'
+DROP_INDEX = 'DROP INDEX "user_email_lower_idx"'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_email_lower'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [DROP_INDEX, CREATE_INDEX.format('UNIQUE ')],
+            [DROP_INDEX, CREATE_INDEX.format('')],
+        ),
+    ]
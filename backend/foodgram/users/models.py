@@ -1,18 +1,59 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
+
+
+def normalize_email(email):
+    """Email в нижнем регистре, как он хранится в User.email."""
+    return email.strip().lower()
+
+
+def filter_by_email(queryset, email):
+    """
+    Юзеры с email без учёта регистра - по индексу на lower(email),
+    а не по UPPER(email) из email__iexact.
+    """
+    return queryset.alias(email_lower=Lower('email')).filter(
+        email_lower=normalize_email(email)
+    )
 
 
 class User(AbstractUser):
     """
     Кастомная модель User
     Поля first_name, last_name, email сделаны обязательными
+    Email хранится в нижнем регистре (normalize_email при сохранении),
+    поиск по нему идёт через индекс на lower(email), уникальный в БД
+    (миграция 0008_email_lower_unique)
+    Удаляемый юзер деактивируется и помечается pending_deletion, строки
+    удаляет фоновая команда process_deletions
     """
     first_name = models.CharField(max_length=150)
     last_name = models.CharField(max_length=150)
     email = models.EmailField(max_length=254, unique=True)
+    pending_deletion = models.BooleanField(
+        'Помечен на удаление',
+        default=False,
+        editable=False
+    )
 
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name']
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            models.Index(
+                fields=['id'],
+                condition=models.Q(pending_deletion=True),
+                name='user_pending_deletion_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.email:
+            self.email = normalize_email(self.email)
+        super().save(*args, **kwargs)
+
 
 class Subscribe(models.Model):
     """